@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reel assembly.
+Compares a multi-pass baseline (crop + watermark, then burn captions, then
+overlay B-roll, each a full decode/encode of the previous output) with
+VideoEditor.assemble doing all of it in one ffmpeg invocation. Inputs are
+synthetic (lavfi test sources), so only ffmpeg with libass is needed.
+
+Usage:
+    python benchmarks/reel_assembly.py
+    python benchmarks/reel_assembly.py --seconds 30 --preset medium --repeat 3
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from modules.assembly import FFMPEG, FilterGraph, VideoEditor, media_duration, run_ffmpeg, write_srt
+
+TRANSCRIPT = ("[HOOK] Tired all the time even after a full night's sleep? [BODY] Your thyroid sets the pace "
+              "for almost every cell in your body, and small daily habits make a real difference. Start with "
+              "selenium-rich foods, keep iodine steady, and take your medication at the same time each day. "
+              "[CTA] Save this and share it with someone who needs it.")
+
+
+def make_inputs(tmp, seconds):
+    def lavfi(source, path, *args):
+        subprocess.run([FFMPEG, "-v", "error", "-y", "-f", "lavfi", "-i", source, *args, path], check=True)
+        return path
+
+    os.makedirs(os.path.join(tmp, "assets", "logos"))
+    lavfi("color=white:size=160x80", os.path.join(tmp, "assets", "logos", "watermark.png"), "-frames:v", "1")
+    return {
+        "avatar": lavfi("testsrc2=size=1280x720:rate=30", os.path.join(tmp, "avatar.mp4"),
+                        "-t", str(seconds), "-pix_fmt", "yuv420p"),
+        "audio": lavfi("sine=frequency=220", os.path.join(tmp, "voice.mp3"), "-t", str(seconds)),
+        "broll": [
+            {"path": lavfi("mandelbrot=size=640x480:rate=30", os.path.join(tmp, "broll.mp4"), "-t", "3"),
+             "start": seconds * 0.25, "end": seconds * 0.25 + 3},
+            {"path": lavfi("color=teal:size=800x800", os.path.join(tmp, "still.png"), "-frames:v", "1"),
+             "start": seconds * 0.6, "end": seconds * 0.6 + 2},
+        ],
+    }
+
+
+def multi_pass(editor, inputs, output_path):
+    """Crop + watermark with the original audio, then add_captions, then add_broll: three encodes."""
+    graph = FilterGraph()
+    video = graph.add_input(inputs["avatar"])
+    audio = graph.add_input(inputs["audio"])
+    label = editor.compose(graph, video)
+    run_ffmpeg(editor.command(graph, label, f"{audio}:a", output_path))
+    editor.add_captions(output_path, TRANSCRIPT)
+    editor.add_broll(output_path, inputs["broll"])
+
+
+def single_pass(editor, inputs, output_path):
+    graph = FilterGraph()
+    video = graph.add_input(inputs["avatar"])
+    audio = graph.add_input(inputs["audio"])
+    captions = write_srt(TRANSCRIPT, media_duration(inputs["audio"]), f"{os.path.splitext(output_path)[0]}.srt")
+    label = editor.compose(graph, video, captions, inputs["broll"])
+    run_ffmpeg(editor.command(graph, label, f"{audio}:a", output_path))
+
+
+def measure(fn, editor, inputs, output_path, repeat):
+    elapsed = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(editor, inputs, output_path)
+        elapsed += time.perf_counter() - start
+    return elapsed / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-pass vs multi-pass reel assembly")
+    parser.add_argument("--seconds", type=float, default=15, help="Length of the synthetic reel")
+    parser.add_argument("--preset", default="veryfast", help="libx264 preset")
+    parser.add_argument("--crf", type=int, default=23, help="libx264 CRF")
+    parser.add_argument("--threads", type=int, default=0, help="Encoder threads (0 = auto)")
+    parser.add_argument("--repeat", type=int, default=1, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    if not shutil.which(FFMPEG):
+        sys.exit(f"{FFMPEG} not found (set FFMPEG_BIN)")
+    tmp = tempfile.mkdtemp()
+    try:
+        inputs = make_inputs(tmp, args.seconds)
+        editor = VideoEditor(os.path.join(tmp, "assets"), preset=args.preset, crf=args.crf, threads=args.threads)
+        print(f"{args.seconds:.0f}s reel, preset {args.preset}, crf {args.crf}, threads {args.threads or 'auto'}")
+        print(f"{'method':<12}{'s':>8}{'x realtime':>12}{'MB':>8}")
+        for name, fn in (("multi-pass", multi_pass), ("single-pass", single_pass)):
+            output_path = os.path.join(tmp, f"{name}.mp4")
+            seconds = measure(fn, editor, inputs, output_path, args.repeat)
+            size = os.path.getsize(output_path) / (1024 * 1024)
+            print(f"{name:<12}{seconds:>8.2f}{args.seconds / seconds:>12.2f}{size:>8.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Content Workflow V2 — Batch Runner
+==================================
+Runs many pipeline jobs in one warm process: provider clients, brand context,
+the response cache, the stage scheduler and the Chromium browser are created
+once and shared by every job.
+
+Jobs file (JSONL, one job per line — keys mirror main.py options):
+    {"name": "thyroid-week", "topic": "Thyroid myths", "variants": 3}
+    {"links": ["https://instagram.com/p/ABC123"], "style": "flatlay"}
+    {"images": ["input/inspo_pb.png"], "text_provider": "gemini", "skip_review": true}
+
+Usage:
+    python batch.py jobs.jsonl
+    python batch.py jobs.jsonl --mock
+    python batch.py jobs.jsonl --concurrency anthropic=6 google_image=3 --refresh
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Ensure the project root is on the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import PipelineResources, RESUMABLE_ARGS, parse_args, run_pipeline, logger
+from modules.metrics import StageTimings
+from modules.scraper import SCRAPER_BACKENDS, DEFAULT_CONCURRENCY as SCRAPE_CONCURRENCY
+
+JOB_KEYS = set(RESUMABLE_ARGS) | {"name", "resume"}
+
+
+def parse_batch_args():
+    parser = argparse.ArgumentParser(
+        description="Benefills Content Workflow V2 — run a JSONL file of jobs in one process",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:")[1]
+    )
+    parser.add_argument("jobs_file", type=str, help="JSONL file with one job per line")
+    parser.add_argument("--mock", action="store_true",
+                        help="Force mock mode for every job")
+    parser.add_argument("--concurrency", nargs="+", type=str, metavar="PROVIDER=N",
+                        help="Per-provider concurrency limits shared by all jobs")
+    parser.add_argument("--scraper", choices=SCRAPER_BACKENDS, default="auto",
+                        help="Scraper backend for every job (see main.py --scraper)")
+    parser.add_argument("--scrape-pages", type=int, default=SCRAPE_CONCURRENCY, metavar="N",
+                        help="Posts fetched at once by the shared scraper (see main.py --scrape-pages)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--cache", dest="cache_mode", action="store_const", const="use")
+    cache_group.add_argument("--no-cache", dest="cache_mode", action="store_const", const="off")
+    cache_group.add_argument("--refresh", dest="cache_mode", action="store_const", const="refresh")
+    parser.set_defaults(cache_mode="use")
+    return parser.parse_args()
+
+
+def load_jobs(jobs_file: str) -> list:
+    """Read the JSONL jobs file into main.py-style argument namespaces."""
+    jobs = []
+    with open(jobs_file, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = json.loads(line)
+            unknown = set(spec) - JOB_KEYS
+            if unknown:
+                logger.warning(f"Job on line {line_no}: ignoring unknown keys {sorted(unknown)}")
+
+            args = parse_args([])
+            for key in JOB_KEYS - {"name"}:
+                if key in spec:
+                    setattr(args, key, spec[key])
+            for key in ("links", "images"):
+                if isinstance(getattr(args, key), str):
+                    setattr(args, key, [getattr(args, key)])
+            jobs.append((spec.get("name", f"job_{line_no}"), args))
+    return jobs
+
+
+def print_report(report: dict):
+    print(f"\n{'='*60}")
+    print(f"  Batch Report — {len(report['jobs'])} jobs")
+    print(f"{'='*60}")
+    for job in report["jobs"]:
+        status = "✅" if job["status"] == "success" else "❌"
+        print(f"  {status} {job['name']}: {job['posts']} posts in {job['elapsed_s']:.1f}s "
+              f"({job['posts_per_minute']:.1f} posts/min)")
+    agg = report["aggregate"]
+    print(f"\n  Total: {agg['posts']} posts in {agg['elapsed_s']:.1f}s "
+          f"({agg['posts_per_minute']:.1f} posts/min)")
+    print(f"\n  {'Stage':<10}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for stage, stats in report["stage_latency"].items():
+        print(f"  {stage:<10}{stats['count']:>7}{stats['p50_s']:>10.2f}{stats['p95_s']:>10.2f}")
+    print(f"\n  📋 Report: {report['report_path']}")
+    print(f"{'='*60}\n")
+
+
+def posts_per_minute(posts: int, seconds: float) -> float:
+    return posts / (seconds / 60.0) if seconds > 0 else 0.0
+
+
+def main():
+    batch_args = parse_batch_args()
+    jobs = load_jobs(batch_args.jobs_file)
+    if not jobs:
+        logger.error(f"No jobs found in {batch_args.jobs_file}")
+        sys.exit(1)
+
+    try:
+        resources = PipelineResources(batch_args.cache_mode, batch_args.concurrency, keep_browser=True)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    batch_timings = StageTimings()
+    job_reports = []
+    started = time.perf_counter()
+
+    try:
+        for idx, (name, args) in enumerate(jobs, 1):
+            print(f"\n▶ Job {idx}/{len(jobs)}: {name}")
+            args.mock = args.mock or batch_args.mock
+            args.scraper = batch_args.scraper
+            args.scrape_pages = batch_args.scrape_pages
+            job_started = time.perf_counter()
+            try:
+                result = run_pipeline(args, resources)
+                batch_timings.merge(result["timings"])
+                job_reports.append({
+                    "name": name,
+                    "status": "success",
+                    "run_dir": result["run_dir"],
+                    "posts": result["posts"],
+                    "elapsed_s": round(result["elapsed_s"], 3),
+                    "posts_per_minute": round(posts_per_minute(result["posts"], result["elapsed_s"]), 2),
+                    "stage_latency": result["timings"].summary(),
+                })
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                logger.error(f"Job '{name}' failed: {e}")
+                job_reports.append({
+                    "name": name,
+                    "status": "failed",
+                    "error": str(e),
+                    "posts": 0,
+                    "elapsed_s": round(time.perf_counter() - job_started, 3),
+                    "posts_per_minute": 0.0,
+                })
+        resources.close()
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Batch interrupted by user.")
+        resources.close(cancel=True)
+
+    elapsed = time.perf_counter() - started
+    total_posts = sum(job["posts"] for job in job_reports)
+    output_dir = os.path.join(os.path.dirname(__file__), "output")
+    os.makedirs(output_dir, exist_ok=True)
+    report = {
+        "jobs_file": os.path.abspath(batch_args.jobs_file),
+        "jobs": job_reports,
+        "aggregate": {
+            "jobs_succeeded": sum(1 for job in job_reports if job["status"] == "success"),
+            "posts": total_posts,
+            "elapsed_s": round(elapsed, 3),
+            "posts_per_minute": round(posts_per_minute(total_posts, elapsed), 2),
+        },
+        "stage_latency": batch_timings.summary(),
+        "response_cache": resources.response_cache.summary(),
+        "image_store": dict(resources.image_store.stats) if resources.image_store else {},
+        "post_store": dict(resources.post_store.stats) if resources.post_store else {},
+        "scraper": resources.scraper_stats(),
+        "report_path": os.path.join(output_dir, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"),
+    }
+    with open(report["report_path"], 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    if any(job["status"] != "success" for job in job_reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decoding Gemini image responses.
+Compares the previous approach (response.json(), then base64-decode the
+whole inlineData string and write it) with InlineDataWriter fed 64 KB
+chunks, reporting time and peak Python heap per response.
+
+Usage:
+    python benchmarks/inline_image.py
+    python benchmarks/inline_image.py --megabytes 8 --repeat 5
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from modules.inline_data import InlineDataWriter
+
+CHUNK = 64 * 1024
+
+
+def make_body(megabytes: float) -> bytes:
+    image = os.urandom(int(megabytes * 1024 * 1024))
+    return json.dumps({
+        "candidates": [{
+            "content": {"parts": [
+                {"text": "Here is your image."},
+                {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(image).decode()}},
+            ], "role": "model"},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": {"promptTokenCount": 120, "candidatesTokenCount": 1290},
+    }).encode()
+
+
+def chunks(body: bytes):
+    # Stands in for response.iter_content(); slicing keeps only one chunk alive
+    for i in range(0, len(body), CHUNK):
+        yield body[i:i + CHUNK]
+
+
+def legacy(body: bytes, output_path: str):
+    """GoogleImageGenerator.generate as it was before modules/inline_data.py."""
+    response_json = json.loads(b"".join(chunks(body)))
+    part = response_json["candidates"][0]["content"]["parts"][1]
+    img_bytes = base64.b64decode(part["inlineData"]["data"])
+    with open(output_path, "wb") as f:
+        f.write(img_bytes)
+
+
+def streamed(body: bytes, output_path: str):
+    writer = InlineDataWriter(output_path)
+    for chunk in chunks(body):
+        writer.feed(chunk)
+    writer.finish()
+
+
+def measure(fn, body: bytes, output_path: str, repeat: int):
+    elapsed, peak = 0.0, 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(body, output_path)
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed / repeat * 1000, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming decode of inline image data")
+    parser.add_argument("--megabytes", type=float, default=4, help="Decoded image size")
+    parser.add_argument("--repeat", type=int, default=3, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    body = make_body(args.megabytes)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "image.png")
+        print(f"response {len(body) / (1024 * 1024):.1f} MB, image {args.megabytes:.1f} MB")
+        print(f"{'method':<10}{'ms':>10}{'peak MB':>10}")
+        for name, fn in (("legacy", legacy), ("streamed", streamed)):
+            ms, peak = measure(fn, body, output_path, args.repeat)
+            print(f"{name:<10}{ms:>10.1f}{peak / (1024 * 1024):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
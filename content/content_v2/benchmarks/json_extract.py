@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON extraction from large model responses.
+Compares the previous regex-based extract_json_from_text (three passes:
+json.loads, fenced-block regex, greedy {...} regex) with the single-pass
+JsonStreamParser, on whole responses and on streamed 64-char deltas.
+
+Usage:
+    python benchmarks/json_extract.py
+    python benchmarks/json_extract.py --variants 500 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from modules.json_stream import JsonStreamParser, extract_json
+
+
+def legacy_extract_json_from_text(text):
+    """extract_json_from_text as it was before modules/json_stream.py."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    json_match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', text, re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group(1).strip())
+        except json.JSONDecodeError:
+            pass
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def make_payload(variants: int) -> str:
+    captions = [{
+        "variant": i + 1,
+        "angle": ["educational", "emotional", "promotional"][i % 3],
+        "caption": ("Your thyroid needs selenium, zinc and iodine every day. " * 12).strip(),
+        "hashtags": "#benefills #thyroidhealth #guthealth #indianfood #wellness",
+    } for i in range(variants)]
+    return json.dumps(captions, indent=2)
+
+
+def make_cases(variants: int) -> dict:
+    payload = make_payload(variants)
+    return {
+        "bare": payload,
+        "fenced": f"Here are the captions:\n```json\n{payload}\n```\nLet me know if you need more.",
+        "prose": f"Here are the captions you asked for: {payload} Hope these work!",
+        "truncated": payload[:int(len(payload) * 0.8)],
+    }
+
+
+def stream(text: str, chunk: int = 64):
+    parser = JsonStreamParser()
+    for i in range(0, len(text), chunk):
+        parser.feed(text[i:i + chunk])
+    return parser.finish()
+
+
+def bench(fn, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def describe(result) -> str:
+    if result is None:
+        return "None"
+    return f"{type(result).__name__}[{len(result)}]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON extraction on large responses")
+    parser.add_argument("--variants", type=int, default=200, help="Caption variants in the payload")
+    parser.add_argument("--repeat", type=int, default=10, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    cases = make_cases(args.variants)
+    print(f"{'case':<11}{'size':>9}  {'legacy ms':>10}{'single ms':>10}{'stream ms':>10}  result (legacy / new)")
+    for name, text in cases.items():
+        legacy = bench(legacy_extract_json_from_text, text, args.repeat)
+        single = bench(extract_json, text, args.repeat)
+        streamed = bench(stream, text, args.repeat)
+        print(f"{name:<11}{len(text) // 1024:>7}KB  {legacy:>10.2f}{single:>10.2f}{streamed:>10.2f}  "
+              f"{describe(legacy_extract_json_from_text(text))} / {describe(extract_json(text))}")
+
+
+if __name__ == "__main__":
+    main()
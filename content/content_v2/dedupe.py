@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Content Workflow V2 — Duplicate Inspiration Report
+==================================================
+Reports clusters of near-duplicate inspiration images (reposts, recrops,
+re-uploads) from the perceptual-hash index that main.py maintains, optionally
+indexing more images first.
+
+Usage:
+    python dedupe.py
+    python dedupe.py input/ --threshold 6
+    python dedupe.py output/run_20250101_120000/scraped --json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Ensure the project root is on the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from modules.image_index import ImageIndex, DEFAULT_THRESHOLD, default_index_path
+from modules.utils import validate_image_file
+
+
+def iter_images(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if validate_image_file(os.path.join(root, name)):
+                        yield os.path.join(root, name)
+        elif validate_image_file(path):
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report near-duplicate inspiration images",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:")[1]
+    )
+    parser.add_argument("paths", nargs="*", help="Image files or folders to index before reporting")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help=f"Max perceptual-hash distance in bits (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--db", type=str, default=default_index_path(), help="Index database path")
+    parser.add_argument("--json", action="store_true", help="Print clusters as JSON")
+    args = parser.parse_args()
+
+    index = ImageIndex(args.db, threshold=args.threshold)
+    added = sum(1 for path in iter_images(args.paths) if index.add(path))
+    clusters = index.clusters()
+
+    if args.json:
+        print(json.dumps(clusters, indent=2))
+        return
+
+    if added:
+        print(f"Indexed {added} image(s)")
+    print(f"{len(clusters)} duplicate cluster(s) at threshold {args.threshold}")
+    for n, cluster in enumerate(clusters, 1):
+        print(f"\n  Cluster {n} ({len(cluster)} images)")
+        for image in cluster:
+            source = f"  ← {image['source_url']}" if image["source_url"] else ""
+            print(f"    {image['path']}{source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,22 +17,55 @@ Usage:
 
     # From a file of links
     python main.py --links-file input/links.txt
+
+    # Resume an interrupted run (only missing units are redone)
+    python main.py --resume run_20250101_120000
+
+    # Ignore cached LLM responses (still stores the new ones)
+    python main.py --links-file input/links.txt --refresh
+
+    # Raise per-provider concurrency for big runs
+    python main.py --links-file input/links.txt --concurrency anthropic=6 google_image=3
+
+    # Approve image spend up front without a prompt (USD cap)
+    python main.py --links-file input/links.txt --budget 2.50
+
+    # Many jobs in one warm process (see batch.py)
+    python batch.py jobs.jsonl
+
+    # Query stored posts and analyses across runs (see posts.py)
+    python posts.py --product "Seeds Boost Bar"
 """
 
 import argparse
 import json
 import os
+import shutil
 import sys
+import threading
+import time
 from datetime import datetime
 
 # Ensure the project root is on the path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from modules.scraper import ScraperFactory
+from modules.scraper import ScraperFactory, ScrapedPost, SCRAPER_BACKENDS, DEFAULT_CONCURRENCY as SCRAPE_CONCURRENCY
 from modules.analyzer import AnalyzerFactory
 from modules.caption_gen import CaptionGeneratorFactory
-from modules.image_gen import ImageGeneratorFactory, build_image_prompt
+from modules.image_gen import ImageGeneratorFactory, build_image_prompt, approval_required, confirm_image_batch, image_cost
+from modules.image_store import ImageStore, default_image_store_dir
+from modules.image_index import ImageIndex, DEFAULT_THRESHOLD, default_index_path
+from modules.post_store import PostStore, match_products, default_post_store_dir
 from modules.reviewer import ReviewerFactory
+from modules.cache import configure_response_cache
+from modules.scheduler import StageScheduler, fan_out, parse_limits, text_provider_key, image_provider_key
+from modules.checkpoint import RunCheckpoint, unit_key, link_or_copy
+from modules.metrics import StageTimings
+from modules.rate_limit import limiter_stats
+from modules.vision_input import vision_stats
+from modules.downloader import download_stats
+from modules.http_cache import configure_http_cache, http_cache_stats
+from modules.renditions import get_rendition_encoder
 from modules.logger import setup_logger, RunLogger
 from modules.utils import load_brand_context, validate_instagram_url, validate_image_file
 
@@ -40,7 +73,7 @@ from modules.utils import load_brand_context, validate_instagram_url, validate_i
 logger = setup_logger('pipeline', os.path.join(os.path.dirname(__file__), 'output'))
 
 
-def parse_args():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Benefills Content Workflow V2 — Instagram Image Post Generator",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -71,6 +104,9 @@ Examples:
                            help="Image generation style (default: lifestyle)")
     gen_group.add_argument("--variants", type=int, default=2,
                            help="Number of caption/image variants to generate (default: 2)")
+    gen_group.add_argument("--distinct-images", action="store_true",
+                           help="Generate a separate image per caption variant instead of "
+                                "sharing one image across identical prompts")
     gen_group.add_argument("--image-provider", type=str,
                            choices=["google", "dalle"],
                            default="google",
@@ -79,6 +115,9 @@ Examples:
                            choices=["claude", "gemini"],
                            default="claude",
                            help="Text/analysis provider (default: claude)")
+    gen_group.add_argument("--budget", type=float, metavar="USD",
+                           help="Approve image generation non-interactively if the estimated "
+                                "cost is within this cap (otherwise images are skipped)")
 
     # Workflow flags
     flow_group = parser.add_argument_group('Workflow Flags')
@@ -90,12 +129,248 @@ Examples:
                             help="Skip image generation — only produce captions")
     flow_group.add_argument("--skip-review", action="store_true",
                             help="Skip AI quality review step")
+    flow_group.add_argument("--resume", type=str, metavar="RUN_DIR",
+                            help="Resume an interrupted run (e.g. run_20250101_120000); "
+                                 "inputs and options are restored from that run")
+
+    # Performance
+    perf_group = parser.add_argument_group('Performance')
+    perf_group.add_argument("--concurrency", nargs="+", type=str, metavar="PROVIDER=N",
+                            help="Per-provider concurrency limits, e.g. anthropic=4 gemini=4 "
+                                 "google_image=2 dalle=2 (defaults in modules/scheduler.py)")
+
+    perf_group.add_argument("--scraper", choices=SCRAPER_BACKENDS, default="auto",
+                            help="auto: plain HTTP first, Chromium only for posts it misses (default); "
+                                 "http: never launch a browser; browser: Playwright for every post")
+    perf_group.add_argument("--scrape-pages", type=int, default=SCRAPE_CONCURRENCY, metavar="N",
+                            help="Posts fetched at once: browser pages or HTTP connections "
+                                 f"(default: {SCRAPE_CONCURRENCY})")
+    perf_group.add_argument("--dedupe-threshold", type=int, default=DEFAULT_THRESHOLD, metavar="BITS",
+                            help="Reuse the stored analysis of a near-duplicate inspiration image "
+                                 f"within this perceptual-hash distance (default: {DEFAULT_THRESHOLD}, "
+                                 "0 = identical images only; see dedupe.py)")
+    perf_group.add_argument("--no-stream", dest="stream", action="store_false",
+                            help="Wait for complete caption responses instead of streaming "
+                                 "variants into image/review as they arrive")
+
+    perf_group.add_argument("--no-batch-review", dest="batch_review", action="store_false",
+                            help="Review each variant in its own request instead of one "
+                                 "request per inspiration")
+
+    cache_group = perf_group.add_mutually_exclusive_group()
+    cache_group.add_argument("--cache", dest="cache_mode", action="store_const", const="use",
+                             help="Reuse cached LLM responses, stored posts/analyses and generated "
+                                  "images for identical inputs (default)")
+    cache_group.add_argument("--no-cache", dest="cache_mode", action="store_const", const="off",
+                             help="Bypass the response cache, post store and shared image store "
+                                  "(identical images are still generated once per run)")
+    cache_group.add_argument("--refresh", dest="cache_mode", action="store_const", const="refresh",
+                             help="Re-scrape, re-analyze and regenerate, but store the fresh results")
+    parser.set_defaults(cache_mode="use")
+
+    return parser
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+class PipelineError(Exception):
+    """Raised when a run cannot proceed (bad inputs, nothing to analyze)."""
+    pass
+
+
+class PipelineResources:
+    """
+    Long-lived objects shared by every run in one process: provider clients,
+    brand context, the stage scheduler, the response and HTTP caches, the
+    image store, the post store, the perceptual-hash image index, the
+    rendition encoder's process pool and the scraper (which keeps its
+    browser warm when `keep_browser` is set).
+    main() builds one per invocation; batch.py builds one for a whole batch.
+    """
+
+    FACTORIES = {
+        "analyzer": lambda provider, mock: AnalyzerFactory.get_analyzer(provider=provider, mock=mock),
+        "caption_gen": lambda provider, mock: CaptionGeneratorFactory.get_generator(provider=provider, mock=mock),
+        "image_gen": lambda provider, mock: ImageGeneratorFactory.get_generator(provider=provider, mock=mock),
+        "reviewer": lambda provider, mock: ReviewerFactory.get_reviewer(provider=provider, mock=mock),
+    }
+
+    def __init__(self, cache_mode: str = "use", concurrency=None, keep_browser: bool = False):
+        self.response_cache = configure_response_cache(cache_mode)
+        self.http_cache = configure_http_cache(cache_mode)
+        self.image_store = None if cache_mode == "off" else ImageStore(default_image_store_dir(), cache_mode)
+        self.image_index = None if cache_mode == "off" else ImageIndex(default_index_path())
+        self.post_store = None if cache_mode == "off" else PostStore(default_post_store_dir())
+        self.renditions = get_rendition_encoder()
+        self.cache_mode = cache_mode
+        self.scheduler = StageScheduler(parse_limits(concurrency))
+        self.keep_browser = keep_browser
+        self._brand_context = None
+        self._providers = {}
+        self._scrapers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def brand_context(self) -> dict:
+        if self._brand_context is None:
+            self._brand_context = load_brand_context()
+        return self._brand_context
+
+    def provider(self, kind: str, provider: str, mock: bool):
+        """Build a provider once per (kind, provider, mock) and reuse its client."""
+        key = (kind, provider, mock)
+        with self._lock:
+            if key not in self._providers:
+                self._providers[key] = self.FACTORIES[kind](provider, mock)
+            return self._providers[key]
+
+    def scraper(self, mock: bool, backend: str = "auto", concurrency: int = SCRAPE_CONCURRENCY):
+        key = (mock, backend, concurrency)
+        with self._lock:
+            if key not in self._scrapers:
+                self._scrapers[key] = ScraperFactory.get_scraper(
+                    mock=mock, keep_browser=self.keep_browser,
+                    concurrency=concurrency, backend=backend
+                )
+            return self._scrapers[key]
+
+    def scraper_stats(self) -> dict:
+        """How posts were fetched across every scraper so far (http / browser / failed)."""
+        totals = {}
+        for scraper in self._scrapers.values():
+            for name, count in getattr(scraper, "stats", {}).items():
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+    def close(self, cancel: bool = False):
+        self.scheduler.shutdown(wait=not cancel, cancel=cancel)
+        for scraper in self._scrapers.values():
+            scraper.close()
+        self.renditions.close(cancel=cancel)
+
+
+# Options restored from checkpoints/args.json when resuming a run
+RESUMABLE_ARGS = ("links", "links_file", "images", "topic", "style", "variants",
+                  "distinct_images", "budget", "image_provider", "text_provider", "mock",
+                  "skip_scrape", "skip_images", "skip_review")
+
+
+def prepare_run_dir(args, output_root: str):
+    """Create a fresh run directory, or reopen one for --resume and restore its options."""
+    if args.resume:
+        run_dir = args.resume if os.path.isdir(args.resume) else os.path.join(output_root, args.resume)
+        if not os.path.isdir(run_dir):
+            raise PipelineError(f"Run to resume not found: {args.resume}")
+        checkpoint = RunCheckpoint(run_dir)
+        saved_args = checkpoint.load("args")
+        if saved_args is None:
+            raise PipelineError(f"No checkpoints/args.json in {run_dir} — run cannot be resumed.")
+        for name in RESUMABLE_ARGS:
+            setattr(args, name, saved_args.get(name))
+        logger.info(f"Resuming {run_dir}")
+        return run_dir, checkpoint
 
-    return parser.parse_args()
-
-
-def collect_inputs(args) -> dict:
-    """Collect and validate all input sources."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_dir = os.path.join(output_root, f"run_{timestamp}")
+    suffix = 1
+    while os.path.exists(run_dir):
+        # Batch jobs can start within the same second
+        suffix += 1
+        run_dir = os.path.join(output_root, f"run_{timestamp}_{suffix}")
+    os.makedirs(run_dir)
+    checkpoint = RunCheckpoint(run_dir)
+
+    # Absolute paths so the run can be resumed from any working directory
+    if args.links_file:
+        args.links_file = os.path.abspath(args.links_file)
+    if args.images:
+        args.images = [os.path.abspath(p) for p in args.images]
+    checkpoint.save("args", {name: getattr(args, name) for name in RESUMABLE_ARGS})
+    return run_dir, checkpoint
+
+
+def scrape_with_checkpoint(scraper, links: list, scraped_dir: str, checkpoint: RunCheckpoint,
+                           post_store=None, stored=()) -> list:
+    """
+    Scrape only links without a checkpoint; inspo_N names follow the link order.
+    Links in `stored` are restored from the post store instead of scraped.
+    """
+    done = checkpoint.load("scrape") or {}
+    done = {url: post for url, post in done.items() if os.path.isfile(post["image_path"])}
+    missing = [url for url in links if url not in done]
+    if len(missing) < len(links):
+        print(f"       Reusing {len(links) - len(missing)} scraped posts from checkpoint")
+
+    def dest_path(url, ext):
+        return os.path.join(scraped_dir, f"inspo_{links.index(url) + 1}{ext}")
+
+    os.makedirs(scraped_dir, exist_ok=True)
+    restored = 0
+    for url in [url for url in missing if url in stored]:
+        record = post_store.restore_post(url, lambda ext: dest_path(url, ext))
+        if record is not None:
+            done[url] = record
+            restored += 1
+    if restored:
+        checkpoint.save("scrape", done)
+        print(f"       Restored {restored} posts from the post store")
+        missing = [url for url in missing if url not in done]
+
+    if missing:
+        batch_dir = os.path.join(scraped_dir, "_batch")
+
+        def on_scraped(post):
+            dest = dest_path(post.source_url, os.path.splitext(post.image_path)[1])
+            os.replace(post.image_path, dest)
+            post.image_path = dest
+            done[post.source_url] = post.to_dict()
+            checkpoint.save("scrape", done)
+
+        scraper.scrape_posts(missing, batch_dir, on_scraped=on_scraped)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    return [ScrapedPost(**done[url]) for url in links if url in done]
+
+
+def plan_image_jobs(args, image_gen, image_store, checkpoint, analysis_keys, analyses, brand_context):
+    """
+    Work out which images the run still has to pay for: not checkpointed by an
+    earlier attempt and not already in the image store. Returns (prompts, count).
+    """
+    prompts, count, seen = [], 0, set()
+    for a_key, analysis in zip(analysis_keys, analyses):
+        pending = [v for v in range(1, args.variants + 1) if not checkpoint.has_image(f"image_{a_key}_v{v}")]
+        if not pending:
+            continue
+        if args.distinct_images:
+            # Each variant's prompt follows its caption's angle, keyed as in generate_image.
+            # Captions not written yet (fresh run) can't be looked up, so those are counted.
+            captions = checkpoint.load(f"captions_{a_key}") or []
+            for v in pending:
+                if v > len(captions):
+                    count += 1
+                    continue
+                prompt = build_image_prompt(analysis, brand_context, captions[v - 1])
+                if not image_store.contains(image_gen, prompt, args.style, salt=f"{a_key}_v{v}"):
+                    count += 1
+                    prompts.append(prompt)
+        else:
+            # The store generates an identical prompt once, however many analyses share it
+            prompt = build_image_prompt(analysis, brand_context)
+            if prompt not in seen and not image_store.contains(image_gen, prompt, args.style):
+                count += 1
+                prompts.append(prompt)
+            seen.add(prompt)
+    return prompts, count
+
+
+def collect_inputs(args, post_store=None) -> dict:
+    """
+    Collect and validate all input sources. Links already in `post_store`
+    are listed under "stored" so the scrape step can skip them.
+    """
     links = []
     images = []
 
@@ -126,33 +401,70 @@ def collect_inputs(args) -> dict:
                 logger.warning(f"Invalid image file (skipping): {path}")
 
     if not links and not images and not args.topic:
-        logger.error("No valid inputs provided. Use --links, --links-file, --images, or --topic.")
-        sys.exit(1)
+        raise PipelineError("No valid inputs provided. Use --links, --links-file, --images, or --topic.")
 
-    return {"links": links, "images": images, "topic": args.topic}
+    stored = post_store.known_urls(links) if post_store else []
+    return {"links": links, "images": images, "topic": args.topic, "stored": stored}
 
 
-def main():
-    args = parse_args()
+def run_pipeline(args, resources: PipelineResources) -> dict:
+    """
+    Run one end-to-end generation with the given options.
+    Returns a summary (run_dir, posts, elapsed, stage timings); raises on failure
+    after saving run_log.json.
+    """
+    started = time.perf_counter()
+    timings = StageTimings()
+    scheduler = resources.scheduler
 
-    # Setup run output directory
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Setup run output directory (or reopen it for --resume)
     project_root = os.path.dirname(__file__)
-    run_dir = os.path.join(project_root, "output", f"run_{timestamp}")
-    os.makedirs(run_dir, exist_ok=True)
-
-    run_log = RunLogger(run_dir)
+    run_dir, checkpoint = prepare_run_dir(args, os.path.join(project_root, "output"))
+
+    run_log = RunLogger(run_dir, resume=bool(args.resume))
+    image_store = resources.image_store or ImageStore(checkpoint.images_dir)
+    image_stats_before = dict(image_store.stats)
+    post_store = resources.post_store
+    # Stored posts/analyses are read only in "use" mode; --refresh still writes them
+    reuse = resources.cache_mode == "use"
+    post_stats_before = dict(post_store.stats) if post_store else {}
+    vision_before = vision_stats()
+    downloads_before = download_stats()
+    http_cache_before = http_cache_stats()
+    renditions = resources.renditions
+    renditions_before = renditions.summary()
 
     print(f"\n{'='*60}")
     print(f"  Benefills Content Workflow V2")
-    print(f"  {'[MOCK MODE]' if args.mock else ''}")
+    print(f"  {'[MOCK MODE]' if args.mock else ''}{' [RESUMED]' if args.resume else ''}")
     print(f"  Output → {run_dir}")
     print(f"{'='*60}\n")
 
+    def save_run_log():
+        run_log.log_stats("response_cache", resources.response_cache.summary())
+        run_log.log_stats("image_store", {
+            name: count - image_stats_before.get(name, 0) for name, count in image_store.stats.items()
+        })
+        if post_store:
+            run_log.log_stats("post_store", {
+                name: count - post_stats_before.get(name, 0) for name, count in post_store.stats.items()
+            })
+        run_log.log_stats("checkpoint", {"resumed": bool(args.resume), "checkpoints_loaded": checkpoint.loaded})
+        run_log.log_stats("stage_latency", timings.summary())
+        run_log.log_stats("rate_limit", limiter_stats())
+        run_log.log_stats("vision_input", vision_stats(since=vision_before))
+        run_log.log_stats("downloads", download_stats(since=downloads_before))
+        run_log.log_stats("http_cache", http_cache_stats(since=http_cache_before))
+        run_log.log_stats("renditions", {
+            name: round(value - renditions_before.get(name, 0), 4)
+            for name, value in renditions.summary().items() if name != "bytes_saved_pct"
+        })
+        return run_log.save()
+
     try:
         # ── Step 1: Load Brand Context ──────────────────────────
         print("[1/6] Loading brand context...")
-        brand_context = load_brand_context()
+        brand_context = resources.brand_context
         run_log.log_step("load_brand_context", "success", {
             "brand": brand_context.get("brand_name")
         })
@@ -160,64 +472,119 @@ def main():
 
         # ── Step 2: Collect & Validate Inputs ───────────────────
         print("[2/6] Collecting inputs...")
-        inputs = collect_inputs(args)
+        inputs = collect_inputs(args, post_store if reuse else None)
         run_log.log_step("collect_inputs", "success", {
             "links": len(inputs["links"]),
+            "links_stored": len(inputs["stored"]),
             "images": len(inputs["images"])
         })
-        print(f"       Found {len(inputs['links'])} links, {len(inputs['images'])} images")
+        stored_note = f" ({len(inputs['stored'])} already in the post store)" if inputs["stored"] else ""
+        print(f"       Found {len(inputs['links'])} links{stored_note}, {len(inputs['images'])} images")
 
+        analyzer = resources.provider("analyzer", args.text_provider, args.mock)
         all_analyses = []
+        analysis_keys = []
+        reused = 0
         if inputs["topic"]:
             # ── Scratch Mode ────────────────────────────────────────
             print(f"[4/6] Generating concept for topic: '{inputs['topic']}'...")
-            
+
             # Use 'analyze_inspo' analyzer for now, but we call generate_concept
             # Ideally we might want a separate factory for ideators, but reusing analyzer is fine
-            analyzer = AnalyzerFactory.get_analyzer(
-                provider=args.text_provider, mock=args.mock
-            )
-            
-            concept = analyzer.generate_concept(inputs["topic"], brand_context)
+            concept = checkpoint.load("concept")
+            if concept is None:
+                with timings.time("analyze"):
+                    concept = analyzer.generate_concept(inputs["topic"], brand_context)
+                checkpoint.save("concept", concept)
+                print(f"       Concept generated for topic.")
+            else:
+                print(f"       Concept restored from checkpoint.")
             all_analyses.append(concept)
-            print(f"       Concept generated for topic.")
+            analysis_keys.append(unit_key(f"topic:{inputs['topic']}"))
 
         else:
             # ── Inspiration Mode ────────────────────────────────────
             # ── Step 3: Scrape / Load Inspiration ───────────────────
             print("[3/6] Fetching inspiration content...")
-            scraper = ScraperFactory.get_scraper(mock=args.mock)
+            scraper = resources.scraper(args.mock, args.scraper, args.scrape_pages)
             scraped_dir = os.path.join(run_dir, "scraped")
             scraped_posts = []
 
             if inputs["links"] and not args.skip_scrape:
-                scraped_posts.extend(scraper.scrape_posts(inputs["links"], scraped_dir))
+                with timings.time("scrape"):
+                    scraped_posts.extend(
+                        scrape_with_checkpoint(scraper, inputs["links"], scraped_dir, checkpoint,
+                                               post_store, inputs["stored"])
+                    )
 
             if inputs["images"]:
                 scraped_posts.extend(scraper.load_local_images(inputs["images"], scraped_dir))
 
+            # Per-URL latency: recorded in the log and as the scrape_url stage
+            url_timings = scraper.pop_url_timings()
+            for entry in url_timings:
+                timings.record("scrape_url", entry["seconds"])
+
             if not scraped_posts:
-                logger.error("No inspiration content could be loaded.")
-                run_log.log_step("scrape", "failed", {"reason": "no content loaded"})
-                run_log.save()
-                sys.exit(1)
+                run_log.log_step("scrape", "failed", {"reason": "no content loaded", "urls": url_timings})
+                raise PipelineError("No inspiration content could be loaded.")
 
             run_log.log_step("scrape", "success", {
-                "posts_scraped": len(scraped_posts)
+                "posts_scraped": len(scraped_posts),
+                "browser_needed": sum(1 for entry in url_timings if entry.get("backend") == "browser"),
+                "urls": url_timings
             })
             print(f"       Loaded {len(scraped_posts)} inspiration posts")
 
             # ── Step 4: Analyze Inspiration ─────────────────────────
             print("[4/6] Analyzing inspiration content...")
-            analyzer = AnalyzerFactory.get_analyzer(
-                provider=args.text_provider, mock=args.mock
-            )
+
+            # The same image (exact, or a near-duplicate repost/recrop) analysed
+            # by the same analyzer, model and prompt reuses the stored analysis
+            index = resources.image_index
+            identity = analyzer.identity(brand_context)
 
             for i, post in enumerate(scraped_posts):
-                print(f"       Analyzing post {i+1}/{len(scraped_posts)}...")
-                analysis = analyzer.analyze(post.image_path, post.caption, brand_context)
-                analysis["_source"] = post.to_dict()
+                a_key = unit_key(post.source_url)
+                analysis = checkpoint.load(f"analysis_{a_key}")
+                if analysis is None:
+                    image_sha = post_store.save_post(post) if post_store else None
+                    exact = False
+                    if index:
+                        index.add(post.image_path, post.source_url)
+                    if image_sha and reuse:
+                        analysis = post_store.get_analysis(image_sha, identity)
+                        if analysis is not None:
+                            exact = True
+                            print(f"       Post {i+1}/{len(scraped_posts)} analysis restored from the post store")
+                        elif index:
+                            match = index.find_similar(post.image_path, post_store.analyzed_images(identity),
+                                                       threshold=args.dedupe_threshold)
+                            if match:
+                                match_sha, match_path, distance = match
+                                # The row can have gone since analyzed_images() (another writer); analyze then
+                                analysis = post_store.get_analysis(match_sha, identity)
+                                if analysis is not None:
+                                    analysis["_reused_from"] = {"path": match_path, "distance": distance}
+                                    print(f"       Post {i+1}/{len(scraped_posts)} matches "
+                                          f"{os.path.basename(match_path)} (distance {distance}) — reusing its analysis")
+                    if analysis is not None:
+                        reused += 1
+                    else:
+                        print(f"       Analyzing post {i+1}/{len(scraped_posts)}...")
+                        with timings.time("analyze"):
+                            analysis = analyzer.analyze(post.image_path, post.caption, brand_context)
+                    if image_sha and not exact:
+                        # Near-duplicates get their own row, so exact lookups hit next time
+                        post_store.save_analysis(image_sha, identity, analysis, match_products(
+                            analysis, post.caption, brand_context.get("products", [])
+                        ))
+                    analysis["_source"] = post.to_dict()
+                    checkpoint.save(f"analysis_{a_key}", analysis)
+                else:
+                    print(f"       Post {i+1}/{len(scraped_posts)} analysis restored from checkpoint")
                 all_analyses.append(analysis)
+                analysis_keys.append(a_key)
 
         # Save combined analysis
         analysis_path = os.path.join(run_dir, "analysis.json")
@@ -225,28 +592,163 @@ def main():
             json.dump(all_analyses, f, indent=2)
 
         run_log.log_step("analyze", "success", {
-            "analyses_count": len(all_analyses)
+            "analyses_count": len(all_analyses),
+            "analyses_reused": reused
         })
         print(f"       Analysis saved to analysis.json")
 
         # ── Step 5: Generate Content Bundles ────────────────────
         print(f"[5/6] Generating {args.variants} post variants per inspiration...")
-        caption_gen = CaptionGeneratorFactory.get_generator(
-            provider=args.text_provider, mock=args.mock
-        )
-        image_gen = ImageGeneratorFactory.get_generator(
-            provider=args.image_provider, mock=args.mock
-        )
-        reviewer = ReviewerFactory.get_reviewer(
-            provider=args.text_provider, mock=args.mock
-        )
+        caption_gen = resources.provider("caption_gen", args.text_provider, args.mock)
+        image_gen = resources.provider("image_gen", args.image_provider, args.mock)
+        reviewer = resources.provider("reviewer", args.text_provider, args.mock)
 
-        post_count = 0
-        for a_idx, analysis in enumerate(all_analyses):
-            # Generate captions
-            captions = caption_gen.generate(analysis, brand_context, args.variants)
+        text_key = text_provider_key(args.text_provider)
+        review_key = text_provider_key("claude")  # ReviewerFactory is Claude-only
 
-            for v_idx, variant in enumerate(captions):
+        image_key = image_provider_key(args.image_provider)
+
+        # Preflight: price every image the run still needs and approve them once,
+        # so the image tasks below can be dispatched concurrently
+        generate_images = not args.skip_images
+        if generate_images:
+            prompts, image_count = plan_image_jobs(
+                args, image_gen, image_store, checkpoint, analysis_keys, all_analyses, brand_context
+            )
+            if image_count:
+                generate_images = confirm_image_batch(
+                    image_gen, prompts, image_count, budget=args.budget,
+                    interactive=image_key == "google_image" and not args.mock and approval_required()
+                )
+                run_log.log_step("image_preflight", "success" if generate_images else "skipped", {
+                    "images": image_count,
+                    "model": image_gen.model_name,
+                    "cost_per_image_usd": image_cost(image_gen.model_name),
+                    "budget": args.budget,
+                })
+
+        # Each unit checks its checkpoint first, so --resume only pays for missing work
+        def generate_image(unit, image_prompt, salt):
+            """Returns (image path, renditions future); the future is None when nothing is encoded."""
+            path = checkpoint.load_image(unit)
+            if not path:
+                # Identical prompts (every variant of one analysis, unless --distinct-images)
+                # are generated once and shared through the content-addressed store
+                with timings.time("image"):
+                    path = image_store.generate(image_gen, image_prompt, style=args.style, salt=salt)
+                if path:
+                    checkpoint.save(unit, {"path": path})
+            if not path:
+                return None, None
+            # Encode in the background; the post loop places the result
+            return path, renditions.submit(path)
+
+        def review_variant(unit, caption_text, image_prompt, analysis):
+            review = checkpoint.load(unit)
+            if review is None:
+                with timings.time("review"):
+                    review = reviewer.review(caption_text, image_prompt, analysis, brand_context)
+                checkpoint.save(unit, review)
+            return review
+
+        def review_variants(a_key, analysis, jobs):
+            """Review all variants of one analysis in a single request (missing ones only on resume)."""
+            units = [f"review_{a_key}_v{v_idx + 1}" for v_idx in range(len(jobs))]
+            reviews = [checkpoint.load(unit) for unit in units]
+            missing = [v_idx for v_idx, review in enumerate(reviews) if review is None]
+            if missing:
+                with timings.time("review"):
+                    fresh = reviewer.review_batch([
+                        {"caption": jobs[v_idx][0].get("caption", ""), "image_prompt": jobs[v_idx][1]}
+                        for v_idx in missing
+                    ], analysis, brand_context)
+                for v_idx, review in zip(missing, fresh):
+                    checkpoint.save(units[v_idx], review)
+                    reviews[v_idx] = review
+            return reviews
+
+        def submit_variant(a_key, analysis, v_idx, variant):
+            """Fan out the image (+ per-variant review) tasks for one caption variant."""
+            if args.distinct_images:
+                image_prompt = build_image_prompt(analysis, brand_context, variant)
+                salt = f"{a_key}_v{v_idx + 1}"
+            else:
+                image_prompt = build_image_prompt(analysis, brand_context)
+                salt = ""
+            image_future = None
+            if generate_images:
+                image_future = scheduler.submit(
+                    image_key, generate_image, f"image_{a_key}_v{v_idx + 1}", image_prompt, salt
+                )
+            review_future = None
+            if not args.skip_review and not args.batch_review:
+                review_future = scheduler.submit(
+                    review_key, review_variant, f"review_{a_key}_v{v_idx + 1}",
+                    variant.get("caption", ""), image_prompt, analysis
+                )
+            return variant, image_prompt, image_future, review_future
+
+        def stream_captions(a_key, analysis):
+            """
+            Start each variant's image (and per-variant review) task as soon as that
+            variant arrives — streamed from the provider unless --no-stream.
+            """
+            jobs, captions = [], []
+            started = time.perf_counter()
+            try:
+                if args.stream:
+                    source = caption_gen.stream(analysis, brand_context, args.variants)
+                else:
+                    source = caption_gen.generate(analysis, brand_context, args.variants)
+                for variant in source:
+                    if not captions:
+                        timings.record("caption_first", time.perf_counter() - started)
+                    captions.append(variant)
+                    jobs.append(submit_variant(a_key, analysis, len(jobs), variant))
+            except Exception as e:
+                if not jobs:
+                    raise
+                # Keep the variants that already arrived; captions are redone on --resume
+                logger.warning(f"Caption stream failed after {len(jobs)} variant(s): {e}")
+                run_log.log_error(f"caption_stream_{a_key}", str(e))
+                return jobs
+            timings.record("caption", time.perf_counter() - started)
+            checkpoint.save(f"captions_{a_key}", captions)
+            return jobs
+
+        def generate_variants(a_key, analysis):
+            """Caption one analysis and schedule its images and reviews; returns the per-variant jobs."""
+            captions = checkpoint.load(f"captions_{a_key}")
+            if captions is not None:
+                jobs = [submit_variant(a_key, analysis, v_idx, v) for v_idx, v in enumerate(captions)]
+            else:
+                jobs = stream_captions(a_key, analysis)
+
+            if args.skip_review or not args.batch_review or not jobs:
+                return jobs
+            # Reviews wait for the full variant set so one request can score them all
+            review_futures = fan_out(
+                scheduler.submit(review_key, review_variants, a_key, analysis, jobs), len(jobs)
+            )
+            return [job[:3] + (review_future,) for job, review_future in zip(jobs, review_futures)]
+
+        # Every analysis' caption → image/review chain runs concurrently;
+        # results are collected below in input order so post_N stays stable.
+        plan_futures = [
+            scheduler.submit(text_key, generate_variants, a_key, analysis)
+            for a_key, analysis in zip(analysis_keys, all_analyses)
+        ]
+
+        post_count = 0
+        for a_idx, plan_future in enumerate(plan_futures):
+            try:
+                jobs = plan_future.result()
+            except Exception as e:
+                logger.error(f"Caption generation failed for inspiration {a_idx + 1}: {e}")
+                run_log.log_error(f"caption_gen_inspiration_{a_idx + 1}", str(e))
+                continue
+
+            for v_idx, (variant, image_prompt, image_future, review_future) in enumerate(jobs):
                 post_count += 1
                 post_dir = os.path.join(run_dir, f"post_{post_count}")
                 os.makedirs(post_dir, exist_ok=True)
@@ -260,27 +762,26 @@ def main():
                 with open(caption_path, 'w') as f:
                     f.write(full_caption)
 
-                # Build image prompt from analysis
-                image_prompt = build_image_prompt(analysis, brand_context)
-
-                # Generate image (unless skipped)
+                # Collect image (unless skipped)
                 image_path = None
-                if not args.skip_images:
-                    image_path = os.path.join(post_dir, "image.png")
+                placed = {}
+                if image_future is not None:
                     try:
-                        image_gen.generate(image_prompt, image_path, style=args.style)
+                        generated_path, encoding = image_future.result()
+                        if generated_path:
+                            image_path = os.path.join(post_dir, "image.png")
+                            link_or_copy(generated_path, image_path)
+                            # Instagram-ready upload + gallery thumbnails beside image.png
+                            placed = renditions.place(encoding, post_dir)
                     except Exception as e:
                         logger.error(f"Image generation failed for post {post_count}: {e}")
                         run_log.log_error(f"image_gen_post_{post_count}", str(e))
-                        image_path = None
 
-                # Review (unless skipped)
+                # Collect review (unless skipped)
                 review_data = {}
-                if not args.skip_review:
+                if review_future is not None:
                     try:
-                        review_data = reviewer.review(
-                            caption_text, image_prompt, analysis, brand_context
-                        )
+                        review_data = review_future.result()
                     except Exception as e:
                         logger.error(f"Review failed for post {post_count}: {e}")
                         run_log.log_error(f"review_post_{post_count}", str(e))
@@ -295,8 +796,9 @@ def main():
                     "text_provider": args.text_provider,
                     "image_prompt_used": image_prompt,
                     "image_generated": image_path is not None,
+                    "renditions": sorted(placed),
                     "review": review_data,
-                    "inspiration_source": analysis.get("_source", {}).get("source_url", "unknown")
+                    "inspiration_source": all_analyses[a_idx].get("_source", {}).get("source_url", "unknown")
                 }
 
                 metadata_path = os.path.join(post_dir, "metadata.json")
@@ -314,7 +816,7 @@ def main():
         # ── Step 6: Final Summary ───────────────────────────────
         print(f"\n[6/6] Pipeline complete!")
         run_log.log_step("complete", "success")
-        log_path = run_log.save()
+        log_path = save_run_log()
 
         print(f"\n{'='*60}")
         print(f"  ✅ DONE — {post_count} posts generated")
@@ -322,30 +824,62 @@ def main():
         print(f"  📋 Run log: {log_path}")
         print(f"{'='*60}\n")
 
-        # Print generated captions for quick review
-        print("── Quick Caption Preview ──\n")
-        for i in range(1, post_count + 1):
-            caption_file = os.path.join(run_dir, f"post_{i}", "caption.txt")
-            if os.path.isfile(caption_file):
-                with open(caption_file, 'r') as f:
-                    content = f.read()
-                # Show first 200 chars
-                preview = content[:200] + "..." if len(content) > 200 else content
-                print(f"Post {i}:")
-                print(f"  {preview}\n")
+        return {
+            "run_dir": run_dir,
+            "posts": post_count,
+            "elapsed_s": time.perf_counter() - started,
+            "timings": timings,
+        }
 
     except KeyboardInterrupt:
-        print("\n\n⚠️  Pipeline interrupted by user.")
         run_log.log_error("pipeline", "Interrupted by user")
-        run_log.save()
-        sys.exit(1)
+        save_run_log()
+        raise
 
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}")
         run_log.log_error("pipeline", str(e))
-        run_log.save()
-        print(f"\n❌ ERROR: {str(e)}")
+        save_run_log()
         print(f"   Check logs at: {run_dir}/run_log.json")
+        raise
+
+
+def print_caption_preview(run_dir: str, post_count: int):
+    """Print the first 200 chars of every generated caption for quick review."""
+    print("── Quick Caption Preview ──\n")
+    for i in range(1, post_count + 1):
+        caption_file = os.path.join(run_dir, f"post_{i}", "caption.txt")
+        if os.path.isfile(caption_file):
+            with open(caption_file, 'r') as f:
+                content = f.read()
+            # Show first 200 chars
+            preview = content[:200] + "..." if len(content) > 200 else content
+            print(f"Post {i}:")
+            print(f"  {preview}\n")
+
+
+def main():
+    args = parse_args()
+
+    try:
+        resources = PipelineResources(args.cache_mode, args.concurrency)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    try:
+        result = run_pipeline(args, resources)
+        resources.close()
+        print_caption_preview(result["run_dir"], result["posts"])
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Pipeline interrupted by user.")
+        resources.close(cancel=True)
+        sys.exit(1)
+
+    except Exception as e:
+        resources.close(cancel=True)
+        print(f"\n❌ ERROR: {str(e)}")
         sys.exit(1)
 
 
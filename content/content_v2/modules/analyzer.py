@@ -7,11 +7,15 @@ of what makes it effective, using Claude or Gemini.
 import os
 import json
 import base64
+import hashlib
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
 
 from .logger import setup_logger
 from .utils import load_prompt, load_brand_context, extract_json_from_text
+from .cache import get_response_cache
+from .vision_input import get_vision_preprocessor
+from .rate_limit import rate_limited, estimate_tokens
 
 logger = setup_logger('analyzer')
 
@@ -19,6 +23,19 @@ logger = setup_logger('analyzer')
 class BaseAnalyzer(ABC):
     """Abstract analyzer — swap between LLM providers."""
 
+    model_name = ""
+
+    def identity(self, brand_context: dict) -> dict:
+        """Analyzer, model and prompt version — what a stored analysis is only valid for."""
+        digest = hashlib.sha256(load_prompt("analyze_inspo").encode('utf-8'))
+        # Products, topics and audience are part of the user prompt
+        digest.update(json.dumps(brand_context, sort_keys=True).encode('utf-8'))
+        return {
+            "analyzer": type(self).__name__,
+            "model": self.model_name,
+            "prompt_version": digest.hexdigest()[:12],
+        }
+
     @abstractmethod
     def analyze(self, image_path: str, caption: str, brand_context: dict) -> dict:
         pass
@@ -41,6 +58,20 @@ class ClaudeAnalyzer(BaseAnalyzer):
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in .env")
         self.client = Anthropic(api_key=self.api_key)
+        self.model_name = "claude-sonnet-4-5-20250929"
+
+    def _create_message(self, system_prompt: str, content, max_tokens: int, estimate: int) -> str:
+        """Rate-limited messages.create returning the response text."""
+        return rate_limited(
+            "anthropic", self.model_name,
+            lambda: self.client.messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=[{"role": "user", "content": content}]
+            ).content[0].text,
+            tokens=estimate
+        )
 
     def analyze(self, image_path: str, caption: str, brand_context: dict) -> dict:
         system_prompt = load_prompt("analyze_inspo")
@@ -49,23 +80,19 @@ class ClaudeAnalyzer(BaseAnalyzer):
         content = []
 
         # Add image if it's a real image file (not a mock text file)
+        image_bytes = b""
+        vision = None
         if image_path and os.path.isfile(image_path) and not image_path.endswith('.txt'):
             try:
-                with open(image_path, 'rb') as f:
-                    image_data = base64.standard_b64encode(f.read()).decode('utf-8')
-
-                # Determine media type
-                ext = os.path.splitext(image_path)[1].lower()
-                media_types = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
-                               '.png': 'image/png', '.webp': 'image/webp'}
-                media_type = media_types.get(ext, 'image/jpeg')
-
+                # Downsized, metadata-free copy — the model doesn't need the full-resolution upload
+                vision = get_vision_preprocessor().prepare(image_path)
+                image_bytes = vision.data
                 content.append({
                     "type": "image",
                     "source": {
                         "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data
+                        "media_type": vision.media_type,
+                        "data": base64.standard_b64encode(image_bytes).decode('utf-8')
                     }
                 })
             except Exception as e:
@@ -88,19 +115,21 @@ Provide a structured analysis as JSON following the framework in your system pro
 """
         content.append({"type": "text", "text": user_text})
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2000,
-            system=system_prompt,
-            messages=[{"role": "user", "content": content}]
+        response_text = get_response_cache().get_or_call(
+            lambda: self._create_message(
+                system_prompt, content, 2000,
+                estimate_tokens(system_prompt, user_text, images=1 if image_bytes else 0, max_output=2000)
+            ),
+            provider="anthropic", model=self.model_name, system=system_prompt,
+            user=user_text, images=[image_bytes], params={"max_tokens": 2000}
         )
-
-        response_text = message.content[0].text
         analysis = extract_json_from_text(response_text)
 
-        if analysis is None:
-            logger.warning("Could not parse JSON from analysis response, returning raw text")
+        if not isinstance(analysis, dict):
+            logger.warning("Analysis response had no JSON object, returning raw text")
             analysis = {"raw_analysis": response_text}
+        if vision is not None:
+            analysis["_vision_input"] = vision.report()
 
         return analysis
 
@@ -119,18 +148,18 @@ Brand Context:
 Generate a detailed concept for an Instagram post about this topic.
 """
         
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2000,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
+        response_text = get_response_cache().get_or_call(
+            lambda: self._create_message(
+                system_prompt, user_prompt, 2000,
+                estimate_tokens(system_prompt, user_prompt, max_output=2000)
+            ),
+            provider="anthropic", model=self.model_name, system=system_prompt,
+            user=user_prompt, params={"max_tokens": 2000}
         )
-        
-        response_text = message.content[0].text
         analysis = extract_json_from_text(response_text)
         
-        if analysis is None:
-            logger.warning("Could not parse JSON from concept generation, returning raw text")
+        if not isinstance(analysis, dict):
+            logger.warning("Concept response had no JSON object, returning raw text")
             analysis = {"raw_analysis": response_text}
             
         # Add metadata so downstream tools know source
@@ -152,7 +181,16 @@ class GeminiAnalyzer(BaseAnalyzer):
 
         import google.generativeai as genai
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model_name = 'gemini-2.0-flash'
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _generate(self, parts, estimate: int) -> str:
+        """Rate-limited generate_content returning the response text."""
+        return rate_limited(
+            "gemini", self.model_name,
+            lambda: self.model.generate_content(parts).text,
+            tokens=estimate
+        )
 
     def analyze(self, image_path: str, caption: str, brand_context: dict) -> dict:
         system_prompt = load_prompt("analyze_inspo")
@@ -160,11 +198,13 @@ class GeminiAnalyzer(BaseAnalyzer):
         parts = []
 
         # Add image if valid
+        image_bytes = b""
+        vision = None
         if image_path and os.path.isfile(image_path) and not image_path.endswith('.txt'):
             try:
-                import PIL.Image
-                img = PIL.Image.open(image_path)
-                parts.append(img)
+                vision = get_vision_preprocessor().prepare(image_path)
+                image_bytes = vision.data
+                parts.append({"mime_type": vision.media_type, "data": image_bytes})
             except Exception as e:
                 logger.warning(f"Could not load image for Gemini analysis: {e}")
 
@@ -183,11 +223,17 @@ Return structured JSON analysis.
 """
         parts.append(user_text)
 
-        response = self.model.generate_content(parts)
-        analysis = extract_json_from_text(response.text)
+        response_text = get_response_cache().get_or_call(
+            lambda: self._generate(parts, estimate_tokens(user_text, images=1 if image_bytes else 0)),
+            provider="gemini", model=self.model_name, system="",
+            user=user_text, images=[image_bytes]
+        )
+        analysis = extract_json_from_text(response_text)
 
-        if analysis is None:
-            analysis = {"raw_analysis": response.text}
+        if not isinstance(analysis, dict):
+            analysis = {"raw_analysis": response_text}
+        if vision is not None:
+            analysis["_vision_input"] = vision.report()
 
         return analysis
 
@@ -207,11 +253,14 @@ Brand Context:
 Generate structured JSON concept.
 """
         
-        response = self.model.generate_content(user_prompt)
-        analysis = extract_json_from_text(response.text)
+        response_text = get_response_cache().get_or_call(
+            lambda: self._generate(user_prompt, estimate_tokens(user_prompt)),
+            provider="gemini", model=self.model_name, system="", user=user_prompt
+        )
+        analysis = extract_json_from_text(response_text)
         
-        if analysis is None:
-            analysis = {"raw_analysis": response.text}
+        if not isinstance(analysis, dict):
+            analysis = {"raw_analysis": response_text}
             
         analysis["_source"] = {"type": "scratch", "topic": topic}
         
@@ -221,6 +270,8 @@ Generate structured JSON concept.
 class MockAnalyzer(BaseAnalyzer):
     """Mock analyzer for testing."""
 
+    model_name = "mock"
+
     def analyze(self, image_path: str, caption: str, brand_context: dict) -> dict:
         logger.info("[MOCK] Analyzing inspiration content")
         return {
@@ -0,0 +1,255 @@
+"""
+Response cache module.
+Content-addressed on-disk cache for LLM responses. Entries are keyed on a
+hash of provider, model, system prompt, user content and any image bytes,
+so reruns over the same inspiration return instantly instead of paying
+for another API round trip.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+
+logger = setup_logger('cache')
+
+# Bump to invalidate every stored entry (e.g. after a response-format change)
+CACHE_VERSION = 1
+
+CACHE_MODES = ("use", "off", "refresh")
+
+
+class ResponseCache:
+    """
+    File-per-entry cache with TTL expiry and size-bounded LRU eviction.
+
+    Modes:
+      use     — read hits, write misses (default)
+      refresh — ignore existing entries but store fresh responses
+      off     — bypass the cache entirely
+    """
+
+    def __init__(self, cache_dir: str, mode: str = "use",
+                 ttl_seconds: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    # ── Keys ────────────────────────────────────────────────
+
+    @staticmethod
+    def make_key(provider: str, model: str, system: str, user,
+                 images: Iterable[bytes] = (), params: Optional[dict] = None) -> str:
+        digest = hashlib.sha256()
+        header = {
+            "v": CACHE_VERSION,
+            "provider": provider,
+            "model": model,
+            "system": system,
+            "user": user,
+            "params": params or {},
+        }
+        digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        for image_bytes in images:
+            if image_bytes:
+                digest.update(hashlib.sha256(image_bytes).digest())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    # ── Read / write ────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[str]:
+        if self.mode != "use":
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError):
+            # Truncated or corrupt (e.g. a crash mid-write before atomic writes): drop it
+            self._remove(path)
+            entry = None
+        if not isinstance(entry, dict):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            with self._lock:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+            return None
+
+        # Touch for LRU ordering
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.stats["hits"] += 1
+        return entry.get("text")
+
+    def put(self, key: str, text: str, meta: Optional[dict] = None):
+        if self.mode == "off" or not isinstance(text, str):
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({"created_at": time.time(), "meta": meta or {}, "text": text})
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(payload.encode('utf-8')) - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def get_or_call(self, compute: Callable[[], str], provider: str, model: str,
+                    system: str, user, images: Iterable[bytes] = (),
+                    params: Optional[dict] = None) -> str:
+        """Return the cached response for these inputs, or call `compute` and store it."""
+        if self.mode == "off":
+            return compute()
+        images = list(images)
+        key = self.make_key(provider, model, system, user, images, params)
+        cached = self.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit ({provider}/{model}) {key[:12]}")
+            return cached
+        if self.mode == "refresh":
+            with self._lock:
+                self.stats["misses"] += 1
+        text = compute()
+        self.put(key, text, meta={"provider": provider, "model": model})
+        return text
+
+    def stream_or_call(self, compute: Callable[[], Iterable[str]], provider: str, model: str,
+                       system: str, user, images: Iterable[bytes] = (),
+                       params: Optional[dict] = None) -> Iterator[str]:
+        """
+        Streaming counterpart of get_or_call: yields the cached text as a single
+        delta, or the deltas of `compute()` — stored once the stream completes.
+        Shares keys with get_or_call, so streamed and blocking calls hit each other.
+        """
+        if self.mode == "off":
+            yield from compute()
+            return
+        images = list(images)
+        key = self.make_key(provider, model, system, user, images, params)
+        cached = self.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit ({provider}/{model}) {key[:12]}")
+            yield cached
+            return
+        if self.mode == "refresh":
+            with self._lock:
+                self.stats["misses"] += 1
+        chunks = []
+        for delta in compute():
+            chunks.append(delta)
+            yield delta
+        self.put(key, "".join(chunks), meta={"provider": provider, "model": model})
+
+    # ── Eviction ────────────────────────────────────────────
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache is under 90% of its budget."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+                self.stats["evictions"] += 1
+            self._total_bytes = total
+        logger.info(f"Cache evicted down to {total / (1024 * 1024):.1f} MB")
+
+    def summary(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, mode=self.mode,
+                    hit_ratio=round(self.stats["hits"] / lookups, 3) if lookups else None)
+
+
+_response_cache: Optional[ResponseCache] = None
+_cache_lock = threading.RLock()
+
+
+def configure_response_cache(mode: str = "use", cache_dir: Optional[str] = None) -> ResponseCache:
+    """Create the process-wide response cache. TTL/size come from the environment."""
+    global _response_cache
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(get_project_root(), '.env'))
+
+    cache_dir = cache_dir or os.getenv(
+        "CONTENT_CACHE_DIR", os.path.join(get_project_root(), ".cache", "responses")
+    )
+    ttl_hours = float(os.getenv("CONTENT_CACHE_TTL_HOURS", "168"))
+    max_mb = float(os.getenv("CONTENT_CACHE_MAX_MB", "256"))
+    with _cache_lock:
+        _response_cache = ResponseCache(
+            cache_dir, mode=mode, ttl_seconds=ttl_hours * 3600, max_bytes=int(max_mb * 1024 * 1024)
+        )
+    return _response_cache
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating a default one on first use."""
+    with _cache_lock:
+        if _response_cache is None:
+            return configure_response_cache(os.getenv("CONTENT_CACHE", "use"))
+        return _response_cache
+
+
+def read_image_bytes(image_path: str) -> bytes:
+    """Read an inspiration image for cache keying; empty for mocks/missing files."""
+    if not image_path or not os.path.isfile(image_path) or image_path.endswith('.txt'):
+        return b""
+    with open(image_path, 'rb') as f:
+        return f.read()
@@ -7,14 +7,74 @@ tailored to the Benefills brand.
 import os
 import json
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict
 
 from .logger import setup_logger
-from .utils import load_prompt, extract_json_from_text
+from .utils import load_prompt
+from .json_stream import JsonStreamParser
+from .cache import get_response_cache
+from .rate_limit import rate_limited, estimate_tokens
 
 logger = setup_logger('caption_gen')
 
 
+def _as_variants(result) -> List[dict]:
+    """Normalize a parsed response: a variant list, a wrapper dict holding one, or a single variant."""
+    if isinstance(result, dict):
+        if "caption" not in result:
+            for key in result:
+                if isinstance(result[key], list):
+                    return result[key]
+        return [result]
+    return result if isinstance(result, list) else [result]
+
+
+def _drop_truncated(count: int):
+    if count > 0:
+        logger.warning(f"Dropped {count} caption variant(s) cut off at max_tokens")
+
+
+def parse_variants(response_text: str) -> List[dict]:
+    parser = JsonStreamParser()
+    closed = parser.feed(response_text)
+    result = parser.finish()
+    if result is None:
+        # Fallback: treat the whole response as a single caption
+        logger.warning("Could not parse JSON from caption response, using raw text")
+        return [{"variant": 1, "angle": "mixed", "caption": response_text, "hashtags": ""}]
+    variants = _as_variants(result)
+    if parser.repaired:
+        # Cut off at max_tokens: keep the variants that closed, not the one being written
+        complete = [v for item in closed for v in _as_variants(item)] or variants[:-1]
+        _drop_truncated(len(variants) - len(complete))
+        return complete
+    return variants
+
+
+def stream_variants(deltas: Iterable[str]) -> Iterator[dict]:
+    """
+    Yield each variant as soon as its JSON element closes in the text stream.
+    A variant still open when the output was cut off at max_tokens is dropped.
+    """
+    parser = JsonStreamParser()
+    chunks = []
+    emitted = 0
+    for delta in deltas:
+        chunks.append(delta)
+        if parser.values:
+            continue  # first value complete; drain so the cache gets the full text
+        for item in parser.feed(delta):
+            for variant in _as_variants(item):
+                emitted += 1
+                yield variant
+
+    if emitted:
+        if not parser.values and parser.finish() is not None:
+            _drop_truncated(len(_as_variants(parser.values[0])) - emitted)
+        return
+    yield from parse_variants("".join(chunks))
+
+
 class BaseCaptionGenerator(ABC):
     """Abstract caption generator — supports multiple LLM providers."""
 
@@ -23,6 +83,10 @@ class BaseCaptionGenerator(ABC):
         """Generate caption variants. Returns list of {caption, hashtags} dicts."""
         pass
 
+    def stream(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> Iterator[dict]:
+        """Yield caption variants as they become available (providers without streaming yield all at once)."""
+        yield from self.generate(analysis, brand_context, num_variants)
+
 
 class ClaudeCaptionGenerator(BaseCaptionGenerator):
 
@@ -35,8 +99,39 @@ class ClaudeCaptionGenerator(BaseCaptionGenerator):
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in .env")
         self.client = Anthropic(api_key=self.api_key)
+        self.model_name = "claude-sonnet-4-5-20250929"
+
+    def _create_message(self, system_prompt: str, content, max_tokens: int, estimate: int) -> str:
+        """Rate-limited messages.create returning the response text."""
+        return rate_limited(
+            "anthropic", self.model_name,
+            lambda: self.client.messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=[{"role": "user", "content": content}]
+            ).content[0].text,
+            tokens=estimate
+        )
 
-    def generate(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> List[dict]:
+    def _stream_message(self, system_prompt: str, content, max_tokens: int, estimate: int) -> Iterator[str]:
+        """Rate-limited streaming messages.create yielding text deltas."""
+        events = rate_limited(
+            "anthropic", self.model_name,
+            lambda: self.client.messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=[{"role": "user", "content": content}],
+                stream=True
+            ),
+            tokens=estimate
+        )
+        for event in events:
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+
+    def _prompts(self, analysis: dict, brand_context: dict, num_variants: int):
         system_prompt = load_prompt("generate_caption")
 
         user_prompt = f"""
@@ -66,30 +161,31 @@ Return as a JSON array:
   ...
 ]
 """
+        return system_prompt, user_prompt
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=3000,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
+    def generate(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> List[dict]:
+        system_prompt, user_prompt = self._prompts(analysis, brand_context, num_variants)
+        response_text = get_response_cache().get_or_call(
+            lambda: self._create_message(
+                system_prompt, user_prompt, 3000,
+                estimate_tokens(system_prompt, user_prompt, max_output=3000)
+            ),
+            provider="anthropic", model=self.model_name, system=system_prompt,
+            user=user_prompt, params={"max_tokens": 3000}
         )
-
-        response_text = message.content[0].text
-        result = extract_json_from_text(response_text)
-
-        if result is None:
-            # Fallback: treat the whole response as a single caption
-            logger.warning("Could not parse JSON from caption response, using raw text")
-            return [{"variant": 1, "angle": "mixed", "caption": response_text, "hashtags": ""}]
-
-        # If result is a dict with a list inside, extract the list
-        if isinstance(result, dict):
-            for key in result:
-                if isinstance(result[key], list):
-                    return result[key]
-            return [result]
-
-        return result if isinstance(result, list) else [result]
+        return parse_variants(response_text)
+
+    def stream(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> Iterator[dict]:
+        system_prompt, user_prompt = self._prompts(analysis, brand_context, num_variants)
+        deltas = get_response_cache().stream_or_call(
+            lambda: self._stream_message(
+                system_prompt, user_prompt, 3000,
+                estimate_tokens(system_prompt, user_prompt, max_output=3000)
+            ),
+            provider="anthropic", model=self.model_name, system=system_prompt,
+            user=user_prompt, params={"max_tokens": 3000}
+        )
+        yield from stream_variants(deltas)
 
 
 class GeminiCaptionGenerator(BaseCaptionGenerator):
@@ -104,9 +200,29 @@ class GeminiCaptionGenerator(BaseCaptionGenerator):
 
         import google.generativeai as genai
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model_name = 'gemini-2.0-flash'
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _generate(self, parts, estimate: int) -> str:
+        """Rate-limited generate_content returning the response text."""
+        return rate_limited(
+            "gemini", self.model_name,
+            lambda: self.model.generate_content(parts).text,
+            tokens=estimate
+        )
 
-    def generate(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> List[dict]:
+    def _generate_stream(self, parts, estimate: int) -> Iterator[str]:
+        """Rate-limited streaming generate_content yielding text deltas."""
+        response = rate_limited(
+            "gemini", self.model_name,
+            lambda: self.model.generate_content(parts, stream=True),
+            tokens=estimate
+        )
+        for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+
+    def _prompt(self, analysis: dict, brand_context: dict, num_variants: int) -> str:
         system_prompt = load_prompt("generate_caption")
 
         user_prompt = f"""
@@ -119,20 +235,23 @@ Products: {', '.join(brand_context.get('products', []))}
 Generate {num_variants} caption variants as JSON array.
 Each variant: {{"variant": N, "angle": "...", "caption": "...", "hashtags": "..."}}
 """
+        return user_prompt
 
-        response = self.model.generate_content(user_prompt)
-        result = extract_json_from_text(response.text)
-
-        if result is None:
-            return [{"variant": 1, "angle": "mixed", "caption": response.text, "hashtags": ""}]
-
-        if isinstance(result, dict):
-            for key in result:
-                if isinstance(result[key], list):
-                    return result[key]
-            return [result]
+    def generate(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> List[dict]:
+        user_prompt = self._prompt(analysis, brand_context, num_variants)
+        response_text = get_response_cache().get_or_call(
+            lambda: self._generate(user_prompt, estimate_tokens(user_prompt)),
+            provider="gemini", model=self.model_name, system="", user=user_prompt
+        )
+        return parse_variants(response_text)
 
-        return result if isinstance(result, list) else [result]
+    def stream(self, analysis: dict, brand_context: dict, num_variants: int = 2) -> Iterator[dict]:
+        user_prompt = self._prompt(analysis, brand_context, num_variants)
+        deltas = get_response_cache().stream_or_call(
+            lambda: self._generate_stream(user_prompt, estimate_tokens(user_prompt)),
+            provider="gemini", model=self.model_name, system="", user=user_prompt
+        )
+        yield from stream_variants(deltas)
 
 
 class MockCaptionGenerator(BaseCaptionGenerator):
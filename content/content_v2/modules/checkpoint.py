@@ -0,0 +1,87 @@
+"""
+Checkpoint module.
+Persists each completed unit of work (scraped post, analysis, captions,
+image, review) inside the run directory so an interrupted run can be
+resumed with `--resume run_YYYYMMDD_HHMMSS` and only redo what is missing.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from typing import Any, Optional
+
+from .logger import setup_logger
+
+logger = setup_logger('checkpoint')
+
+
+def unit_key(identity: str) -> str:
+    """Short, filesystem-safe key for a unit of work (e.g. a source URL or topic)."""
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:12]
+
+
+class RunCheckpoint:
+    """JSON-file-per-unit checkpoint store under <run_dir>/checkpoints/."""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self.checkpoint_dir = os.path.join(run_dir, "checkpoints")
+        # Run-local image store, used when the shared one is disabled (--no-cache)
+        self.images_dir = os.path.join(self.checkpoint_dir, "images")
+        os.makedirs(self.images_dir, exist_ok=True)
+        self.loaded = 0
+        self._lock = threading.Lock()
+
+    def _path(self, unit: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{unit}.json")
+
+    def _read(self, unit: str) -> Optional[Any]:
+        path = self._path(unit)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {unit}: {e}")
+            return None
+
+    def load(self, unit: str) -> Optional[Any]:
+        """Return the stored data for a unit, or None if it never completed."""
+        data = self._read(unit)
+        if data is not None:
+            with self._lock:
+                self.loaded += 1
+        return data
+
+    def save(self, unit: str, data: Any):
+        """Atomically record a completed unit."""
+        path = self._path(unit)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def has_image(self, unit: str) -> bool:
+        """Like load_image, without counting as a restored unit (used for planning)."""
+        record = self._read(unit)
+        return bool(record and record.get("path") and os.path.isfile(record["path"]))
+
+    def load_image(self, unit: str) -> Optional[str]:
+        """Return the checkpointed image path if the unit finished with an image on disk."""
+        record = self.load(unit)
+        if record and record.get("path") and os.path.isfile(record["path"]):
+            return record["path"]
+        return None
+
+
+def link_or_copy(src: str, dest: str):
+    """Place `src` at `dest` without duplicating bytes when the filesystem allows it."""
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
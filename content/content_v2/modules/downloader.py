@@ -0,0 +1,187 @@
+"""
+Downloader module.
+Shared service for fetching remote media (scraped og:images, generated
+images): one keep-alive connection pool, connect/read timeouts, retries on
+transient errors, chunked streaming straight to disk with checksum and
+length verification, and an atomic rename into place. Scraped media can
+be revalidated against the HTTP cache instead of downloaded again.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .logger import setup_logger
+from .http_cache import get_http_cache
+from .checkpoint import link_or_copy
+
+logger = setup_logger('downloader')
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_CONCURRENT = 8
+DEFAULT_TIMEOUT = (10, 60)  # connect, read (seconds between bytes)
+
+
+class DownloadError(Exception):
+    """A download failed, was truncated or did not match its expected checksum."""
+    pass
+
+
+class DownloadResult:
+    def __init__(self, url: str, path: str, size: int, sha256: str, seconds: float):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.seconds = seconds
+
+
+class MediaDownloader:
+    """
+    At most `max_concurrent` downloads are in flight at once, however many
+    threads call download(); the rest wait for a slot.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = 3):
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = {"downloads": 0, "failed": 0, "bytes": 0, "seconds": 0.0}
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(total=self.retries, backoff_factor=0.5,
+                              status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=frozenset({"GET"}))
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.max_concurrent, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def download(self, url: str, dest_path: str, sha256: Optional[str] = None,
+                 cache: bool = False) -> DownloadResult:
+        """
+        Stream `url` to `dest_path`. The file only appears once it is complete
+        (and matches `sha256`, if given); a failed download leaves nothing behind.
+        With `cache`, a stored copy is revalidated and reused on 304 Not Modified.
+        """
+        session = self._get_session()
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        tmp_path = f"{dest_path}.{threading.get_ident()}.part"
+        http_cache = get_http_cache() if cache else None
+        entry = http_cache.lookup(url) if http_cache else None
+        digest = hashlib.sha256()
+        size = 0
+
+        with self._slots:
+            started = time.perf_counter()
+            try:
+                with session.get(url, stream=True, timeout=self.timeout,
+                                 headers=http_cache.conditional_headers(entry) if entry else None) as response:
+                    not_modified = entry is not None and response.status_code == 304
+                    if not_modified:
+                        link_or_copy(http_cache.hit(entry), tmp_path)
+                        size = entry["size"]
+                    else:
+                        response.raise_for_status()
+                        expected = response.headers.get("Content-Length")
+                        # Compressed transfers report the encoded length, not what we receive
+                        if response.headers.get("Content-Encoding", "identity") != "identity":
+                            expected = None
+                        with open(tmp_path, 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                f.write(chunk)
+                                digest.update(chunk)
+                                size += len(chunk)
+
+                checksum = entry["sha256"] if not_modified else digest.hexdigest()
+                if not not_modified and expected is not None and size != int(expected):
+                    raise DownloadError(f"Truncated download ({size} of {expected} bytes): {url}")
+                if sha256 and checksum != sha256.lower():
+                    raise DownloadError(f"Checksum mismatch for {url}: got {checksum[:12]}")
+                os.replace(tmp_path, dest_path)
+                if http_cache and not not_modified:
+                    http_cache.miss(size)
+                    http_cache.store_file(url, response.headers, dest_path, checksum)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self.stats["failed"] += 1
+                raise
+            elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.stats["downloads"] += 1
+            self.stats["bytes"] += 0 if not_modified else size
+            self.stats["seconds"] = round(self.stats["seconds"] + elapsed, 3)
+        if not_modified:
+            logger.info(f"Not modified: {size / 1024:.0f} KB served from the HTTP cache → {os.path.basename(dest_path)}")
+        else:
+            logger.info(f"Downloaded {size / 1024:.0f} KB in {elapsed:.2f}s → {os.path.basename(dest_path)}")
+        return DownloadResult(url, dest_path, size, checksum, elapsed)
+
+    def download_many(self, jobs: List[Tuple[str, str]]) -> List[object]:
+        """
+        Download (url, dest_path) pairs concurrently. Returns a DownloadResult
+        or the exception for each job, in order.
+        """
+        def run(job):
+            try:
+                return self.download(*job)
+            except Exception as e:
+                logger.warning(f"Download failed for {job[0]}: {e}")
+                return e
+
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrent, len(jobs)),
+                                thread_name_prefix="download") as pool:
+            return list(pool.map(run, jobs))
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_downloader: Optional[MediaDownloader] = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader() -> MediaDownloader:
+    """Process-wide downloader. DOWNLOAD_MAX_CONCURRENT / DOWNLOAD_READ_TIMEOUT_S override the defaults."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = MediaDownloader(
+                max_concurrent=int(os.getenv("DOWNLOAD_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT)),
+                timeout=(DEFAULT_TIMEOUT[0], float(os.getenv("DOWNLOAD_READ_TIMEOUT_S", DEFAULT_TIMEOUT[1]))),
+            )
+        return _downloader
+
+
+def download_stats(since: Optional[Dict] = None) -> Dict:
+    """Counters for run_log.json, minus an earlier snapshot."""
+    if _downloader is None:
+        return {}
+    with _downloader._lock:
+        stats = dict(_downloader.stats)
+    for name, value in (since or {}).items():
+        stats[name] = round(stats[name] - value, 3)
+    return stats
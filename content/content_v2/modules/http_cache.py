@@ -0,0 +1,218 @@
+"""
+HTTP cache module.
+On-disk cache for scraped pages and media, keyed by URL. Each entry keeps
+the body plus its ETag / Last-Modified; later fetches send a conditional
+request and a 304 is served from disk, so links repeated across runs cost
+a round trip instead of a full download. Size-bounded with LRU eviction.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+from .checkpoint import link_or_copy
+
+logger = setup_logger('http_cache')
+
+HTTP_CACHE_MODES = ("use", "off", "refresh")
+
+
+class HttpCache:
+    """
+    <key>.json holds the URL, validators, size and SHA-256; <key>.body the bytes.
+
+    Modes mirror the response cache:
+      use     — revalidate stored entries with conditional requests (default)
+      refresh — fetch unconditionally but store the fresh responses
+      off     — no caching
+    """
+
+    def __init__(self, cache_dir: str, mode: str = "use", max_bytes: int = 512 * 1024 * 1024):
+        if mode not in HTTP_CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "stored": 0,
+                      "bytes_fetched": 0, "bytes_saved": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self.stats[name] += value
+
+    # ── Lookup ──────────────────────────────────────────────
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Stored entry for `url` (None in refresh mode or if its body is gone)."""
+        self._count(requests=1)
+        if self.mode != "use":
+            return None
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not os.path.isfile(body_path):
+            return None
+        entry["body_path"] = body_path
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, entry: Dict) -> str:
+        """Record a 304 for `entry` and return its body path."""
+        try:
+            os.utime(entry["body_path"], None)  # LRU order
+        except OSError:
+            pass
+        self._count(hits=1, bytes_saved=entry["size"])
+        return entry["body_path"]
+
+    def read(self, entry: Dict) -> bytes:
+        with open(self.hit(entry), 'rb') as f:
+            return f.read()
+
+    # ── Store ───────────────────────────────────────────────
+
+    def miss(self, size: int):
+        """Record a full download of `size` bytes."""
+        self._count(misses=1, bytes_fetched=size)
+
+    def store_file(self, url: str, headers, path: str, sha256: Optional[str] = None):
+        """Keep the body at `path` for `url`, if the response can be revalidated later."""
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if self.mode == "off" or not (etag or last_modified):
+            return
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+
+        tmp_body = f"{body_path}.{threading.get_ident()}.tmp"
+        link_or_copy(path, tmp_body)
+        os.replace(tmp_body, body_path)
+        if sha256 is None:
+            with open(body_path, 'rb') as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+        size = os.path.getsize(body_path)
+        tmp_meta = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_meta, 'w') as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                       "size": size, "sha256": sha256, "stored_at": time.time()}, f)
+        os.replace(tmp_meta, meta_path)
+
+        with self._lock:
+            self.stats["stored"] += 1
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += size - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def store_bytes(self, url: str, headers, data: bytes):
+        if self.mode == "off" or not (headers.get("ETag") or headers.get("Last-Modified")):
+            return
+        _, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        tmp_path = f"{body_path}.{threading.get_ident()}.src"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        try:
+            self.store_file(url, headers, tmp_path, hashlib.sha256(data).hexdigest())
+        finally:
+            os.remove(tmp_path)
+
+    # ── Eviction ────────────────────────────────────────────
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.body'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache is under 90% of its budget."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for body_path, size, _ in entries:
+                if total <= target:
+                    break
+                for path in (body_path, body_path[:-len(".body")] + ".json"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                self.stats["evictions"] += 1
+            self._total_bytes = total
+        logger.info(f"HTTP cache evicted down to {total / (1024 * 1024):.1f} MB")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        return dict(stats, mode=self.mode, hit_ratio=round(stats["hits"] / lookups, 3) if lookups else None)
+
+
+_http_cache: Optional[HttpCache] = None
+_http_cache_lock = threading.Lock()
+
+
+def configure_http_cache(mode: str = "use", cache_dir: Optional[str] = None) -> Optional[HttpCache]:
+    """Create the process-wide HTTP cache (None when mode is off). Size comes from HTTP_CACHE_MAX_MB."""
+    global _http_cache
+    cache_dir = cache_dir or os.getenv("HTTP_CACHE_DIR", os.path.join(get_project_root(), ".cache", "http"))
+    max_mb = float(os.getenv("HTTP_CACHE_MAX_MB", "512"))
+    with _http_cache_lock:
+        _http_cache = None if mode == "off" else HttpCache(cache_dir, mode, int(max_mb * 1024 * 1024))
+    return _http_cache
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """The process-wide HTTP cache, or None if caching is off or was never configured."""
+    return _http_cache
+
+
+def http_cache_stats(since: Optional[dict] = None) -> dict:
+    """Counters for run_log.json, minus an earlier snapshot."""
+    if _http_cache is None:
+        return {}
+    stats = _http_cache.summary()
+    for name, value in (since or {}).items():
+        if isinstance(value, (int, float)) and name != "hit_ratio":
+            stats[name] -= value
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
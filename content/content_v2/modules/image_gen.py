@@ -8,13 +8,19 @@ import os
 import json
 import requests
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional
 
 from .logger import setup_logger
 from .utils import load_brand_context
+from .rate_limit import rate_limited, RetryableError, RETRYABLE_STATUS, parse_retry_after
+from .downloader import get_downloader, CHUNK_SIZE, DEFAULT_TIMEOUT
+from .inline_data import InlineDataWriter, SUMMARY_LIMIT
 
 logger = setup_logger('image_gen')
 
+# The image is generated before the first byte arrives, so the read timeout is longer than a download's
+GENERATE_TIMEOUT = (DEFAULT_TIMEOUT[0], float(os.getenv("GOOGLE_IMAGE_TIMEOUT_S", "180")))
+
 
 # Instagram-optimized image style prompts (adapted from v1 image_prompts.py)
 STYLE_TEMPLATES = {
@@ -61,14 +67,87 @@ STYLE_TEMPLATES = {
 }
 
 
+# Approximate list price in USD per generated image, used by the preflight estimate.
+# Override per model with IMAGE_COST_<MODEL> (e.g. IMAGE_COST_GEMINI_2_5_FLASH_IMAGE=0.039).
+IMAGE_COST_USD = {
+    "gemini-2.5-flash-image": 0.039,
+    "gemini-3-pro-image-preview": 0.134,
+    "dall-e-3": 0.04,
+    "mock": 0.0,
+}
+
+
+def approval_required() -> bool:
+    """Whether paid Google image runs must be confirmed interactively (SKIP_APPROVAL unset)."""
+    return os.getenv("SKIP_APPROVAL", "false").lower() != "true"
+
+
+def image_cost(model: str) -> Optional[float]:
+    """Estimated USD per image for `model`, or None if the price is unknown."""
+    env_name = "IMAGE_COST_" + "".join(c if c.isalnum() else "_" for c in model).upper()
+    if os.getenv(env_name):
+        return float(os.getenv(env_name))
+    return IMAGE_COST_USD.get(model)
+
+
+def confirm_image_batch(image_gen: "BaseImageGenerator", prompts: List[str], count: int,
+                        budget: Optional[float] = None, interactive: bool = False) -> bool:
+    """
+    Preflight for a run's image jobs: print the plan and its estimated cost, then
+    approve it once. A `budget` (USD) decides non-interactively; otherwise the
+    user is asked when `interactive` is set. Unknown prices never pass a budget.
+    """
+    model = image_gen.model_name
+    per_image = image_cost(model)
+    total = per_image * count if per_image is not None else None
+
+    print(f"\n[IMAGE PREFLIGHT] {count} image(s) to generate with {model}")
+    print(f"  Estimated cost: " + (f"${total:.2f} (${per_image:.3f}/image)" if total is not None else "unknown"))
+    pro_model = getattr(image_gen, "pro_model_name", None)
+    if pro_model and image_cost(pro_model) is not None:
+        print(f"  With {pro_model}: ${image_cost(pro_model) * count:.2f}")
+    for prompt in prompts[:3]:
+        print(f"  • {prompt[:120]}...")
+    if len(prompts) > 3:
+        print(f"  • ... and {len(prompts) - 3} more prompt(s)")
+
+    if budget is not None:
+        if total is not None and total <= budget:
+            logger.info(f"Image batch approved within budget (${total:.2f} <= ${budget:.2f})")
+            return True
+        logger.warning(f"Image batch exceeds budget of ${budget:.2f} — skipping image generation")
+        return False
+
+    if interactive:
+        response_input = input(">> Type 'yes' to generate all images, or anything else to skip: ")
+        if response_input.lower() != "yes":
+            logger.warning("User skipped image generation.")
+            return False
+    return True
+
+
 class BaseImageGenerator(ABC):
     """Abstract image generator — makes it easy to add video generation later."""
 
+    model_name = ""
+
     @abstractmethod
     def generate(self, prompt: str, output_path: str, style: str = "lifestyle") -> str:
         """Generate an image and save to output_path. Returns the path."""
         pass
 
+    def _apply_style(self, description: str, style: str) -> str:
+        return description
+
+    def request_identity(self, prompt: str, style: str) -> dict:
+        """What makes two generate() calls interchangeable (used as the ImageStore key)."""
+        return {
+            "provider": type(self).__name__,
+            "model": self.model_name,
+            "style": style,
+            "prompt": self._apply_style(prompt, style),
+        }
+
 
 class GoogleImageGenerator(BaseImageGenerator):
     """Uses Google NanoBanana (Gemini 2.5/3.0) for image generation via curl."""
@@ -92,7 +171,7 @@ class GoogleImageGenerator(BaseImageGenerator):
             self.model_name = env_model
             
         # Pro model "Nano Banana Pro" (Gemini 3 Pro Image)
-        self.pro_model_name = os.getenv("GOOGLE_IMAGE_MODEL_PRO", "gemini-3.0-flash-image")
+        self.pro_model_name = os.getenv("GOOGLE_IMAGE_MODEL_PRO", "gemini-3-pro-image-preview")
         
         logger.info(f"Initialized GoogleImageGenerator with model: {self.model_name}")
 
@@ -117,95 +196,73 @@ class GoogleImageGenerator(BaseImageGenerator):
         }
         
         url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_to_use}:generateContent?key={self.api_key}"
-        
-        # We will execute this via subprocess to mimic the curl command, but using requests is safer/easier in python.
-        # However, the user asked to "take some sort of manual approval before calling its curl".
-        # We will simulate this by asking for input if we were in an interactive shell, 
-        # but since we are in a script, we might log it or use a confirm utility.
-        # For now, we will print the plan and proceed if in mock/test mode, but the user explicitly asked for approval.
-        
-        print(f"\n[APPROVAL REQUIRED] About to call Google Image API ({model_to_use})")
-        print(f"Endpoint: .../models/{model_to_use}:generateContent")
-        print(f"Cost Warning: Ensure you are aware of the costs for {model_to_use}.")
-        
-        # In a real automated pipeline, manual approval stops the flow. 
-        # We will check an environment variable or arg to skip, otherwise we pause.
-        # For this specific user request, I will implement a strict input check.
-        if os.getenv("SKIP_APPROVAL", "false").lower() != "true":
-             response_input = input(">> Type 'yes' to proceed with generation, or anything else to skip: ")
-             if response_input.lower() != "yes":
-                 logger.warning("User skipped image generation.")
-                 return None
+
+        # Manual approval happens once per run, before dispatch (see confirm_image_batch),
+        # so individual calls never block on input() and can run concurrently.
+
+        def _post():
+            # Streamed: the body is a multi-MB base64 image, decoded to disk below
+            try:
+                response = requests.post(
+                    url,
+                    headers={'Content-Type': 'application/json'},
+                    json=payload,
+                    stream=True,
+                    timeout=GENERATE_TIMEOUT
+                )
+            except requests.Timeout as e:
+                # A stalled connection is retried like a gateway timeout
+                raise RetryableError(f"Google API timed out: {e}", 504)
+            # 429/5xx are retried by the rate limiter with backoff (honours Retry-After)
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableError(
+                    f"Google API {response.status_code}: {response.text[:200]}",
+                    response.status_code,
+                    parse_retry_after(response.headers.get("Retry-After"))
+                )
+            return response
 
         try:
-            response = requests.post(
-                url,
-                headers={'Content-Type': 'application/json'},
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Google API Error ({response.status_code}): {response.text}")
-                raise Exception(f"Google API failed: {response.text}")
-                
-            response_json = response.json()
-            
-            # The image data is in candidates[0].content.parts[0].inline_data.data (Base64)
-            # OR sometimes directly if the API shape changes, but based on recent docs:
-            # It usually returns inline_data for images.
-            
-            # Let's handle the response structure carefully
+            response = rate_limited("google_image", model_to_use, _post)
+
+            with response:
+                if response.status_code != 200:
+                    logger.error(f"Google API Error ({response.status_code}): {response.text[:SUMMARY_LIMIT]}")
+                    raise Exception(f"Google API failed: {response.text[:200]}")
+
+                # The image is candidates[0].content.parts[].inlineData.data (Base64);
+                # it is decoded chunk by chunk, never held whole in memory
+                writer = InlineDataWriter(output_path)
+                try:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        writer.feed(chunk)
+                    response_json = writer.finish()
+                except Exception:
+                    writer.close()
+                    raise
+
             try:
-                # Check for direct image bytes if that's how it returns (rare for this endpoint, usually JSON)
-                # Parse JSON path
-                import base64
-                
-                # Common path for Gemini Image responses
-                # Note: The user doc says "response has the generated image as Base64 encoded data in the inline_data"
-                # This is typically under candidates -> content -> parts -> inline_data
-                
-                candidates = response_json.get("candidates", [])
-                if not candidates:
-                    # Check if it was blocked
-                    prompt_feedback = response_json.get("promptFeedback", {})
-                    if prompt_feedback:
-                         raise Exception(f"Prompt blocked: {prompt_feedback}")
-                    raise Exception("No candidates returned.")
-                    
-                parts = candidates[0].get("content", {}).get("parts", [])
-                if not parts:
-                     raise Exception("No parts in content.")
-                     
-                # Look for inline_data (camelCase in raw JSON)
-                base64_data = None
-                for part in parts:
-                    if "inlineData" in part:
-                         base64_data = part["inlineData"]["data"]
-                         break
-                
-                if not base64_data:
-                    # Fallback check for snake_case just in case
-                    for part in parts:
-                         if "inline_data" in part:
-                             base64_data = part["inline_data"]["data"]
-                             break
-                
-                if not base64_data:
+                if not writer.images:
+                    response_json = response_json or {}
+                    candidates = response_json.get("candidates", [])
+                    if not candidates:
+                        # Check if it was blocked
+                        prompt_feedback = response_json.get("promptFeedback", {})
+                        if prompt_feedback:
+                            raise Exception(f"Prompt blocked: {prompt_feedback}")
+                        raise Exception("No candidates returned.")
+                    if not candidates[0].get("content", {}).get("parts", []):
+                        raise Exception("No parts in content.")
                     raise Exception("No inline_data found in response.")
-                    
-                img_bytes = base64.b64decode(base64_data)
-                
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                with open(output_path, "wb") as f:
-                    f.write(img_bytes)
-                    
-                logger.info(f"Image saved: {output_path}")
+
+                logger.info(f"Image saved: {output_path} ({writer.bytes_written / 1024:.0f} KB)")
                 return output_path
 
             except Exception as parse_e:
-                 logger.error(f"Failed to parse Google API response: {parse_e}")
-                 logger.error(f"Full Response: {json.dumps(response_json, indent=2)}")
-                 raise
+                logger.error(f"Failed to parse Google API response: {parse_e}")
+                # Image data is redacted and the rest truncated, so this stays small
+                logger.error(f"Response summary: {writer.summary()}")
+                raise
 
         except Exception as e:
             logger.error(f"Generate Request Failed: {e}")
@@ -228,25 +285,22 @@ class DallEImageGenerator(BaseImageGenerator):
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in .env")
         self.client = OpenAI(api_key=self.api_key)
+        self.model_name = "dall-e-3"
 
     def generate(self, prompt: str, output_path: str, style: str = "lifestyle") -> str:
         styled_prompt = self._apply_style(prompt, style)
         logger.info(f"Generating image with DALL-E 3 ({style} style)")
 
-        response = self.client.images.generate(
-            model="dall-e-3",
+        response = rate_limited("dalle", self.model_name, lambda: self.client.images.generate(
+            model=self.model_name,
             prompt=styled_prompt,
             size="1024x1024",
             quality="standard",
             n=1,
-        )
+        ))
         image_url = response.data[0].url
 
-        # Download
-        img_data = requests.get(image_url).content
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'wb') as f:
-            f.write(img_data)
+        get_downloader().download(image_url, output_path)
 
         logger.info(f"Image saved: {output_path}")
         return output_path
@@ -258,6 +312,8 @@ class DallEImageGenerator(BaseImageGenerator):
 
 class MockImageGenerator(BaseImageGenerator):
 
+    model_name = "mock"
+
     def generate(self, prompt: str, output_path: str, style: str = "lifestyle") -> str:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         # Try to use a real image as mock if available to avoid "corrupt" image errors in frontend
@@ -288,10 +344,12 @@ class ImageGeneratorFactory:
         return MockImageGenerator()
 
 
-def build_image_prompt(analysis: dict, brand_context: dict) -> str:
+def build_image_prompt(analysis: dict, brand_context: dict, variant: Optional[dict] = None) -> str:
     """
     Build an image generation prompt from the inspiration analysis and brand context.
     Extracts the most relevant visual elements from the analysis.
+    Pass a caption `variant` to steer the image toward that variant's angle
+    (otherwise every variant of an analysis shares one prompt — and one image).
     """
     brand_name = brand_context.get("brand_name", "Benefills")
     products = brand_context.get("products", [])
@@ -319,4 +377,7 @@ def build_image_prompt(analysis: dict, brand_context: dict) -> str:
         f"Must look premium, appetizing, and scroll-stopping for Instagram."
     )
 
+    if variant:
+        prompt += f" Creative direction for this variant: {variant.get('angle', 'distinct')} angle."
+
     return prompt
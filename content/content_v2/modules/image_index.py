@@ -0,0 +1,189 @@
+"""
+Image index module.
+Persistent perceptual-hash index (pHash + dHash, computed with NumPy) over
+every inspiration image the pipeline loads. Reposts, recrops and
+re-uploads of the same creative land within a small Hamming distance, so
+the analysis stored for one (see post_store) can be reused instead of
+paying for another vision call.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .logger import setup_logger
+from .utils import get_project_root
+
+logger = setup_logger('image_index')
+
+# Max differing bits (of 64, averaged over pHash and dHash) for two images
+# to count as the same creative. Unrelated images sit around 32.
+DEFAULT_THRESHOLD = 10
+
+_DCT_SIZE = 32
+_DCT = np.cos(np.pi * np.outer(np.arange(_DCT_SIZE), 2 * np.arange(_DCT_SIZE) + 1) / (2 * _DCT_SIZE))
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _grayscale(img, size: Tuple[int, int]) -> np.ndarray:
+    from PIL import Image
+    return np.asarray(img.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def image_hashes(image_path: str) -> Optional[Tuple[int, int]]:
+    """(pHash, dHash) as unsigned 64-bit ints, or None if the file is not a decodable image."""
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img)
+            pixels = _grayscale(img, (_DCT_SIZE, _DCT_SIZE))
+            gradient = _grayscale(img, (9, 8))
+    except Exception:
+        return None
+
+    # pHash: sign of the 8x8 lowest DCT frequencies against their median (DC excluded)
+    low = (_DCT @ pixels @ _DCT.T)[:8, :8].flatten()
+    phash = _bits_to_int(low > np.median(low[1:]))
+    # dHash: horizontal brightness gradient on a 9x8 thumbnail
+    dhash = _bits_to_int(gradient[:, 1:] > gradient[:, :-1])
+    return phash, dhash
+
+
+def hamming(a: np.ndarray, b: int) -> np.ndarray:
+    """Bit distance between each uint64 in `a` and `b`."""
+    diff = np.bitwise_xor(a, np.uint64(b))
+    return np.unpackbits(diff.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageIndex:
+    """
+    SQLite-backed index: one row per distinct image file (by SHA-256) with its
+    perceptual hashes. Analyses themselves live in the post store, keyed by
+    the same SHA-256.
+    """
+
+    def __init__(self, db_path: str, threshold: int = DEFAULT_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.stats = {"indexed": 0, "matched": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " sha256 TEXT PRIMARY KEY, path TEXT, source_url TEXT,"
+                " phash INTEGER NOT NULL, dhash INTEGER NOT NULL, seen_at REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, image_path: str, source_url: str = "") -> Optional[str]:
+        """Index an image; returns its SHA-256, or None if it is not a decodable image."""
+        hashes = image_hashes(image_path)
+        if hashes is None:
+            return None
+        sha = file_sha256(image_path)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)",
+                    (sha, os.path.abspath(image_path), source_url,
+                     _to_signed(hashes[0]), _to_signed(hashes[1]), time.time())
+                )
+        finally:
+            conn.close()
+        with self._lock:
+            self.stats["indexed"] += 1
+        return sha
+
+    def _rows(self) -> List[tuple]:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT sha256, path, source_url, phash, dhash FROM images").fetchall()
+        finally:
+            conn.close()
+
+    def _within_threshold(self, rows: List[tuple], phash: int, dhash: int,
+                          threshold: Optional[int] = None) -> np.ndarray:
+        """Mean pHash/dHash distance to each row; inf where over the threshold."""
+        threshold = self.threshold if threshold is None else threshold
+        p = np.array([r[3] for r in rows], dtype=np.int64).view(np.uint64)
+        d = np.array([r[4] for r in rows], dtype=np.int64).view(np.uint64)
+        distance = (hamming(p, phash) + hamming(d, dhash)) / 2.0
+        distance[distance > threshold] = np.inf
+        return distance
+
+    def find_similar(self, image_path: str, candidates: Optional[set] = None,
+                     threshold: Optional[int] = None) -> Optional[Tuple[str, str, float]]:
+        """
+        Nearest indexed image within the threshold, optionally restricted to the
+        SHA-256s in `candidates`: (sha256, path, distance), or None.
+        """
+        hashes = image_hashes(image_path)
+        if hashes is None:
+            return None
+        rows = self._rows()
+        if candidates is not None:
+            rows = [row for row in rows if row[0] in candidates]
+        if not rows:
+            return None
+        distance = self._within_threshold(rows, *hashes, threshold=threshold)
+        best = int(np.argmin(distance))
+        if not np.isfinite(distance[best]):
+            return None
+        with self._lock:
+            self.stats["matched"] += 1
+        return rows[best][0], rows[best][1], float(distance[best])
+
+    def clusters(self, threshold: Optional[int] = None) -> List[List[Dict]]:
+        """Groups of indexed images within the threshold of each other (size > 1), largest first."""
+        rows = self._rows()
+        parent = list(range(len(rows)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, row in enumerate(rows[:-1]):
+            distance = self._within_threshold(
+                rows[i + 1:], row[3] % (1 << 64), row[4] % (1 << 64), threshold=threshold
+            )
+            for j in np.nonzero(np.isfinite(distance))[0]:
+                parent[find(i + 1 + int(j))] = find(i)
+
+        groups: Dict[int, List[Dict]] = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(find(i), []).append({"sha256": row[0], "path": row[1], "source_url": row[2]})
+        return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+
+def default_index_path() -> str:
+    return os.getenv("IMAGE_INDEX_DB", os.path.join(get_project_root(), ".cache", "image_index.sqlite"))
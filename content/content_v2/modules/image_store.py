@@ -0,0 +1,84 @@
+"""
+Image store module.
+Content-addressed store for generated images, keyed by provider, model,
+style and the final styled prompt. Identical generation requests — e.g. the
+same analysis rendered for several caption variants — are generated once
+and shared; concurrent identical requests wait for the first one.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+
+logger = setup_logger('image_store')
+
+
+class ImageStore:
+    """
+    Modes mirror the response cache:
+      use     — reuse images already in the store
+      refresh — regenerate each key once per process, then share it
+    """
+
+    def __init__(self, store_dir: str, mode: str = "use"):
+        self.store_dir = store_dir
+        self.mode = mode
+        self.stats = {"generated": 0, "reused": 0}
+        self._fresh = set()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model: str, style: str, prompt: str, salt: str = "") -> str:
+        identity = {"provider": provider, "model": model, "style": style, "prompt": prompt, "salt": salt}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.store_dir, key[:2], f"{key}.png")
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def contains(self, image_gen, prompt: str, style: str = "lifestyle", salt: str = "") -> bool:
+        """Whether generate() would reuse a stored image instead of calling the provider."""
+        key = self.make_key(**image_gen.request_identity(prompt, style), salt=salt)
+        with self._lock:
+            fresh = key in self._fresh
+        return os.path.isfile(self.path_for(key)) and (self.mode == "use" or fresh)
+
+    def generate(self, image_gen, prompt: str, style: str = "lifestyle", salt: str = "") -> Optional[str]:
+        """
+        Return the stored image for this request, generating it on first use.
+        `salt` forces a separate image for otherwise identical requests.
+        Returns None if the generator declined (e.g. approval skipped).
+        """
+        key = self.make_key(**image_gen.request_identity(prompt, style), salt=salt)
+        path = self.path_for(key)
+
+        with self._key_lock(key):
+            if os.path.isfile(path) and (self.mode == "use" or key in self._fresh):
+                with self._lock:
+                    self.stats["reused"] += 1
+                logger.info(f"Reusing stored image {key[:12]} ({style})")
+                return path
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp.png"
+            if not image_gen.generate(prompt, tmp_path, style=style):
+                return None
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._fresh.add(key)
+                self.stats["generated"] += 1
+            return path
+
+
+def default_image_store_dir() -> str:
+    return os.getenv("CONTENT_IMAGE_STORE_DIR", os.path.join(get_project_root(), ".cache", "images"))
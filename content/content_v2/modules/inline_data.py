@@ -0,0 +1,191 @@
+"""
+Inline data module.
+Streams a Gemini generateContent response body and decodes the base64
+`inlineData.data` image straight to disk in chunks, so neither the JSON
+nor the decoded image is ever held in memory whole. Everything else in
+the response is kept as a small skeleton with the image data redacted,
+which is safe to log.
+"""
+
+import os
+import re
+import json
+import base64
+import threading
+from typing import Any, Optional
+
+# Outside strings only brackets, quotes, colons and commas matter; inside
+# strings only the closing quote and escapes do.
+_STRUCTURAL = re.compile(rb'[{}\[\]",:]')
+_STRING_END = re.compile(rb'["\\]')
+
+INLINE_KEYS = ("inlineData", "inline_data")
+SUMMARY_LIMIT = 1000
+
+
+class InlineDataError(Exception):
+    """The response ended before the image data did."""
+    pass
+
+
+class InlineDataWriter:
+    """
+    Incremental reader for a generateContent response body.
+
+        writer = InlineDataWriter(output_path)
+        for chunk in response.iter_content(64 * 1024):
+            writer.feed(chunk)
+        skeleton = writer.finish()       # raises InlineDataError if the image was cut off
+
+    The first inlineData.data string is base64-decoded into `output_path`
+    (via a .part file renamed on success); any further ones are skipped.
+    `skeleton` is the rest of the response, with each image string replaced
+    by a short placeholder.
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.bytes_written = 0
+        self.images = 0                 # inline data strings seen (only the first is kept)
+        self.skeleton: Optional[Any] = None
+        self._tmp_path = f"{output_path}.{threading.get_ident()}.part"
+        self._file = None
+        self._out = bytearray()         # response minus image data
+        self._stack = []                # open '{' / '['
+        self._keys = []                 # last key seen at each level (None for arrays)
+        self._expect_key = False
+        self._in_string = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._escape_pending = False
+        self._in_data = False           # inside an inlineData.data string
+        self._data_chars = 0
+        self._pending = b""             # base64 tail that is not yet a multiple of 4
+
+    def _is_inline_data(self) -> bool:
+        return (len(self._stack) >= 2 and self._stack[-1] == "{" and self._stack[-2] == "{"
+                and self._keys[-1] == "data" and self._keys[-2] in INLINE_KEYS)
+
+    def feed(self, chunk: bytes):
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_data:
+                i = self._feed_data(chunk, i)
+            elif self._in_string:
+                i = self._feed_string(chunk, i)
+            else:
+                match = _STRUCTURAL.search(chunk, i)
+                if match is None:
+                    self._out += chunk[i:]
+                    return
+                pos = match.start()
+                self._out += chunk[i:pos + 1]
+                self._structural(chunk[pos:pos + 1])
+                i = pos + 1
+
+    def _structural(self, char: bytes):
+        if char in b"{[":
+            self._stack.append(char.decode())
+            self._keys.append(None)
+            self._expect_key = char == b"{"
+        elif char in b"}]":
+            if self._stack:
+                self._stack.pop()
+                self._keys.pop()
+            self._expect_key = False
+        elif char == b",":
+            self._expect_key = bool(self._stack) and self._stack[-1] == "{"
+        elif char == b":":
+            self._expect_key = False
+        else:  # opening quote
+            self._string_is_key = self._expect_key
+            if not self._string_is_key and self._is_inline_data():
+                self._in_data = True
+                self._data_chars = 0
+                self.images += 1
+                if self.images == 1:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+                    self._file = open(self._tmp_path, 'wb')
+            else:
+                self._in_string = True
+                self._string_start = len(self._out)
+
+    def _feed_string(self, chunk: bytes, i: int) -> int:
+        if self._escape_pending:
+            self._out += chunk[i:i + 1]
+            self._escape_pending = False
+            return i + 1
+        match = _STRING_END.search(chunk, i)
+        if match is None:
+            self._out += chunk[i:]
+            return len(chunk)
+        pos = match.start()
+        self._out += chunk[i:pos + 1]
+        if chunk[pos:pos + 1] == b"\\":
+            self._escape_pending = True
+            return pos + 1
+        self._in_string = False
+        if self._string_is_key:
+            self._keys[-1] = self._out[self._string_start:-1].decode('utf-8', 'replace')
+        return pos + 1
+
+    def _feed_data(self, chunk: bytes, i: int) -> int:
+        if self._escape_pending:
+            # Base64 never needs escaping except an optional "\/"; drop whitespace escapes
+            self._escape_pending = False
+            self._write_base64(b"/" if chunk[i:i + 1] == b"/" else b"")
+            return i + 1
+        match = _STRING_END.search(chunk, i)
+        end = len(chunk) if match is None else match.start()
+        self._write_base64(chunk[i:end])
+        if match is None:
+            return end
+        if chunk[end:end + 1] == b"\\":
+            self._escape_pending = True
+            return end + 1
+        self._in_data = False
+        self._out += f"<{self._data_chars} base64 chars redacted>\"".encode()
+        if self._file is not None:
+            self._write_base64(b"", final=True)
+            self._file.close()
+            self._file = None
+            os.replace(self._tmp_path, self.output_path)
+        return end + 1
+
+    def _write_base64(self, data: bytes, final: bool = False):
+        self._data_chars += len(data)
+        if self._file is None:
+            return
+        data = self._pending + data
+        cut = len(data) if final else len(data) - len(data) % 4
+        self._pending = data[cut:]
+        if cut:
+            decoded = base64.b64decode(data[:cut])
+            self._file.write(decoded)
+            self.bytes_written += len(decoded)
+
+    def finish(self) -> Optional[Any]:
+        """Check the image (if any) arrived complete and return the parsed skeleton."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+            raise InlineDataError(f"Response ended inside the image data ({self._data_chars} base64 chars)")
+        try:
+            self.skeleton = json.loads(bytes(self._out))
+        except ValueError:
+            self.skeleton = None
+        return self.skeleton
+
+    def close(self):
+        """Discard a partial image (after a network error mid-stream)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def summary(self, limit: int = SUMMARY_LIMIT) -> str:
+        """The response without image data, truncated to `limit` characters, for logs."""
+        text = json.dumps(self.skeleton) if self.skeleton is not None else self._out.decode('utf-8', 'replace')
+        return text if len(text) <= limit else f"{text[:limit]}… ({len(text)} chars)"
@@ -0,0 +1,233 @@
+"""
+JSON stream module.
+Single-pass, bracket-balanced extraction of JSON from model output that may
+be wrapped in prose or markdown fences. Text can be fed as streamed deltas:
+each element of a top-level array (or each top-level object) is returned as
+soon as it closes, and output cut off at max_tokens is repaired on finish().
+"""
+
+import re
+import json
+from bisect import bisect_right
+from typing import Any, List, Optional
+
+# Outside strings only brackets, quotes and commas matter; inside strings only
+# the closing quote and escapes do. Jumping between them keeps the scan in C.
+_OPEN = re.compile(r'[{\[]')
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _close(stack) -> str:
+    return "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+class JsonStreamParser:
+    """
+    Incremental extractor for the first JSON object/array in a text stream.
+
+        parser = JsonStreamParser()
+        for delta in stream:
+            for item in parser.feed(delta):
+                ...                      # array element / object, as soon as it closes
+        result = parser.finish()         # first complete value, or a repaired one
+
+    Each delta is scanned once; text is only joined to json.loads a closed
+    element or value. Bracket-like prose ("[as requested]", "{brand}") is
+    tried as a candidate, fails to parse and is skipped.
+    """
+
+    def __init__(self):
+        self.values: List[Any] = []    # complete top-level values, in order
+        self.repaired = False          # finish() had to close a truncated value
+        self._parts: List[str] = []    # text received since the open value started
+        self._part_starts: List[int] = []
+        self._total = 0                # absolute length of everything fed
+        self._in_string = False
+        self._escape_pending = False   # a backslash ended the previous delta
+        self._reset_value()
+
+    def _reset_value(self):
+        self._start = None             # absolute index of the open top-level bracket
+        self._stack = []
+        self._elements = []            # parsed elements of a top-level array
+        self._elem_start = 0           # where the current array element begins
+        self._elem_done = False        # current element already parsed (container)
+        self._last_comma = None        # (index, stack) of the last safe cut point
+
+    def _slice(self, start: int, end: int) -> str:
+        idx = max(0, bisect_right(self._part_starts, start) - 1)
+        text = "".join(self._parts[idx:])
+        offset = self._part_starts[idx] if self._part_starts else self._total
+        return text[start - offset:end - offset]
+
+    def _parse(self, start: int, end: int):
+        text = self._slice(start, end).strip()
+        if not text:
+            return None, False
+        try:
+            return json.loads(text), True
+        except json.JSONDecodeError:
+            return None, False
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume more text; return array elements / top-level objects completed by it."""
+        completed = []
+        while text:
+            text = self._scan(text, completed)
+        return completed
+
+    def _scan(self, text: str, completed: list) -> str:
+        """Scan one delta. Returns text to rescan if a candidate turned out not to be JSON."""
+        base = self._total
+        self._parts.append(text)
+        self._part_starts.append(base)
+        self._total += len(text)
+        n = len(text)
+        pos = 0
+
+        if self._escape_pending:
+            self._escape_pending = False
+            pos = 1
+
+        while pos < n:
+            if self._in_string:
+                m = _STRING_END.search(text, pos)
+                if not m:
+                    break
+                if m.group() == '\\':
+                    if m.end() >= n:
+                        self._escape_pending = True
+                        break
+                    pos = m.end() + 1
+                    continue
+                self._in_string = False
+                pos = m.end()
+                continue
+
+            if self._start is None:
+                m = _OPEN.search(text, pos)
+                if not m:
+                    break
+                self._start = base + m.start()
+                self._stack = [m.group()]
+                self._elem_start = base + m.end()
+                pos = m.end()
+                continue
+
+            m = _STRUCTURAL.search(text, pos)
+            if not m:
+                break
+            ch, i = m.group(), base + m.start()
+            pos = m.end()
+            in_array = self._stack[0] == '['
+            at_element = in_array and len(self._stack) == 1
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._stack.append(ch)
+            elif ch == ',':
+                self._last_comma = (i, tuple(self._stack))
+                if at_element:
+                    if not self._elem_done:
+                        value, ok = self._parse(self._elem_start, i)
+                        if not ok:
+                            return self._abandon()
+                        self._elements.append(value)
+                        completed.append(value)
+                    self._elem_start, self._elem_done = i + 1, False
+            else:
+                opener = self._stack.pop()
+                if _CLOSERS[opener] != ch:
+                    return self._abandon()
+                if self._stack:
+                    if in_array and len(self._stack) == 1:
+                        value, ok = self._parse(self._elem_start, i + 1)
+                        if not ok:
+                            return self._abandon()
+                        self._elements.append(value)
+                        completed.append(value)
+                        self._elem_done = True
+                    continue
+
+                # Top-level value closed
+                if in_array:
+                    if not self._elem_done:
+                        value, ok = self._parse(self._elem_start, i)
+                        if ok:
+                            self._elements.append(value)
+                            completed.append(value)
+                        elif self._slice(self._elem_start, i).strip():
+                            return self._abandon()
+                    self.values.append(self._elements)
+                else:
+                    value, ok = self._parse(self._start, i + 1)
+                    if not ok:
+                        return self._abandon()
+                    self.values.append(value)
+                    completed.append(value)
+                self._reset_value()
+
+        if self._start is None and not self._in_string:
+            # Nothing open: drop scanned text so long streams stay bounded
+            self._parts, self._part_starts = [], []
+        return ""
+
+    def _abandon(self) -> str:
+        """The open candidate is not JSON: return the text after its opening bracket to rescan."""
+        rest = self._slice(self._start + 1, self._total)
+        self._total = self._start + 1
+        self._parts, self._part_starts = [], []
+        self._in_string = self._escape_pending = False
+        self._reset_value()
+        return rest
+
+    def finish(self) -> Optional[Any]:
+        """The first complete value, else the open value repaired, else None."""
+        if self.values:
+            return self.values[0]
+        if self._start is None:
+            return None
+
+        text = self._slice(self._start, self._total)
+        candidates = []
+        if self._in_string:
+            if self._escape_pending:
+                text = text[:-1]  # dangling backslash escape
+            candidates.append(text + '"' + _close(self._stack))
+        else:
+            candidates.append(text.rstrip().rstrip(',') + _close(self._stack))
+        if self._last_comma:
+            cut, stack = self._last_comma
+            candidates.append(self._slice(self._start, cut) + _close(stack))
+
+        for candidate in candidates:
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            self.repaired = True
+            self.values.append(value)
+            return value
+        return None
+
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """One-shot extraction of the first JSON object/array in `text`."""
+    # Common case: the first bracket opens valid JSON — a single C-speed decode
+    m = _OPEN.search(text)
+    if m is None:
+        return None
+    try:
+        return _decoder.raw_decode(text, m.start())[0]
+    except json.JSONDecodeError:
+        pass
+    parser = JsonStreamParser()
+    parser.feed(text[m.start():])
+    return parser.finish()
@@ -37,15 +37,24 @@ def setup_logger(name: str, log_dir: str = None) -> logging.Logger:
 class RunLogger:
     """Tracks the full pipeline run for auditing."""
 
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, resume: bool = False):
         self.output_dir = output_dir
         self.log_data = {
             "started_at": datetime.now().isoformat(),
             "steps": [],
             "errors": [],
+            "stats": {},
             "completed_at": None
         }
 
+        # Keep the history of an interrupted run and append to it
+        log_path = os.path.join(output_dir, "run_log.json")
+        if resume and os.path.isfile(log_path):
+            with open(log_path, 'r') as f:
+                self.log_data.update(json.load(f))
+            self.log_data.setdefault("stats", {})
+            self.log_step("resume", "success")
+
     def log_step(self, step_name: str, status: str, details: dict = None):
         entry = {
             "step": step_name,
@@ -62,6 +71,10 @@ class RunLogger:
             "timestamp": datetime.now().isoformat()
         })
 
+    def log_stats(self, name: str, stats: dict):
+        """Record counters/timings for a subsystem (cache, scheduler, ...)."""
+        self.log_data["stats"][name] = stats
+
     def save(self):
         self.log_data["completed_at"] = datetime.now().isoformat()
         log_path = os.path.join(self.output_dir, "run_log.json")
@@ -0,0 +1,60 @@
+"""
+Metrics module.
+Thread-safe per-stage latency recording for pipeline runs and batches
+(count, total, p50/p95 per stage).
+"""
+
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0 for empty input)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageTimings:
+    """Collects wall-clock durations keyed by stage name (scrape, analyze, caption, ...)."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def merge(self, other: "StageTimings"):
+        with other._lock:
+            snapshot = {stage: list(values) for stage, values in other._samples.items()}
+        with self._lock:
+            for stage, values in snapshot.items():
+                self._samples.setdefault(stage, []).extend(values)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            snapshot = {stage: list(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "total_s": round(sum(values), 3),
+                "p50_s": round(percentile(values, 50), 3),
+                "p95_s": round(percentile(values, 95), 3),
+            }
+            for stage, values in snapshot.items()
+        }
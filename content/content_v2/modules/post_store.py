@@ -0,0 +1,242 @@
+"""
+Post store module.
+Persistent SQLite library of every inspiration post the pipeline has seen:
+the scraped post (caption, counts, a content-addressed copy of its image)
+and each analysis produced for that image, tagged with analyzer, model,
+prompt version and the brand products it mentions. Links repeated across
+runs are restored from here instead of being scraped and analysed again.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+from .image_index import file_sha256
+from .checkpoint import link_or_copy
+
+logger = setup_logger('post_store')
+
+
+def match_products(analysis: dict, caption: str, products: Iterable[str]) -> List[str]:
+    """Brand products named in an analysis or the post caption (case-insensitive)."""
+    text = (json.dumps(analysis, ensure_ascii=False) + "\n" + (caption or "")).lower()
+    return [product for product in products if product.lower() in text]
+
+
+def _public(analysis: dict) -> dict:
+    """Drop run-specific keys before storing an analysis."""
+    return {k: v for k, v in analysis.items() if k not in ("_source", "_reused_from")}
+
+
+class PostStore:
+    """
+    posts    — one row per source URL, pointing at the image by SHA-256
+    analyses — one row per (image, analyzer, model, prompt version)
+    products — brand products each analysis mentions, for per-product queries
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.images_dir = os.path.join(store_dir, "images")
+        self.db_path = os.path.join(store_dir, "posts.sqlite")
+        self.stats = {"posts_saved": 0, "posts_restored": 0, "analyses_saved": 0, "analyses_reused": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.images_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS posts ("
+                " source_url TEXT PRIMARY KEY, caption TEXT, likes INTEGER, comments INTEGER,"
+                " image_sha256 TEXT NOT NULL, image_file TEXT NOT NULL,"
+                " first_seen REAL NOT NULL, last_seen REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS posts_image ON posts (image_sha256);"
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, image_sha256 TEXT NOT NULL,"
+                " analyzer TEXT NOT NULL, model TEXT NOT NULL, prompt_version TEXT NOT NULL,"
+                " analysis TEXT NOT NULL, created_at REAL NOT NULL,"
+                " UNIQUE (image_sha256, analyzer, model, prompt_version));"
+                "CREATE TABLE IF NOT EXISTS products ("
+                " analysis_id INTEGER NOT NULL, product TEXT NOT NULL,"
+                " PRIMARY KEY (analysis_id, product));"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    # ── Posts ───────────────────────────────────────────────
+
+    def save_post(self, post) -> Optional[str]:
+        """Record a ScrapedPost and keep a copy of its image. Returns the image SHA-256."""
+        if not post.image_path or not os.path.isfile(post.image_path):
+            return None
+        sha = file_sha256(post.image_path)
+        image_file = os.path.join(self.images_dir, sha[:2], sha + os.path.splitext(post.image_path)[1].lower())
+        if not os.path.isfile(image_file):
+            os.makedirs(os.path.dirname(image_file), exist_ok=True)
+            link_or_copy(post.image_path, image_file)
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (source_url) DO UPDATE SET caption = excluded.caption,"
+                    " likes = excluded.likes, comments = excluded.comments,"
+                    " image_sha256 = excluded.image_sha256, image_file = excluded.image_file,"
+                    " last_seen = excluded.last_seen",
+                    (post.source_url, post.caption, post.likes, post.comments, sha, image_file, now, now)
+                )
+        finally:
+            conn.close()
+        self._count("posts_saved")
+        return sha
+
+    def get_post(self, source_url: str) -> Optional[dict]:
+        """Stored post for a URL as ScrapedPost kwargs (image inside the store), or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT caption, likes, comments, image_file FROM posts WHERE source_url = ?", (source_url,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or not os.path.isfile(row[3]):
+            return None
+        return {"image_path": row[3], "caption": row[0], "source_url": source_url,
+                "likes": row[1], "comments": row[2]}
+
+    def restore_post(self, source_url: str, dest_path_for) -> Optional[dict]:
+        """
+        Place the stored image for `source_url` at `dest_path_for(ext)` and
+        return the post with that path, or None if the URL is not stored.
+        """
+        record = self.get_post(source_url)
+        if record is None:
+            return None
+        dest = dest_path_for(os.path.splitext(record["image_path"])[1])
+        link_or_copy(record["image_path"], dest)
+        record["image_path"] = dest
+        self._count("posts_restored")
+        return record
+
+    def known_urls(self, urls: Iterable[str]) -> List[str]:
+        """The subset of `urls` that can be restored without scraping, in order."""
+        return [url for url in urls if self.get_post(url) is not None]
+
+    # ── Analyses ────────────────────────────────────────────
+
+    def get_analysis(self, image_sha256: str, identity: dict) -> Optional[dict]:
+        """Stored analysis of this exact image by the same analyzer, model and prompt version."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT analysis FROM analyses WHERE image_sha256 = ? AND analyzer = ?"
+                " AND model = ? AND prompt_version = ?",
+                (image_sha256, identity["analyzer"], identity["model"], identity["prompt_version"])
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        self._count("analyses_reused")
+        return json.loads(row[0])
+
+    def analyzed_images(self, identity: dict) -> set:
+        """SHA-256 of every image with an analysis matching `identity`."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT image_sha256 FROM analyses WHERE analyzer = ? AND model = ? AND prompt_version = ?",
+                (identity["analyzer"], identity["model"], identity["prompt_version"])
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row[0] for row in rows}
+
+    def save_analysis(self, image_sha256: str, identity: dict, analysis: dict, products: Iterable[str] = ()):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO analyses (image_sha256, analyzer, model, prompt_version, analysis, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (image_sha256, analyzer, model, prompt_version)"
+                    " DO UPDATE SET analysis = excluded.analysis, created_at = excluded.created_at",
+                    (image_sha256, identity["analyzer"], identity["model"], identity["prompt_version"],
+                     json.dumps(_public(analysis)), time.time())
+                )
+                analysis_id = conn.execute(
+                    "SELECT id FROM analyses WHERE image_sha256 = ? AND analyzer = ? AND model = ?"
+                    " AND prompt_version = ?",
+                    (image_sha256, identity["analyzer"], identity["model"], identity["prompt_version"])
+                ).fetchone()[0]
+                conn.execute("DELETE FROM products WHERE analysis_id = ?", (analysis_id,))
+                conn.executemany("INSERT INTO products VALUES (?, ?)",
+                                 [(analysis_id, product) for product in products])
+        finally:
+            conn.close()
+        self._count("analyses_saved")
+
+    # ── Queries ─────────────────────────────────────────────
+
+    def _analysis_rows(self, where: str, params: tuple) -> List[Dict]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT a.id, a.image_sha256, a.analyzer, a.model, a.prompt_version, a.analysis, a.created_at,"
+                " (SELECT group_concat(source_url, char(10)) FROM posts p WHERE p.image_sha256 = a.image_sha256),"
+                " (SELECT group_concat(product, char(10)) FROM products pr WHERE pr.analysis_id = a.id)"
+                f" FROM analyses a {where} ORDER BY a.created_at DESC", params
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{
+            "image_sha256": row[1],
+            "analyzer": row[2],
+            "model": row[3],
+            "prompt_version": row[4],
+            "created_at": row[6],
+            "source_urls": row[7].split("\n") if row[7] else [],
+            "products": row[8].split("\n") if row[8] else [],
+            "analysis": json.loads(row[5]),
+        } for row in rows]
+
+    def analyses_for_product(self, product: str) -> List[Dict]:
+        """Every stored analysis mentioning `product`, newest first."""
+        return self._analysis_rows(
+            "WHERE a.id IN (SELECT analysis_id FROM products WHERE product = ? COLLATE NOCASE)", (product,)
+        )
+
+    def analyses_for_url(self, source_url: str) -> List[Dict]:
+        return self._analysis_rows(
+            "WHERE a.image_sha256 IN (SELECT image_sha256 FROM posts WHERE source_url = ?)", (source_url,)
+        )
+
+    def summary(self) -> Dict:
+        """Row counts plus analyses per product."""
+        conn = self._connect()
+        try:
+            posts = conn.execute("SELECT count(*) FROM posts").fetchone()[0]
+            analyses = conn.execute("SELECT count(*) FROM analyses").fetchone()[0]
+            products = dict(conn.execute(
+                "SELECT product, count(*) FROM products GROUP BY product ORDER BY count(*) DESC"
+            ).fetchall())
+        finally:
+            conn.close()
+        return {"posts": posts, "analyses": analyses, "products": products}
+
+
+def default_post_store_dir() -> str:
+    return os.getenv("POST_STORE_DIR", os.path.join(get_project_root(), ".cache", "posts"))
@@ -0,0 +1,270 @@
+"""
+Rate limit module.
+Token-bucket pacing (requests/min and tokens/min per provider + model),
+shared across threads and processes through a small SQLite file, plus
+jittered exponential backoff on 429/overload errors that honours Retry-After.
+"""
+
+import os
+import time
+import random
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from .logger import setup_logger
+from .utils import get_project_root
+
+logger = setup_logger('rate_limit')
+
+
+# provider: (requests/min, tokens/min). None disables that bucket.
+# Override per provider with RATE_LIMIT_<PROVIDER>_RPM / RATE_LIMIT_<PROVIDER>_TPM.
+DEFAULT_LIMITS: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "anthropic": (50, 30000),
+    "gemini": (15, 1000000),
+    "google_image": (10, None),
+    "dalle": (5, None),
+    "elevenlabs": (20, None),
+}
+
+# 429 = rate limited, 529 = Anthropic overloaded, 5xx = transient upstream errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+
+# Rough vision-token allowance per attached image, used for TPM estimates
+IMAGE_TOKEN_ESTIMATE = 1600
+
+
+_bad_env = set()
+
+
+def _env_limit(name: str, default: Optional[float]) -> Optional[float]:
+    """Read a per-minute limit override; 0 disables the bucket."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return float(value) or None
+    except ValueError:
+        if name not in _bad_env:
+            _bad_env.add(name)
+            logger.warning(f"Ignoring {name}={value!r} (not a number); using {default}")
+        return default
+
+
+class RetryableError(Exception):
+    """Raised by raw HTTP callers for responses the limiter should retry."""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_status(e: Exception) -> Optional[int]:
+    """Best-effort HTTP status of an SDK/HTTP exception (Anthropic, OpenAI, google-api-core, requests)."""
+    for attr in ("status_code", "code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    response = getattr(e, "response", None)
+    value = getattr(response, "status_code", None)
+    return int(value) if isinstance(value, int) else None
+
+
+def error_retry_after(e: Exception) -> Optional[float]:
+    if getattr(e, "retry_after", None) is not None:
+        return e.retry_after
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is not None:
+        return parse_retry_after(headers.get("retry-after"))
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff; a server Retry-After hint takes precedence."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1.0)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def estimate_tokens(*texts: str, images: int = 0, max_output: int = 0) -> int:
+    """Cheap TPM estimate: ~4 chars per token, plus images and the output budget."""
+    chars = sum(len(t) for t in texts if t)
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + max_output
+
+
+class RateLimiter:
+    """
+    Token buckets persisted in SQLite so every thread and every process using
+    the same database file draws from one budget. A 429 puts the whole
+    provider/model into a shared cooldown instead of letting each caller
+    discover the limit on its own.
+    """
+
+    def __init__(self, db_path: str, limits: Optional[Dict[str, tuple]] = None):
+        self.db_path = db_path
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.stats = {"calls": 0, "waits": 0, "wait_s": 0.0, "retries": 0}
+        self._stats_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " blocked_until REAL NOT NULL DEFAULT 0)"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def limits_for(self, provider: str) -> Tuple[Optional[float], Optional[float]]:
+        rpm, tpm = self.limits.get(provider, (None, None))
+        prefix = f"RATE_LIMIT_{provider.upper()}"
+        return _env_limit(f"{prefix}_RPM", rpm), _env_limit(f"{prefix}_TPM", tpm)
+
+    def _take(self, name: str, per_minute: float, cost: float) -> float:
+        """Try to take `cost` from a bucket. Returns 0 on success, else seconds to wait."""
+        cost = min(cost, per_minute)  # a single oversized request must still fit eventually
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            tokens, updated, blocked_until = row if row else (per_minute, now, 0.0)
+            tokens = min(per_minute, tokens + (now - updated) * per_minute / 60.0)
+
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) * 60.0 / per_minute
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                (name, tokens, now, blocked_until)
+            )
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def _wait_for(self, name: str, per_minute: float, cost: float):
+        while True:
+            wait = self._take(name, per_minute, cost)
+            if wait <= 0:
+                return
+            with self._stats_lock:
+                self.stats["waits"] += 1
+                self.stats["wait_s"] = round(self.stats["wait_s"] + wait, 3)
+            time.sleep(wait + random.uniform(0, 0.1))
+
+    def acquire(self, provider: str, model: str, tokens: int = 0):
+        """Block until both the request and token buckets allow one more call."""
+        rpm, tpm = self.limits_for(provider)
+        # The rpm bucket also carries the 429 cooldown, so check it even when unlimited
+        self._wait_for(f"{provider}:{model}:rpm", rpm or 1e9, 1)
+        if tpm and tokens:
+            self._wait_for(f"{provider}:{model}:tpm", tpm, tokens)
+
+    def penalize(self, provider: str, model: str, seconds: float):
+        """Put provider/model into a shared cooldown (all threads and processes)."""
+        name = f"{provider}:{model}:rpm"
+        until = time.time() + seconds
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT blocked_until FROM buckets WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                    (name, 0.0, time.time(), until)
+                )
+            elif row[0] < until:
+                # Drain the bucket too, so callers resume gradually after the cooldown
+                conn.execute(
+                    "UPDATE buckets SET blocked_until = ?, tokens = 0, updated = ? WHERE name = ?",
+                    (until, time.time(), name)
+                )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def call(self, provider: str, model: str, fn: Callable, tokens: int = 0, max_attempts: int = 5):
+        """Run `fn` within the provider's limits, retrying retryable errors with backoff."""
+        for attempt in range(1, max_attempts + 1):
+            self.acquire(provider, model, tokens)
+            with self._stats_lock:
+                self.stats["calls"] += 1
+            try:
+                return fn()
+            except Exception as e:
+                status = error_status(e)
+                if status not in RETRYABLE_STATUS or attempt == max_attempts:
+                    raise
+                delay = backoff_delay(attempt, error_retry_after(e))
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                logger.warning(
+                    f"{provider}/{model} returned {status} (attempt {attempt}/{max_attempts}); "
+                    f"backing off {delay:.1f}s"
+                )
+                if status == 429:
+                    # acquire() on the next attempt waits out the shared cooldown
+                    self.penalize(provider, model, delay)
+                else:
+                    time.sleep(delay)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter. The DB lives in content/.cache/ so v1 and v2 share one budget."""
+    global _rate_limiter
+    with _limiter_lock:
+        if _rate_limiter is None:
+            db_path = os.getenv(
+                "RATE_LIMIT_DB", os.path.join(get_project_root(), "..", ".cache", "rate_limits.sqlite")
+            )
+            _rate_limiter = RateLimiter(os.path.normpath(db_path))
+        return _rate_limiter
+
+
+def limiter_stats() -> dict:
+    """Counters for run_log.json (empty if no call went through the limiter)."""
+    return dict(_rate_limiter.stats) if _rate_limiter else {}
+
+
+def rate_limited(provider: str, model: str, fn: Callable, tokens: int = 0):
+    """Shorthand for get_rate_limiter().call(...)."""
+    if os.getenv("RATE_LIMIT", "on").lower() == "off":
+        return fn()
+    return get_rate_limiter().call(provider, model, fn, tokens=tokens)
@@ -0,0 +1,223 @@
+"""
+Renditions module.
+Post-processes generated images in a process pool: an Instagram-ready
+JPEG (or WebP) at a target quality plus small and medium WebP thumbnails
+for the gallery, written next to the original image.png. Encodes are
+cached by source content hash, so an image shared by several posts or
+runs is encoded once.
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+from .checkpoint import link_or_copy
+
+logger = setup_logger('renditions')
+
+FORMATS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+# Instagram's largest feed size is 1080px wide, up to 4:5 portrait
+INSTAGRAM_BOX = (1080, 1350)
+THUMBNAIL_EDGES = {"sm": 400, "md": 800}
+THUMBNAIL_QUALITY = 75
+DEFAULT_QUALITY = 88
+
+
+def rendition_specs(fmt: str = "JPEG", quality: int = DEFAULT_QUALITY) -> Dict[str, tuple]:
+    """File name in the post directory → (bounding box, format, quality)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported rendition format '{fmt}' (use one of {', '.join(FORMATS)})")
+    specs = {"image" + FORMATS[fmt]: (INSTAGRAM_BOX, fmt, quality)}
+    for name, edge in THUMBNAIL_EDGES.items():
+        specs[f"thumb_{name}.webp"] = ((edge, edge), "WEBP", THUMBNAIL_QUALITY)
+    return specs
+
+
+def _encode(source_path: str, cache_dir: str, specs: Dict[str, tuple]) -> Dict:
+    """
+    Worker: encode every rendition of `source_path` into a directory keyed by
+    its bytes and the specs. manifest.json is written last, so its presence
+    means the set is complete and the encode can be skipped.
+    """
+    from PIL import Image, ImageOps
+
+    started = time.perf_counter()
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source)
+    digest.update(json.dumps(specs, sort_keys=True).encode('utf-8'))
+    key = digest.hexdigest()
+    out_dir = os.path.join(cache_dir, key[:2], key)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if all(os.path.isfile(os.path.join(out_dir, name)) for name in manifest["files"]):
+            return dict(manifest, dir=out_dir, cached=True, seconds=time.perf_counter() - started)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    with Image.open(io.BytesIO(source)) as img:
+        original_size = img.size
+        img = ImageOps.exif_transpose(img)
+        # Instagram and the thumbnails have no use for alpha; flatten onto white
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Largest first, so each smaller size is resampled from the one before
+        for name, (box, fmt, quality) in sorted(specs.items(), key=lambda s: -s[1][0][0] * s[1][0][1]):
+            img.thumbnail(box, Image.LANCZOS)
+            save_kwargs = {"method": 4} if fmt == "WEBP" else {"optimize": True, "progressive": True}
+            buffer = io.BytesIO()
+            img.save(buffer, fmt, quality=quality, **save_kwargs)
+            path = os.path.join(out_dir, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, path)
+            files[name] = {"bytes": buffer.tell(), "size": list(img.size)}
+
+    manifest = {"source_bytes": len(source), "source_size": list(original_size), "files": files}
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return dict(manifest, dir=out_dir, cached=False, seconds=time.perf_counter() - started)
+
+
+def is_image(path: str) -> bool:
+    """Whether Pillow can identify `path` (reads the header only)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return True  # let the worker report the missing dependency
+    try:
+        with Image.open(path):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+class RenditionEncoder:
+    """
+    submit() queues an image for encoding without blocking; place() waits for
+    it and links the renditions into a post directory. Encoding is CPU-bound,
+    so it runs in worker processes instead of the scheduler's threads.
+    """
+
+    def __init__(self, cache_dir: str, fmt: str = "JPEG", quality: int = DEFAULT_QUALITY,
+                 max_workers: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.specs = rendition_specs(fmt, quality)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.stats = {"images": 0, "cache_hits": 0, "skipped": 0, "failed": 0,
+                      "bytes_original": 0, "bytes_instagram": 0, "bytes_thumbnails": 0, "encode_s": 0.0}
+        self._pool = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the parent is multi-threaded
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, image_path: str) -> Optional[Future]:
+        """
+        Start encoding `image_path`; repeated submits of an unchanged file share
+        one job. Returns None for files that aren't images (mock placeholders).
+        """
+        if not is_image(image_path):
+            logger.info(f"Skipping renditions for {os.path.basename(image_path)}: not an image")
+            with self._lock:
+                self.stats["skipped"] += 1
+            return None
+        st = os.stat(image_path)
+        key = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = self._get_pool().submit(_encode, image_path, self.cache_dir, self.specs)
+            return self._futures[key]
+
+    def place(self, future: Optional[Future], post_dir: str) -> Dict[str, str]:
+        """
+        Link the finished renditions into `post_dir`. Returns file name → path
+        (empty if encoding was skipped or failed; the post keeps only its image.png).
+        """
+        if future is None:
+            return {}
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"Could not encode renditions for {os.path.basename(post_dir)}: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return {}
+
+        placed = {}
+        for name in result["files"]:
+            placed[name] = os.path.join(post_dir, name)
+            link_or_copy(os.path.join(result["dir"], name), placed[name])
+
+        sizes = {name: info["bytes"] for name, info in result["files"].items()}
+        thumbnails = sum(size for name, size in sizes.items() if name.startswith("thumb_"))
+        with self._lock:
+            self.stats["images"] += 1
+            self.stats["cache_hits"] += int(result["cached"])
+            self.stats["bytes_original"] += result["source_bytes"]
+            self.stats["bytes_instagram"] += sum(sizes.values()) - thumbnails
+            self.stats["bytes_thumbnails"] += thumbnails
+            self.stats["encode_s"] = round(self.stats["encode_s"] + result["seconds"], 4)
+        logger.info(
+            f"Renditions for {os.path.basename(post_dir)}: {result['source_bytes'] / 1024:.0f} KB → "
+            + ", ".join(f"{name} {size / 1024:.0f} KB" for name, size in sizes.items())
+            + (" (cached)" if result["cached"] else "")
+        )
+        return placed
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        if stats["bytes_original"]:
+            stats["bytes_saved_pct"] = round(100 * (1 - stats["bytes_instagram"] / stats["bytes_original"]), 1)
+        return stats
+
+    def close(self, cancel: bool = False):
+        with self._lock:
+            self._futures.clear()
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=not cancel, cancel_futures=cancel)
+
+
+def default_renditions_dir() -> str:
+    return os.getenv("RENDITIONS_DIR", os.path.join(get_project_root(), ".cache", "renditions"))
+
+
+def get_rendition_encoder() -> RenditionEncoder:
+    """Encoder configured from RENDITIONS_DIR / RENDITION_FORMAT / RENDITION_QUALITY / RENDITION_WORKERS."""
+    workers = os.getenv("RENDITION_WORKERS")
+    return RenditionEncoder(
+        default_renditions_dir(),
+        fmt=os.getenv("RENDITION_FORMAT", "JPEG").upper(),
+        quality=int(os.getenv("RENDITION_QUALITY", DEFAULT_QUALITY)),
+        max_workers=int(workers) if workers else None,
+    )
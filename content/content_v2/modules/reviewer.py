@@ -7,14 +7,30 @@ Scores brand alignment, inspiration match, engagement potential, and overall qua
 import os
 import json
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List
 
 from .logger import setup_logger
 from .utils import load_prompt, extract_json_from_text
+from .cache import get_response_cache
+from .rate_limit import rate_limited, estimate_tokens
 
 logger = setup_logger('reviewer')
 
 
+def default_review(reason: str, raw_review: str = None) -> dict:
+    """Neutral scores used when a review response cannot be parsed."""
+    review = {
+        "brand_alignment": {"score": 5, "reason": reason},
+        "inspiration_match": {"score": 5, "reason": reason},
+        "engagement_potential": {"score": 5, "reason": reason},
+        "overall_quality": {"score": 5, "reason": reason},
+        "suggestions": [],
+    }
+    if raw_review is not None:
+        review["raw_review"] = raw_review
+    return review
+
+
 class BaseReviewer(ABC):
 
     @abstractmethod
@@ -22,6 +38,14 @@ class BaseReviewer(ABC):
                brand_context: dict) -> dict:
         pass
 
+    def review_batch(self, variants: List[dict], analysis: dict, brand_context: dict) -> List[dict]:
+        """
+        Review every variant of one analysis. `variants` are {caption, image_prompt}
+        dicts; returns one review per variant, in order. Providers that can score
+        several posts in one request override this.
+        """
+        return [self.review(v["caption"], v["image_prompt"], analysis, brand_context) for v in variants]
+
 
 class ClaudeReviewer(BaseReviewer):
 
@@ -34,11 +58,66 @@ class ClaudeReviewer(BaseReviewer):
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in .env")
         self.client = Anthropic(api_key=self.api_key)
+        self.model_name = "claude-sonnet-4-5-20250929"
+
+    def _system_blocks(self, brand_context: dict) -> List[dict]:
+        """
+        Static prefix shared by every review request: the review instructions and
+        the brand context. The cache_control breakpoint lets Anthropic serve this
+        prefix from its prompt cache instead of re-reading it for every post.
+        """
+        return [
+            {"type": "text", "text": load_prompt("review_post")},
+            {
+                "type": "text",
+                "text": f"**Brand Context:**\n{json.dumps(brand_context, indent=2)}",
+                "cache_control": {"type": "ephemeral"},
+            },
+        ]
+
+    def _create_message(self, system_prompt, content, max_tokens: int, estimate: int) -> str:
+        """Rate-limited messages.create returning the response text."""
+        response = rate_limited(
+            "anthropic", self.model_name,
+            lambda: self.client.messages.create(
+                model=self.model_name,
+                max_tokens=max_tokens,
+                system=system_prompt,
+                messages=[{"role": "user", "content": content}]
+            ),
+            tokens=estimate
+        )
+        usage = response.usage
+        logger.info(
+            f"Review tokens — input: {usage.input_tokens}, "
+            f"cache read: {getattr(usage, 'cache_read_input_tokens', 0) or 0}, "
+            f"cache write: {getattr(usage, 'cache_creation_input_tokens', 0) or 0}"
+        )
+        return response.content[0].text
+
+    def _call(self, system_blocks: List[dict], analysis: dict, user_prompt: str, max_tokens: int) -> str:
+        # The analysis is identical for every variant of one inspiration, so it
+        # gets its own breakpoint ahead of the per-post text.
+        content = [
+            {
+                "type": "text",
+                "text": f"**Original Inspiration Analysis:**\n{json.dumps(analysis, indent=2)}",
+                "cache_control": {"type": "ephemeral"},
+            },
+            {"type": "text", "text": user_prompt},
+        ]
+        text = "".join(block["text"] for block in system_blocks + content)
+        return get_response_cache().get_or_call(
+            lambda: self._create_message(
+                system_blocks, content, max_tokens,
+                estimate_tokens(text, max_output=max_tokens)
+            ),
+            provider="anthropic", model=self.model_name, system=system_blocks,
+            user=content, params={"max_tokens": max_tokens}
+        )
 
     def review(self, caption: str, image_prompt: str, analysis: dict,
                brand_context: dict) -> dict:
-        system_prompt = load_prompt("review_post")
-
         user_prompt = f"""
 Review this generated Instagram post for the Benefills brand:
 
@@ -48,38 +127,60 @@ Review this generated Instagram post for the Benefills brand:
 **Image Generation Prompt:**
 {image_prompt}
 
-**Original Inspiration Analysis:**
-{json.dumps(analysis, indent=2)}
-
-**Brand Context:**
-{json.dumps(brand_context, indent=2)}
-
-Score this post and provide suggestions.
+Score this post against the inspiration analysis above and provide suggestions.
 """
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=1000,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
-        )
-
-        response_text = message.content[0].text
+        response_text = self._call(self._system_blocks(brand_context), analysis, user_prompt, 1000)
         review = extract_json_from_text(response_text)
 
-        if review is None:
+        if not isinstance(review, dict):
             logger.warning("Could not parse review JSON, using defaults")
-            review = {
-                "brand_alignment": {"score": 5, "reason": "Could not parse review"},
-                "inspiration_match": {"score": 5, "reason": "Could not parse review"},
-                "engagement_potential": {"score": 5, "reason": "Could not parse review"},
-                "overall_quality": {"score": 5, "reason": "Could not parse review"},
-                "suggestions": [],
-                "raw_review": response_text
-            }
+            review = default_review("Could not parse review", response_text)
 
         return review
 
+    def review_batch(self, variants: List[dict], analysis: dict, brand_context: dict) -> List[dict]:
+        """Score all variants of one analysis in a single request."""
+        if len(variants) == 1:
+            return [self.review(variants[0]["caption"], variants[0]["image_prompt"], analysis, brand_context)]
+
+        posts = "\n".join(
+            f"### Variant {idx}\n\n**Generated Caption:**\n{v['caption']}\n\n"
+            f"**Image Generation Prompt:**\n{v['image_prompt']}\n"
+            for idx, v in enumerate(variants, 1)
+        )
+        user_prompt = f"""
+Review these {len(variants)} generated Instagram post variants for the Benefills brand.
+They were all adapted from the inspiration analysed above; score each one independently.
+
+{posts}
+Return a JSON array with exactly one review object per variant, in order. Each object
+has the review fields from the output format plus "variant": its number (1-{len(variants)}).
+"""
+
+        response_text = self._call(
+            self._system_blocks(brand_context), analysis, user_prompt, 1000 * len(variants)
+        )
+        result = extract_json_from_text(response_text)
+        if isinstance(result, dict):
+            result = next((value for value in result.values() if isinstance(value, list)), [result])
+        if not isinstance(result, list):
+            logger.warning("Could not parse batched review JSON, using defaults")
+            return [default_review("Could not parse review", response_text) for _ in variants]
+
+        by_variant = {}
+        for position, review in enumerate(result, 1):
+            if isinstance(review, dict):
+                number = review.pop("variant", position)
+                by_variant.setdefault(number if isinstance(number, int) else position, review)
+
+        reviews = []
+        for idx in range(1, len(variants) + 1):
+            if idx not in by_variant:
+                logger.warning(f"Batched review is missing variant {idx}, using defaults")
+            reviews.append(by_variant.get(idx, default_review("Missing from batched review")))
+        return reviews
+
 
 class MockReviewer(BaseReviewer):
 
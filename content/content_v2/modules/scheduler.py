@@ -0,0 +1,134 @@
+"""
+Stage scheduler module.
+Runs pipeline stages (caption → image / review) on per-provider thread
+pools, so independent network calls overlap while each provider stays
+within its own concurrency limit.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .logger import setup_logger
+
+logger = setup_logger('scheduler')
+
+
+# Max in-flight calls per provider
+DEFAULT_PROVIDER_LIMITS = {
+    "anthropic": 4,
+    "gemini": 4,
+    "google_image": 2,
+    "dalle": 2,
+}
+
+TEXT_PROVIDER_KEYS = {"claude": "anthropic", "gemini": "gemini"}
+IMAGE_PROVIDER_KEYS = {"google": "google_image", "dalle": "dalle"}
+
+
+def text_provider_key(provider: str) -> str:
+    """Map a --text-provider value to its scheduler pool name."""
+    return TEXT_PROVIDER_KEYS.get(provider, provider)
+
+
+def image_provider_key(provider: str) -> str:
+    """Map an --image-provider value to its scheduler pool name."""
+    return IMAGE_PROVIDER_KEYS.get(provider, provider)
+
+
+def parse_limits(specs: Optional[List[str]]) -> Dict[str, int]:
+    """Parse CLI overrides like ["anthropic=6", "google_image=1"]."""
+    limits = {}
+    for spec in specs or []:
+        name, sep, value = spec.partition("=")
+        if not sep or not value.strip().isdigit() or int(value) < 1:
+            raise ValueError(f"Invalid concurrency limit '{spec}' (expected provider=N, N >= 1)")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+def fan_out(future: Future, count: int) -> List[Future]:
+    """Per-item futures for a future that resolves to a list of `count` results."""
+    items = [Future() for _ in range(count)]
+
+    def _on_done(done: Future):
+        try:
+            results = done.result()
+        except BaseException as e:
+            for item in items:
+                item.set_exception(e)
+            return
+        for item, result in zip(items, results):
+            item.set_result(result)
+
+    future.add_done_callback(_on_done)
+    return items
+
+
+class StageScheduler:
+    """
+    Task runner with one bounded pool per provider.
+
+    `submit` returns a Future immediately; chain stages by passing one
+    stage's results into the next (see `fan_out`).
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = dict(DEFAULT_PROVIDER_LIMITS)
+        self.limits.update(limits or {})
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, provider: str, limit: int):
+        """Change a provider's limit. Only effective before its first task."""
+        with self._lock:
+            if provider in self._pools:
+                logger.warning(f"Pool for '{provider}' already running; limit change ignored")
+                return
+            self.limits[provider] = limit
+
+    def _pool(self, provider: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(provider)
+            if pool is None:
+                workers = self.limits.get(provider, 1)
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=provider)
+                self._pools[provider] = pool
+                logger.info(f"Started '{provider}' pool with {workers} worker(s)")
+            return pool
+
+    def submit(self, provider: str, fn: Callable, *args, **kwargs) -> Future:
+        result: Future = Future()
+
+        def _run():
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                result.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                result.set_exception(e)
+
+        try:
+            inner = self._pool(provider).submit(_run)
+        except RuntimeError as e:
+            # Pool already shut down (e.g. pipeline interrupted)
+            result.set_exception(e)
+            return result
+        # shutdown(cancel_futures=True) drops queued work: cancel ours with it
+        inner.add_done_callback(lambda done: result.cancel() if done.cancelled() else None)
+        return result
+
+    def shutdown(self, wait: bool = True, cancel: bool = False):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=cancel)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On error/interrupt, drop queued work instead of draining it
+        self.shutdown(wait=exc_type is None, cancel=exc_type is not None)
+        return False
@@ -1,19 +1,56 @@
 """
 Instagram scraper module.
-Fetches images and captions from public Instagram posts using Playwright.
-Falls back gracefully if scraping fails.
+Fetches images and captions from public Instagram posts: a plain HTTP GET
+of the post page first, Playwright only for pages whose og: tags need a
+browser. Falls back gracefully if scraping fails.
 """
 
 import os
+import time
 import shutil
+import asyncio
 import tempfile
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable, List, Dict, Optional
 
 from .logger import setup_logger
+from .downloader import get_downloader
+from .http_cache import get_http_cache
 
 logger = setup_logger('scraper')
 
+# Pages scraped concurrently in one browser context (main.py: --scrape-pages N)
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_S = 20
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+# Backends for ScraperFactory: HTTP with browser fallback, or either alone
+SCRAPER_BACKENDS = ("auto", "http", "browser")
+
+# Everything but the document is irrelevant to reading two meta tags
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "script", "stylesheet"}
+
+# With scripts blocked nothing is added after parsing: either the tag has
+# arrived or the document is parsed without it
+OG_READY = """() => document.querySelector('meta[property="og:image"]') !== null
+    || document.readyState !== 'loading'"""
+READ_OG_TAGS = """() => {
+    const tag = name => document.querySelector(`meta[property="${name}"]`);
+    return [tag("og:image")?.content || null, tag("og:description")?.content || null];
+}"""
+
+
+async def _block_unneeded(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 
 class ScrapedPost:
     """Represents a scraped Instagram post."""
@@ -38,22 +75,37 @@ class ScrapedPost:
 class BaseScraper(ABC):
     """Abstract scraper — makes it easy to swap scraping backends or add video later."""
 
+    def __init__(self):
+        self._url_timings: List[Dict] = []
+
     @abstractmethod
-    def scrape_posts(self, urls: List[str], output_dir: str) -> List[ScrapedPost]:
+    def scrape_posts(self, urls: List[str], output_dir: str,
+                     on_scraped: Optional[Callable[[ScrapedPost], None]] = None) -> List[ScrapedPost]:
+        """Scrape each URL. `on_scraped` is called as soon as each post is saved (for checkpointing)."""
         pass
 
     @abstractmethod
     def load_local_images(self, image_paths: List[str], output_dir: str) -> List[ScrapedPost]:
         pass
 
+    def close(self):
+        """Release any long-lived resources (browser, sessions). Safe to call repeatedly."""
+        pass
 
+    def _record_url(self, url: str, status: str, seconds: float, **details):
+        self._url_timings.append(dict({"url": url, "status": status, "seconds": round(seconds, 3)}, **details))
 
+    def pop_url_timings(self) -> List[Dict]:
+        """Per-URL scrape timings ({url, status, seconds}) recorded since the last call."""
+        timings, self._url_timings = self._url_timings, []
+        return timings
 
 
 class MockScraper(BaseScraper):
     """Mock scraper for testing without hitting Instagram."""
 
-    def scrape_posts(self, urls: List[str], output_dir: str) -> List[ScrapedPost]:
+    def scrape_posts(self, urls: List[str], output_dir: str,
+                     on_scraped: Optional[Callable[[ScrapedPost], None]] = None) -> List[ScrapedPost]:
         scraped = []
         os.makedirs(output_dir, exist_ok=True)
 
@@ -61,6 +113,7 @@ class MockScraper(BaseScraper):
         placeholder_path = os.path.join(os.path.dirname(__file__), '..', 'output', 'test_benefills_gen.png')
         
         for i, url in enumerate(urls):
+            started = time.perf_counter()
             if os.path.exists(placeholder_path):
                 img_path = os.path.join(output_dir, f"inspo_{i+1}.png")
                 import shutil
@@ -72,13 +125,17 @@ class MockScraper(BaseScraper):
                     f.write(f"[MOCK IMAGE from {url}]")
                 logger.info(f"[MOCK] Created text placeholder: {img_path}")
 
-            scraped.append(ScrapedPost(
+            post = ScrapedPost(
                 image_path=img_path,
                 caption=f"Mock caption for post {i+1}: Amazing healthy snack that changed my life! 🌿 #health #wellness",
                 source_url=url,
                 likes=1500,
                 comments=89
-            ))
+            )
+            scraped.append(post)
+            if on_scraped:
+                on_scraped(post)
+            self._record_url(url, "ok", time.perf_counter() - started)
             logger.info(f"[MOCK] Scraped post {i+1}: {url}")
 
         return scraped
@@ -95,98 +152,340 @@ class MockScraper(BaseScraper):
 
 
 class PlaywrightScraper(BaseScraper):
-    """Scrapes public Instagram posts using Playwright (Simulates real browser)."""
+    """
+    Scrapes public Instagram posts with async Playwright: a bounded pool of
+    pages in one browser context works through the URLs concurrently. Only
+    the document itself is fetched (images, fonts, media, scripts and
+    stylesheets are aborted) and each page is read as soon as its og:image
+    meta tag is in the DOM.
+    """
+
+    def __init__(self, keep_browser: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout_s: float = DEFAULT_TIMEOUT_S):
+        # keep_browser=True keeps Chromium running between scrape_posts() calls
+        # (used by batch runs); the caller must then call close().
+        super().__init__()
+        self.keep_browser = keep_browser
+        self.concurrency = max(1, concurrency)
+        self.timeout_ms = int(timeout_s * 1000)
+        self._loop = None
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._pages = []
+        self._run_lock = threading.Lock()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        # A private loop: the browser is bound to it and must outlive one scrape_posts() call
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    async def _ensure_context(self):
+        if self._context is not None:
+            return self._context
 
-    def scrape_posts(self, urls: List[str], output_dir: str) -> List[ScrapedPost]:
         try:
-            from playwright.sync_api import sync_playwright
+            from playwright.async_api import async_playwright
         except ImportError:
             logger.error("playwright not installed. Run: pip install playwright && playwright install chromium")
             raise
 
-        scraped = []
+        self._playwright = await async_playwright().start()
+        try:
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        except Exception as e:
+            logger.error(f"Failed to launch browser: {e}. Ensure 'playwright install chromium' is run.")
+            await self._aclose()
+            raise e
+
+        self._context = await self._browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={'width': 1280, 'height': 800}
+        )
+        await self._context.route("**/*", _block_unneeded)
+        return self._context
+
+    async def _aclose(self):
+        for resource in (self._context, self._browser):
+            if resource is not None:
+                try:
+                    await resource.close()
+                except Exception as e:
+                    logger.warning(f"Error while closing browser: {e}")
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = self._browser = self._context = None
+        self._pages = []
+
+    def close(self):
+        if self._loop is None or self._loop.is_closed():
+            return
+        with self._run_lock:
+            self._loop.run_until_complete(self._aclose())
+            self._loop.close()
+            self._loop = None
+
+    def scrape_posts(self, urls: List[str], output_dir: str,
+                     on_scraped: Optional[Callable[[ScrapedPost], None]] = None) -> List[ScrapedPost]:
         os.makedirs(output_dir, exist_ok=True)
-
-        with sync_playwright() as p:
-            # Launch browser
+        try:
+            with self._run_lock:
+                return self._event_loop().run_until_complete(self._scrape_all(urls, output_dir, on_scraped))
+        finally:
+            if not self.keep_browser:
+                self.close()
+
+    async def _scrape_all(self, urls: List[str], output_dir: str,
+                          on_scraped: Optional[Callable[[ScrapedPost], None]]) -> List[ScrapedPost]:
+        context = await self._ensure_context()
+        # Pages stay open between URLs (and between calls when keep_browser is set)
+        while len(self._pages) < min(self.concurrency, len(urls)):
+            self._pages.append(await context.new_page())
+        pool = asyncio.Queue()
+        for page in self._pages:
+            pool.put_nowait(page)
+
+        async def scrape_one(i: int, url: str) -> Optional[ScrapedPost]:
+            page = await pool.get()
+            started = time.perf_counter()
+            status = "failed"
             try:
-                browser = p.chromium.launch(headless=True)
+                if page is None:
+                    logger.error(f"  ✗ Skipping {url}: no browser page could be opened")
+                    return None
+                logger.info(f"Scraping post {i+1}/{len(urls)}: {url}")
+                post = await self._scrape_page(page, url, os.path.join(output_dir, f"inspo_{i+1}.jpg"))
+                status = "ok" if post else "no_og_image"
+                if post and on_scraped:
+                    on_scraped(post)
+                return post
             except Exception as e:
-                logger.error(f"Failed to launch browser: {e}. Ensure 'playwright install chromium' is run.")
-                raise e
-
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            for i, url in enumerate(urls):
+                logger.error(f"  ✗ Failed to scrape {url}: {str(e)}")
+                # A page that timed out mid-navigation is replaced rather than reused
                 try:
-                    logger.info(f"Scraping post {i+1}/{len(urls)}: {url}")
-                    page = context.new_page()
-                    
-                    # Go to URL with timeout
-                    page.goto(url, wait_until="networkidle", timeout=60000)
-                    
-                    # Extract Data
-                    og_image = page.locator('meta[property="og:image"]').get_attribute('content')
-                    og_desc = page.locator('meta[property="og:description"]').get_attribute('content')
-
-                    if og_image:
-                        # Download Image
-                        import requests
-                        img_data = requests.get(og_image).content
-                        dest_path = os.path.join(output_dir, f"inspo_{i+1}.jpg")
-                        with open(dest_path, "wb") as f:
-                            f.write(img_data)
-                        
-                        caption = og_desc if og_desc else ""
-                        
-                        logger.info(f"  ✓ Scraped successfully")
-                        scraped.append(ScrapedPost(
-                            image_path=dest_path,
-                            caption=caption,
-                            source_url=url
-                        ))
-                    else:
-                        logger.warning(f"  ✗ No og:image found for: {url}")
-                        # Take error screenshot for debug if needed
-                        # page.screenshot(path=os.path.join(output_dir, f"error_{i+1}.png"))
-
-                    page.close()
-
+                    await page.close()
+                except Exception:
+                    pass
+                self._pages.remove(page)
+                page = None
+                try:
+                    page = await context.new_page()
+                    self._pages.append(page)
                 except Exception as e:
-                    logger.error(f"  ✗ Failed to scrape {url}: {str(e)}")
-                    continue
-
-            browser.close()
-
-        return scraped
+                    logger.warning(f"  Could not open a replacement page ({e}); "
+                                   f"continuing with {len(self._pages)} page(s)")
+                return None
+            finally:
+                self._record_url(url, status, time.perf_counter() - started)
+                # Only a working page goes back; once none are left, None releases the waiting URLs
+                if page is not None or not self._pages:
+                    pool.put_nowait(page)
+
+        results = await asyncio.gather(*(scrape_one(i, url) for i, url in enumerate(urls)))
+        return [post for post in results if post is not None]
+
+    async def _scrape_page(self, page, url: str, dest_path: str) -> Optional[ScrapedPost]:
+        # The og: tags are in the server-rendered <head>; no need to wait for the network to settle
+        await page.goto(url, wait_until="commit", timeout=self.timeout_ms)
+        await page.wait_for_function(OG_READY, timeout=self.timeout_ms)
+        og_image, og_desc = await page.evaluate(READ_OG_TAGS)
+        if not og_image:
+            logger.warning(f"  ✗ No og:image found for: {url}")
+            return None
+
+        # Download Image
+        await asyncio.to_thread(get_downloader().download, og_image, dest_path, cache=True)
+        logger.info(f"  ✓ Scraped successfully: {url}")
+        return ScrapedPost(
+            image_path=dest_path,
+            caption=og_desc or "",
+            source_url=url
+        )
 
     def load_local_images(self, image_paths: List[str], output_dir: str) -> List[ScrapedPost]:
-        """Load local images as ScrapedPost objects."""
-        scraped = []
+        return copy_local_images(image_paths, output_dir)
+
+
+class _OgTagParser(HTMLParser):
+    """Collects og: meta tags; stops caring once </head> is reached."""
+
+    def __init__(self):
+        super().__init__()
+        self.tags: Dict[str, str] = {}
+        self.head_done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            name = attrs.get("property") or attrs.get("name") or ""
+            if name.startswith("og:") and attrs.get("content"):
+                self.tags.setdefault(name, attrs["content"])
+        elif tag == "body":
+            self.head_done = True
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.head_done = True
+
+
+class HttpScraper(BaseScraper):
+    """
+    Reads og:image / og:description from a plain GET of each post page over
+    a pooled keep-alive session, reading only up to </head>. URLs where that
+    fails (login wall, no tags, HTTP error) go to `fallback` — normally a
+    PlaywrightScraper, whose browser is only launched if it is needed.
+    """
+
+    def __init__(self, fallback: Optional[BaseScraper] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout_s: float = DEFAULT_TIMEOUT_S):
+        super().__init__()
+        self.fallback = fallback
+        self.concurrency = max(1, concurrency)
+        self.timeout = (min(10.0, timeout_s), timeout_s)
+        self.stats = {"http": 0, "browser": 0, "failed": 0}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+            self._session = session
+        return self._session
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def fetch_og_tags(self, url: str) -> Dict[str, str]:
+        """
+        og: tags from the page's <head>; the rest of the body is never downloaded.
+        The <head> is kept in the HTTP cache and revalidated on later runs.
+        """
+        parser = _OgTagParser()
+        http_cache = get_http_cache()
+        entry = http_cache.lookup(url) if http_cache else None
+        with self._get_session().get(url, stream=True, timeout=self.timeout,
+                                     headers=http_cache.conditional_headers(entry) if entry else None) as response:
+            if entry is not None and response.status_code == 304:
+                parser.feed(http_cache.read(entry).decode('utf-8'))
+                return parser.tags
+            response.raise_for_status()
+            head = []
+            for chunk in response.iter_content(chunk_size=16 * 1024, decode_unicode=True):
+                if isinstance(chunk, bytes):
+                    chunk = chunk.decode(response.encoding or "utf-8", errors="replace")
+                head.append(chunk)
+                parser.feed(chunk)
+                if parser.head_done:
+                    break
+        if http_cache:
+            data = "".join(head).encode('utf-8')
+            http_cache.miss(len(data))
+            http_cache.store_bytes(url, response.headers, data)
+        return parser.tags
+
+    def _scrape_one(self, i: int, url: str, output_dir: str) -> Optional[ScrapedPost]:
+        started = time.perf_counter()
+        try:
+            tags = self.fetch_og_tags(url)
+            if not tags.get("og:image"):
+                self._record_url(url, "no_og_image", time.perf_counter() - started, backend="http")
+                return None
+            dest_path = os.path.join(output_dir, f"inspo_{i+1}.jpg")
+            get_downloader().download(tags["og:image"], dest_path, cache=True)
+        except Exception as e:
+            logger.info(f"  HTTP fast path failed for {url}: {e}")
+            self._record_url(url, "failed", time.perf_counter() - started, backend="http")
+            return None
+        self._record_url(url, "ok", time.perf_counter() - started, backend="http")
+        self._count("http")
+        logger.info(f"  ✓ Scraped over HTTP: {url}")
+        return ScrapedPost(image_path=dest_path, caption=tags.get("og:description", ""), source_url=url)
+
+    def scrape_posts(self, urls: List[str], output_dir: str,
+                     on_scraped: Optional[Callable[[ScrapedPost], None]] = None) -> List[ScrapedPost]:
         os.makedirs(output_dir, exist_ok=True)
+        found: Dict[str, ScrapedPost] = {}
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, max(1, len(urls))),
+                                thread_name_prefix="scrape_http") as pool:
+            futures = [pool.submit(self._scrape_one, i, url, output_dir) for i, url in enumerate(urls)]
+            # Callbacks run in URL order on the caller's thread
+            for url, future in zip(urls, futures):
+                post = future.result()
+                if post:
+                    found[url] = post
+                    if on_scraped:
+                        on_scraped(post)
+
+        missing = [url for url in urls if url not in found]
+        if missing and self.fallback is not None:
+            logger.info(f"Falling back to the browser for {len(missing)} of {len(urls)} posts")
+            browser_dir = os.path.join(output_dir, "_browser")
+            for post in self.fallback.scrape_posts(missing, browser_dir, on_scraped=on_scraped):
+                found[post.source_url] = post
+                self._count("browser")
+            for entry in self.fallback.pop_url_timings():
+                self._url_timings.append(dict(entry, backend="browser"))
+
+        for url in urls:
+            if url not in found:
+                self._count("failed")
+        return [found[url] for url in urls if url in found]
 
-        for i, path in enumerate(image_paths):
-            if os.path.isfile(path):
-                dest_path = os.path.join(output_dir, f"inspo_{i+1}{os.path.splitext(path)[1]}")
-                shutil.copy2(path, dest_path)
-                scraped.append(ScrapedPost(
-                    image_path=dest_path,
-                    caption="[Local image — no caption available]",
-                    source_url=f"file://{os.path.abspath(path)}"
-                ))
-                logger.info(f"Loaded local image: {path}")
-            else:
-                logger.warning(f"Image not found: {path}")
+    def load_local_images(self, image_paths: List[str], output_dir: str) -> List[ScrapedPost]:
+        return copy_local_images(image_paths, output_dir)
 
-        return scraped
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def copy_local_images(image_paths: List[str], output_dir: str) -> List[ScrapedPost]:
+    """Load local images as ScrapedPost objects."""
+    scraped = []
+    os.makedirs(output_dir, exist_ok=True)
+
+    for i, path in enumerate(image_paths):
+        if os.path.isfile(path):
+            dest_path = os.path.join(output_dir, f"inspo_{i+1}{os.path.splitext(path)[1]}")
+            shutil.copy2(path, dest_path)
+            scraped.append(ScrapedPost(
+                image_path=dest_path,
+                caption="[Local image — no caption available]",
+                source_url=f"file://{os.path.abspath(path)}"
+            ))
+            logger.info(f"Loaded local image: {path}")
+        else:
+            logger.warning(f"Image not found: {path}")
+
+    return scraped
 
 
 class ScraperFactory:
     @staticmethod
-    def get_scraper(mock: bool = False) -> BaseScraper:
+    def get_scraper(mock: bool = False, keep_browser: bool = False,
+                    concurrency: int = DEFAULT_CONCURRENCY, backend: str = "auto") -> BaseScraper:
+        """
+        backend: "auto" — HTTP fast path, browser only for posts it misses (default)
+                 "http" — HTTP only, never launches Chromium
+                 "browser" — Playwright for every post
+        """
         if mock:
             return MockScraper()
-        return PlaywrightScraper()
+        if backend not in SCRAPER_BACKENDS:
+            raise ValueError(f"Unknown scraper backend '{backend}' (use one of {', '.join(SCRAPER_BACKENDS)})")
+        if backend == "browser":
+            return PlaywrightScraper(keep_browser=keep_browser, concurrency=concurrency)
+        fallback = PlaywrightScraper(keep_browser=keep_browser, concurrency=concurrency) if backend == "auto" else None
+        return HttpScraper(fallback=fallback, concurrency=concurrency)
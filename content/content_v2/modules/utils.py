@@ -1,9 +1,11 @@
 import os
 import json
 import re
-from typing import Optional
+from typing import Any, Optional
 from urllib.parse import urlparse
 
+from .json_stream import extract_json
+
 
 def get_project_root() -> str:
     """Get the root of the content_v2 project."""
@@ -45,31 +47,13 @@ def sanitize_filename(name: str) -> str:
     return sanitized[:50]
 
 
-def extract_json_from_text(text: str) -> Optional[dict]:
-    """Extract a JSON object from AI response text that may contain markdown."""
-    # Try direct parse first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-
-    # Try to find JSON in code blocks
-    json_match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(1).strip())
-        except json.JSONDecodeError:
-            pass
-
-    # Try to find raw JSON object
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
-
-    return None
+def extract_json_from_text(text: str) -> Optional[Any]:
+    """
+    Extract the first JSON object or array from AI response text that may
+    contain markdown or prose. Output truncated at max_tokens is repaired.
+    Callers that need an object must check for a dict: a list comes back as is.
+    """
+    return extract_json(text)
 
 
 def truncate_text(text: str, max_chars: int = 2000) -> str:
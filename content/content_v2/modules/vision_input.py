@@ -0,0 +1,185 @@
+"""
+Vision input module.
+Prepares inspiration images for the analyzers: downsizes to a maximum edge,
+applies EXIF orientation, drops metadata and re-encodes (WebP by default).
+Results are cached by content hash, so an inspiration is encoded once no
+matter how many runs include it.
+"""
+
+import io
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from .logger import setup_logger
+from .utils import get_project_root
+
+logger = setup_logger('vision_input')
+
+MEDIA_TYPES = {
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+    '.webp': 'image/webp', '.gif': 'image/gif',
+}
+FORMATS = {"WEBP": ("image/webp", ".webp"), "JPEG": ("image/jpeg", ".jpg"), "PNG": ("image/png", ".png")}
+
+# Claude bills images at roughly width * height / 750 tokens and downsizes
+# anything with a long edge over 1568px server-side anyway.
+DEFAULT_MAX_EDGE = 1568
+PIXELS_PER_TOKEN = 750
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    return (width * height) // PIXELS_PER_TOKEN
+
+
+class VisionImage:
+    """A model-ready image plus what preparing it saved."""
+
+    def __init__(self, data: bytes, media_type: str, original_bytes: int,
+                 original_size: tuple, size: tuple, prep_s: float = 0.0, cached: bool = False):
+        self.data = data
+        self.media_type = media_type
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.size = size
+        self.prep_s = prep_s
+        self.cached = cached
+
+    def report(self) -> dict:
+        return {
+            "bytes_original": self.original_bytes,
+            "bytes_sent": len(self.data),
+            "size_original": list(self.original_size),
+            "size_sent": list(self.size),
+            "image_tokens_original": estimate_image_tokens(*self.original_size),
+            "image_tokens_sent": estimate_image_tokens(*self.size),
+            "prep_s": round(self.prep_s, 4),
+            "cached": self.cached,
+        }
+
+
+class VisionPreprocessor:
+    """Downsize + re-encode with an on-disk cache keyed by source bytes and settings."""
+
+    def __init__(self, cache_dir: str, max_edge: int = DEFAULT_MAX_EDGE,
+                 fmt: str = "WEBP", quality: int = 85):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported vision format '{fmt}' (use one of {', '.join(FORMATS)})")
+        self.cache_dir = cache_dir
+        self.max_edge = max_edge
+        self.fmt = fmt
+        self.quality = quality
+        self.stats = {"images": 0, "cache_hits": 0, "bytes_original": 0, "bytes_sent": 0,
+                      "image_tokens_original": 0, "image_tokens_sent": 0, "prep_s": 0.0}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, source: bytes) -> str:
+        digest = hashlib.sha256(source)
+        digest.update(f"|{self.max_edge}|{self.fmt}|{self.quality}".encode('utf-8'))
+        key = digest.hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + FORMATS[self.fmt][1])
+
+    def prepare(self, image_path: str) -> VisionImage:
+        """Return the prepared image for `image_path` (the original if it cannot be decoded)."""
+        from PIL import Image, ImageOps
+
+        with open(image_path, 'rb') as f:
+            source = f.read()
+        started = time.perf_counter()
+        media_type, ext = FORMATS[self.fmt]
+        cache_path = self._cache_path(source)
+
+        try:
+            with Image.open(io.BytesIO(source)) as img:
+                original_size = img.size
+                if os.path.isfile(cache_path):
+                    with open(cache_path, 'rb') as f:
+                        data = f.read()
+                    with Image.open(io.BytesIO(data)) as prepared:
+                        size = prepared.size
+                    result = VisionImage(data, media_type, len(source), original_size, size,
+                                         time.perf_counter() - started, cached=True)
+                else:
+                    img = ImageOps.exif_transpose(img)
+                    img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+                    if self.fmt == "JPEG":
+                        img = img.convert("RGB")
+                    elif img.mode not in ("RGB", "RGBA"):
+                        has_alpha = "A" in img.getbands() or "transparency" in img.info
+                        img = img.convert("RGBA" if has_alpha else "RGB")
+                    save_kwargs = {"method": 4} if self.fmt == "WEBP" else {"optimize": True}
+                    buffer = io.BytesIO()
+                    # No exif/icc/info passed through: metadata is dropped on re-encode
+                    img.save(buffer, self.fmt, quality=self.quality, **save_kwargs)
+                    data = buffer.getvalue()
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, cache_path)
+                    result = VisionImage(data, media_type, len(source), original_size, img.size,
+                                         time.perf_counter() - started)
+        except Exception as e:
+            logger.warning(f"Could not preprocess {os.path.basename(image_path)}, sending original: {e}")
+            ext = os.path.splitext(image_path)[1].lower()
+            return VisionImage(source, MEDIA_TYPES.get(ext, 'image/jpeg'), len(source), (0, 0), (0, 0))
+
+        self._record(result)
+        logger.info(
+            f"Vision input {os.path.basename(image_path)}: "
+            f"{result.original_bytes / 1024:.0f} KB → {len(result.data) / 1024:.0f} KB, "
+            f"{original_size[0]}x{original_size[1]} → {result.size[0]}x{result.size[1]}"
+            f"{' (cached)' if result.cached else ''}"
+        )
+        return result
+
+    def _record(self, result: VisionImage):
+        report = result.report()
+        with self._lock:
+            self.stats["images"] += 1
+            self.stats["cache_hits"] += int(result.cached)
+            for name in ("bytes_original", "bytes_sent", "image_tokens_original", "image_tokens_sent"):
+                self.stats[name] += report[name]
+            self.stats["prep_s"] = round(self.stats["prep_s"] + result.prep_s, 4)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        if stats["bytes_original"]:
+            stats["bytes_saved_pct"] = round(100 * (1 - stats["bytes_sent"] / stats["bytes_original"]), 1)
+        return stats
+
+
+_preprocessor: Optional[VisionPreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_vision_preprocessor() -> VisionPreprocessor:
+    """Process-wide preprocessor. Settings come from VISION_MAX_EDGE / VISION_FORMAT / VISION_QUALITY."""
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = VisionPreprocessor(
+                os.getenv("VISION_CACHE_DIR", os.path.join(get_project_root(), ".cache", "vision")),
+                max_edge=int(os.getenv("VISION_MAX_EDGE", DEFAULT_MAX_EDGE)),
+                fmt=os.getenv("VISION_FORMAT", "WEBP").upper(),
+                quality=int(os.getenv("VISION_QUALITY", "85")),
+            )
+        return _preprocessor
+
+
+def vision_stats(since: Optional[dict] = None) -> dict:
+    """Counters for run_log.json, minus an earlier snapshot (empty if no image was prepared)."""
+    if _preprocessor is None:
+        return {}
+    stats = _preprocessor.summary()
+    for name, value in (since or {}).items():
+        if name in stats and name != "bytes_saved_pct":
+            stats[name] = round(stats[name] - value, 4)
+    if not stats["images"]:
+        return {}
+    if stats["bytes_original"]:
+        stats["bytes_saved_pct"] = round(100 * (1 - stats["bytes_sent"] / stats["bytes_original"]), 1)
+    return stats
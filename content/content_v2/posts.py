@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Content Workflow V2 — Post Library
+==================================
+Queries the post store that main.py fills: every scraped inspiration post
+and the analyses produced for it, across all runs.
+
+Usage:
+    python posts.py
+    python posts.py --product "Seeds Boost Bar"
+    python posts.py --url "https://instagram.com/p/ABC123" --json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Ensure the project root is on the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from modules.post_store import PostStore, default_post_store_dir
+
+
+def print_analyses(records):
+    for record in records:
+        angle = record["analysis"].get("adaptation_notes", {}).get("benefills_angle", "")
+        print(f"\n  {record['image_sha256'][:12]}  {record['analyzer']} / {record['model']} "
+              f"(prompt {record['prompt_version']})")
+        for url in record["source_urls"]:
+            print(f"    {url}")
+        if record["products"]:
+            print(f"    Products: {', '.join(record['products'])}")
+        if angle:
+            print(f"    Angle: {angle}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query stored inspiration posts and analyses",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:")[1]
+    )
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--product", type=str, help="All analyses mentioning this brand product")
+    query.add_argument("--url", type=str, help="All analyses of the post at this URL")
+    parser.add_argument("--store", type=str, default=default_post_store_dir(), help="Post store directory")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    store = PostStore(args.store)
+    if args.product:
+        result = store.analyses_for_product(args.product)
+    elif args.url:
+        result = store.analyses_for_url(args.url)
+    else:
+        result = store.summary()
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    if isinstance(result, dict):
+        print(f"{result['posts']} post(s), {result['analyses']} analyses")
+        for product, count in result["products"].items():
+            print(f"  {product:<30}{count:>5}")
+        return
+
+    print(f"{len(result)} analyses for {args.product or args.url}")
+    print_analyses(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,9 +43,14 @@ export async function GET() {
                         caption = fs.readFileSync(captionPath, 'utf-8');
                     }
 
+                    const imageUrl = `/api/output-image?run=${runDir}&post=${postDir}`;
                     posts.push({
                         id: postDir,
-                        image: `/api/output-image?run=${runDir}&post=${postDir}`,
+                        image: imageUrl,
+                        thumbnails: {
+                            sm: `${imageUrl}&size=sm`,
+                            md: `${imageUrl}&size=md`,
+                        },
                         metadata,
                         caption
                     });
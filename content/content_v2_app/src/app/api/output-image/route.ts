@@ -3,6 +3,19 @@ import { NextResponse } from 'next/server';
 import fs from 'fs';
 import path from 'path';
 
+// Files written by content_v2/modules/renditions.py, best first
+const RENDITIONS: Record<string, string[]> = {
+    sm: ['thumb_sm.webp'],
+    md: ['thumb_md.webp'],
+    full: ['image.jpg', 'image.webp'],
+};
+
+const CONTENT_TYPES: Record<string, string> = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.webp': 'image/webp',
+};
+
 export async function GET(req: Request) {
     const { searchParams } = new URL(req.url);
     const run = searchParams.get('run');
@@ -12,19 +25,30 @@ export async function GET(req: Request) {
         return new NextResponse('Missing parameters', { status: 400 });
     }
 
+    // full = the Instagram-ready encode; sm / md = gallery thumbnails.
+    // Older runs (or failed encodes) only have image.png, so fall back to it.
+    const size = searchParams.get('size') || 'full';
+    const candidates = RENDITIONS[size];
+    if (!candidates) {
+        return new NextResponse('Unknown size', { status: 400 });
+    }
+
     const CONTENT_V2_DIR = path.resolve(process.cwd(), '..', 'content_v2');
-    const filePath = path.join(CONTENT_V2_DIR, 'output', run, post, 'image.png');
+    const postPath = path.join(CONTENT_V2_DIR, 'output', run, post);
+    const fileName = [...candidates, 'image.png'].find(name => fs.existsSync(path.join(postPath, name)));
 
-    if (!fs.existsSync(filePath)) {
+    if (!fileName) {
         return new NextResponse('File not found', { status: 404 });
     }
 
-    const fileBuffer = fs.readFileSync(filePath);
+    const fileBuffer = fs.readFileSync(path.join(postPath, fileName));
+    // A fallback may be replaced by its rendition later, so it must not be cached for good
+    const fallback = !candidates.includes(fileName);
 
     return new NextResponse(fileBuffer, {
         headers: {
-            'Content-Type': 'image/png',
-            'Cache-Control': 'public, max-age=31536000, immutable',
+            'Content-Type': CONTENT_TYPES[path.extname(fileName)],
+            'Cache-Control': fallback ? 'no-cache' : 'public, max-age=31536000, immutable',
         },
     });
 }
@@ -8,6 +8,7 @@ import Image from 'next/image';
 interface Post {
     id: string;
     image: string;
+    thumbnails: { sm: string; md: string };
     metadata: any;
     caption: string;
 }
@@ -126,7 +127,7 @@ export default function GalleryPage() {
                                             >
                                                 <div className="aspect-square relative">
                                                     <Image
-                                                        src={post.image}
+                                                        src={post.thumbnails.sm}
                                                         alt={post.id}
                                                         fill
                                                         className="object-cover"
@@ -170,7 +171,7 @@ export default function GalleryPage() {
                         {/* Image Section */}
                         <div className="md:w-1/2 bg-black flex items-center justify-center relative group">
                             <Image
-                                src={selectedPost.image}
+                                src={selectedPost.thumbnails.md}
                                 alt="Selected post"
                                 width={800}
                                 height={800}
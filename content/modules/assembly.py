@@ -1,51 +1,294 @@
 import subprocess
 import os
+import re
+import threading
+from modules.logger import setup_logger
+
+logger = setup_logger('assembly', 'content/logs/engine.log')
+
+FFMPEG = os.getenv("FFMPEG_BIN", "ffmpeg")
+DEFAULT_PRESET = "veryfast"
+DEFAULT_CRF = 23
+REEL_SIZE = (1080, 1920)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# libass units for SRT input (script height 288): bottom-centred, clear of the Reels UI
+CAPTION_STYLE = "FontName=Arial,FontSize=13,Bold=1,Outline=2,Shadow=0,Alignment=2,MarginV=50"
+CAPTION_WORDS = 6
+WORDS_PER_SECOND = 2.5
+
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_DIRECTION = re.compile(r"\[[^\]]*\]|^MOCK SCRIPT for [^:]*:")
+
+
+def filter_value(value):
+    """Escape a filter option value for the option parser, then for the filtergraph parser."""
+    value = re.sub(r"([\\':])", r"\\\1", str(value))
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
+
+
+def fill_frame(width, height):
+    """Scale to cover width x height, then centre-crop (9:16 for reels)."""
+    return (f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height},setsar=1")
+
+
+def media_duration(path):
+    """Duration in seconds from ffmpeg's input banner, or None if it can't be read."""
+    try:
+        result = subprocess.run([FFMPEG, "-hide_banner", "-i", path], capture_output=True, text=True)
+    except OSError:
+        return None
+    match = _DURATION.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def write_srt(transcript, duration, output_path, words_per_cue=CAPTION_WORDS):
+    """
+    Caption cues of a few words each, timed in proportion to their length over
+    `duration` (the voiceover's). Script directions like [HOOK] are dropped.
+    """
+    words = _DIRECTION.sub(" ", transcript).split()
+    cues = [" ".join(words[i:i + words_per_cue]) for i in range(0, len(words), words_per_cue)]
+    duration = duration or len(words) / WORDS_PER_SECOND
+    total = sum(len(cue) + 1 for cue in cues) or 1
+    start = 0.0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for n, cue in enumerate(cues, 1):
+            end = start + duration * (len(cue) + 1) / total
+            f.write(f"{n}\n{_srt_time(start)} --> {_srt_time(end)}\n{cue}\n\n")
+            start = end
+    return output_path
+
+
+def parse_progress(lines, duration=None):
+    """
+    Turn ffmpeg `-progress` output (key=value lines, one block per update
+    ending in progress=continue|end) into progress events.
+    """
+    block = {}
+    for line in lines:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        block[key] = value.strip()
+        if key != "progress":
+            continue
+        # out_time_ms is also in microseconds; older builds only write that one
+        out_time = block.get("out_time_us", block.get("out_time_ms", "N/A"))
+        out_time_s = int(out_time) / 1e6 if out_time.lstrip("-").isdigit() else None
+        speed = block.get("speed", "N/A").rstrip("x")
+        event = {
+            "out_time_s": out_time_s,
+            "frame": int(block["frame"]) if block.get("frame", "").isdigit() else None,
+            "fps": float(block["fps"]) if re.fullmatch(r"[\d.]+", block.get("fps", "")) else None,
+            "speed": float(speed) if re.fullmatch(r"[\d.]+", speed) else None,
+            "percent": None,
+            "done": value == "end",
+        }
+        if event["done"]:
+            event["percent"] = 100.0
+        elif duration and out_time_s is not None:
+            event["percent"] = round(min(100.0, max(0.0, 100 * out_time_s / duration)), 1)
+        yield event
+        block = {}
+
+
+def run_ffmpeg(cmd, stdin_chunks=None, on_progress=None, duration=None):
+    """
+    Run an ffmpeg command built with `-progress pipe:1`, calling `on_progress`
+    with each event. `stdin_chunks` (if any) are written to its stdin from a
+    thread. Returns the last event; raises CalledProcessError like
+    subprocess.run(check=True).
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if stdin_chunks is not None else subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr, errors = [], []
+
+    def drain():
+        stderr.append(proc.stderr.read())
+
+    def feed():
+        try:
+            for chunk in stdin_chunks:
+                proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its return code says why
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    threads = [threading.Thread(target=drain, daemon=True)]
+    if stdin_chunks is not None:
+        threads.append(threading.Thread(target=feed, daemon=True))
+    for thread in threads:
+        thread.start()
+    last = None
+    for event in parse_progress((line.decode('utf-8', 'replace') for line in proc.stdout), duration):
+        last = event
+        if on_progress:
+            on_progress(event)
+    proc.wait()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, None, b"".join(stderr))
+    return last
+
+
+class FilterGraph:
+    """
+    Builds one ffmpeg invocation: inputs (with their per-input options) and a
+    -filter_complex made of labelled chains.
+
+        graph = FilterGraph()
+        video = graph.add_input("avatar.mp4")
+        base = graph.chain(f"{video}:v", "scale=1080:1920")
+        graph.chain([base, f"{logo}:v"], "overlay=W-w-10:10", label="vout")
+    """
+    def __init__(self):
+        self.inputs = []
+        self.chains = []
+        self._count = 0
+
+    def add_input(self, path, *options) -> int:
+        self.inputs.append(list(options) + ["-i", path])
+        return len(self.inputs) - 1
+
+    def chain(self, sources, filters, label=None) -> str:
+        if isinstance(sources, str):
+            sources = [sources]
+        if label is None:
+            label = f"v{self._count}"
+            self._count += 1
+        self.chains.append("".join(f"[{s}]" for s in sources) + filters + f"[{label}]")
+        return label
+
+    def input_args(self) -> list:
+        return [arg for options in self.inputs for arg in options]
+
+    def filter_complex(self) -> str:
+        return ";".join(self.chains)
+
 
 class VideoEditor:
     """
     Handles FFmpeg operations for assembly, captions, and B-roll overlays.
+    Everything a reel needs (9:16 crop, B-roll, watermark, burned-in captions)
+    is composed into a single filter graph, so the video is decoded and
+    encoded once. Encoder settings come from FFMPEG_PRESET / FFMPEG_CRF /
+    FFMPEG_THREADS unless passed in.
     """
-    def __init__(self, assets_dir):
+    def __init__(self, assets_dir, preset=None, crf=None, threads=None):
         self.assets_dir = assets_dir
         self.logo_path = os.path.join(assets_dir, "logos/watermark.png")
+        self.preset = preset or os.getenv("FFMPEG_PRESET", DEFAULT_PRESET)
+        self.crf = int(crf if crf is not None else os.getenv("FFMPEG_CRF", DEFAULT_CRF))
+        self.threads = int(threads if threads is not None else os.getenv("FFMPEG_THREADS", 0))
 
-    def assemble(self, avatar_video: str, audio_file: str, output_name: str):
-        output_path = os.path.normpath(os.path.join(os.path.dirname(__file__), f"../outputs/{output_name}.mp4"))
-        
-        # Check if logo exists for watermark
-        logo_filter = ""
-        input_args = ["-i", avatar_video, "-i", audio_file]
-        
-        if os.path.exists(self.logo_path):
-            input_args += ["-i", self.logo_path]
-            # Overlay logo in top right
-            logo_filter = "[0:v][2:v]overlay=W-w-10:10"
-        else:
-            logo_filter = "[0:v]null"
-
-        # Base command for 9:16 aspect ratio
-        cmd = [
-            "ffmpeg", "-y"
-        ] + input_args + [
-            "-filter_complex", f"{logo_filter},scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920",
-            "-c:v", "libx264", "-pix_fmt", "yuv420p",
-            "-c:a", "aac", "-strict", "experimental",
+    def compose(self, graph, video, captions_path=None, broll=None, watermark=True) -> str:
+        """
+        Add the reel chain for input `video` to `graph`: 9:16 crop, then each
+        B-roll clip over its time window, the watermark and the captions.
+        `broll` items are {"path", "start", "end"}; stills are looped for the
+        window. Returns the output label.
+        """
+        width, height = REEL_SIZE
+        current = graph.chain(f"{video}:v", fill_frame(width, height))
+
+        for clip in broll or []:
+            start, end = float(clip["start"]), float(clip["end"])
+            if clip["path"].lower().endswith(IMAGE_EXTENSIONS):
+                index = graph.add_input(clip["path"], "-loop", "1", "-t", f"{end - start:.3f}")
+            else:
+                index = graph.add_input(clip["path"])
+            overlay = graph.chain(f"{index}:v", f"{fill_frame(width, height)},trim=duration={end - start:.3f},"
+                                                f"setpts=PTS-STARTPTS+{start:.3f}/TB")
+            current = graph.chain([current, overlay],
+                                  f"overlay=0:0:enable='between(t,{start:.3f},{end:.3f})':eof_action=pass")
+
+        if watermark and os.path.exists(self.logo_path):
+            # Overlay logo in top right, after the crop so it is never cut off
+            logo = graph.add_input(self.logo_path)
+            current = graph.chain([current, f"{logo}:v"], "overlay=W-w-10:10")
+
+        if captions_path:
+            current = graph.chain(current, f"subtitles=filename={filter_value(captions_path)}"
+                                           f":force_style={filter_value(CAPTION_STYLE)}")
+
+        return graph.chain(current, "format=yuv420p", label="vout")
+
+    def command(self, graph, video_label, audio_map, output_path) -> list:
+        return [
+            FFMPEG, "-y", "-hide_banner", "-nostats", "-progress", "pipe:1",
+        ] + graph.input_args() + [
+            "-filter_complex", graph.filter_complex(),
+            "-map", f"[{video_label}]", "-map", audio_map,
+            "-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf), "-threads", str(self.threads),
+            "-c:a", "aac", "-b:a", "192k",
+            "-movflags", "+faststart", "-shortest",
             output_path
         ]
-        
+
+    def assemble(self, avatar_video: str, audio_file, output_name: str, transcript=None, broll=None,
+                 on_progress=None):
+        """
+        `audio_file` is a path, or an iterable of audio chunks (e.g. AudioProvider.stream) piped to ffmpeg as they
+        arrive. With `transcript`, captions are burned in; `broll` is a list of {"path", "start", "end"} overlays.
+        """
+        output_path = os.path.normpath(os.path.join(os.path.dirname(__file__), f"../outputs/{output_name}.mp4"))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        audio_chunks = None if isinstance(audio_file, str) else audio_file
+        duration = media_duration(audio_file if audio_chunks is None else avatar_video)
+
+        graph = FilterGraph()
+        video = graph.add_input(avatar_video)
+        audio = graph.add_input("pipe:0" if audio_chunks is not None else audio_file)
+        captions_path = None
+        if transcript:
+            captions_path = write_srt(transcript, duration, f"{os.path.splitext(output_path)[0]}.srt")
+        label = self.compose(graph, video, captions_path, broll)
+        cmd = self.command(graph, label, f"{audio}:a", output_path)
+
         print(f"Executing FFmpeg: {' '.join(cmd)}")
         try:
-            subprocess.run(cmd, check=True, capture_output=True)
-            logger.info("FFmpeg assembly successful.")
+            last = run_ffmpeg(cmd, audio_chunks, on_progress, duration)
+            logger.info(f"FFmpeg assembly successful. {last}")
         except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg failed: {e.stderr.decode()}")
+            logger.error(f"FFmpeg failed: {e.stderr.decode(errors='replace')}")
             print(f"FFmpeg error: See logs for details.")
         return output_path
 
-    def add_captions(self, video_path: str, transcript: str):
-        # Implementation for generating .srt and burning it into the video
-        pass
+    def _rework(self, video_path, captions_path=None, broll=None, on_progress=None):
+        """Re-encode an assembled reel in place with extra overlays (no second watermark)."""
+        tmp_path = f"{os.path.splitext(video_path)[0]}.tmp.mp4"
+        graph = FilterGraph()
+        video = graph.add_input(video_path)
+        label = self.compose(graph, video, captions_path, broll, watermark=False)
+        cmd = self.command(graph, label, f"{video}:a?", tmp_path)
+        run_ffmpeg(cmd, on_progress=on_progress, duration=media_duration(video_path))
+        os.replace(tmp_path, video_path)
+        return video_path
+
+    def add_captions(self, video_path: str, transcript: str, on_progress=None):
+        """Burn captions into an existing video. Prefer assemble(transcript=...), which saves an encode."""
+        captions_path = write_srt(transcript, media_duration(video_path), f"{os.path.splitext(video_path)[0]}.srt")
+        return self._rework(video_path, captions_path=captions_path, on_progress=on_progress)
 
-    def add_broll(self, video_path: str, broll_mapping: list):
-        # Implementation for overlaying B-roll based on timestamps/visual cues
-        pass
+    def add_broll(self, video_path: str, broll_mapping: list, on_progress=None):
+        """Overlay B-roll on an existing video. Prefer assemble(broll=...), which saves an encode."""
+        return self._rework(video_path, broll=broll_mapping, on_progress=on_progress)
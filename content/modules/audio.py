@@ -1,22 +1,43 @@
 from abc import ABC, abstractmethod
 import os
+import time
+import queue
+import tempfile
+import threading
 import requests
 from dotenv import load_dotenv
+from modules.rate_limit import rate_limited, RetryableError, RETRYABLE_STATUS, parse_retry_after
 
 load_dotenv()
 
+CHUNK_SIZE = 16 * 1024
+
 class AudioProvider(ABC):
     @abstractmethod
     def synthesize(self, text: str, output_path: str) -> str:
         pass
 
+    def stream(self, text: str):
+        """Yield the audio as byte chunks while it is synthesized (after the fact unless the provider streams)."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.synthesize(text, os.path.join(tmp, "audio.mp3"))
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
 class ElevenLabsAudio(AudioProvider):
     def __init__(self):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.voice_id = os.getenv("ELEVENLABS_VOICE_ID", "pNInz6obpgnuMvscWqt5") # Default voice
+        self.api_base = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io").rstrip("/")
+        self.stats = {"ttfb_s": None, "seconds": None, "bytes": 0}
 
-    def synthesize(self, text: str, output_path: str) -> str:
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
+    def stream(self, text: str):
+        # The /stream endpoint sends MP3 frames as they are generated
+        url = f"{self.api_base}/v1/text-to-speech/{self.voice_id}/stream"
         headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
@@ -30,13 +51,40 @@ class ElevenLabsAudio(AudioProvider):
                 "similarity_boost": 0.5
             }
         }
-        response = requests.post(url, json=data, headers=headers)
-        if response.status_code == 200:
+        def _post():
+            response = requests.post(url, json=data, headers=headers, stream=True, timeout=(10, 60))
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableError(f"ElevenLabs API error: {response.text[:200]}", response.status_code,
+                                     parse_retry_after(response.headers.get("Retry-After")))
+            return response
+
+        started = time.perf_counter()
+        self.stats = {"ttfb_s": None, "seconds": None, "bytes": 0}
+        response = rate_limited("elevenlabs", data["model_id"], _post)
+        with response:
+            if response.status_code != 200:
+                raise Exception(f"ElevenLabs API error: {response.text[:200]}")
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                if self.stats["ttfb_s"] is None:
+                    self.stats["ttfb_s"] = round(time.perf_counter() - started, 3)
+                self.stats["bytes"] += len(chunk)
+                yield chunk
+        self.stats["seconds"] = round(time.perf_counter() - started, 3)
+
+    def synthesize(self, text: str, output_path: str) -> str:
+        """Write the audio chunk by chunk as it arrives; a failed stream leaves no file."""
+        try:
             with open(output_path, 'wb') as f:
-                f.write(response.content)
-            return output_path
-        else:
-            raise Exception(f"ElevenLabs API error: {response.text}")
+                for chunk in self.stream(text):
+                    f.write(chunk)
+                    f.flush()
+        except Exception:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        return output_path
 
 class MockAudio(AudioProvider):
     def synthesize(self, text: str, output_path: str) -> str:
@@ -46,6 +94,43 @@ class MockAudio(AudioProvider):
             f.write("MOCK AUDIO")
         return output_path
 
+def tee_to_file(chunks, output_path):
+    """Pass audio chunks through (e.g. into VideoEditor.assemble) while also saving them to `output_path`."""
+    with open(output_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
+
+def prefetch(chunks):
+    """
+    Start consuming `chunks` in a background thread now. Iterating the result
+    replays what has arrived so far and then follows the rest live; an error
+    in the source is raised to the reader.
+    """
+    buffered = queue.Queue()
+    done = object()
+
+    def run():
+        try:
+            for chunk in chunks:
+                buffered.put(chunk)
+            buffered.put(done)
+        except Exception as e:
+            buffered.put(e)
+
+    def drain():
+        while True:
+            item = buffered.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    # Started here, not on the first next(): a plain function, so the source runs before anyone reads
+    threading.Thread(target=run, daemon=True).start()
+    return drain()
+
 class AudioFactory:
     @staticmethod
     def get_provider(provider_type: str = "elevenlabs") -> AudioProvider:
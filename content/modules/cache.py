@@ -0,0 +1,25 @@
+import os
+from dotenv import load_dotenv
+from content_v2.modules.cache import CACHE_MODES, ResponseCache
+
+load_dotenv()
+
+# One cache implementation for both pipelines (content_v2/modules/cache.py);
+# v1 keeps its own directory and size budget.
+
+_response_cache = None
+
+
+def configure_response_cache(mode="use", cache_dir=None) -> ResponseCache:
+    global _response_cache
+    cache_dir = cache_dir or os.path.join(os.path.dirname(__file__), "..", ".cache", "responses")
+    ttl_hours = float(os.getenv("CONTENT_CACHE_TTL_HOURS", "168"))
+    max_mb = float(os.getenv("CONTENT_CACHE_MAX_MB", "128"))
+    _response_cache = ResponseCache(os.path.normpath(cache_dir), mode, ttl_hours * 3600, int(max_mb * 1024 * 1024))
+    return _response_cache
+
+
+def get_response_cache() -> ResponseCache:
+    if _response_cache is None:
+        return configure_response_cache(os.getenv("CONTENT_CACHE", "use"))
+    return _response_cache
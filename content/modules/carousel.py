@@ -0,0 +1,92 @@
+import re
+
+SLIDE_MARKER = "## SLIDE"
+VISUAL_PROMPT_MARKER = "visual prompt:"
+_HEADER = re.compile(r'\s*\d*\s*[:.\-–—|]*\s*(.*)')
+
+
+class Slide:
+    def __init__(self, index, title, body, visual_prompt, text):
+        self.index = index
+        self.title = title
+        self.body = body
+        self.visual_prompt = visual_prompt
+        self.text = text
+
+
+def parse_slide(index, text) -> Slide:
+    """
+    One "## SLIDE" section (marker already stripped): the header line is the
+    title, the paragraph after "Visual Prompt:" (any case, bold or heading)
+    is the visual prompt, and everything else is the body.
+    """
+    header, _, rest = text.partition("\n")
+    title = _HEADER.match(header).group(1).strip().strip('*').strip()
+    visual_prompt, body = None, rest.strip()
+
+    start = rest.lower().find(VISUAL_PROMPT_MARKER)
+    if start != -1:
+        after = start + len(VISUAL_PROMPT_MARKER)
+        content = rest[after:].lstrip()
+        offset = len(rest) - len(content)
+        # The prompt runs to the next blank line or sub-heading
+        ends = [i for i in (content.find("\n\n"), content.find("###")) if i != -1]
+        content = content[:min(ends)] if ends else content
+        lines = [line.strip().lstrip('-').lstrip('*').strip() for line in content.strip().split('\n')]
+        visual_prompt = " ".join(line for line in lines if line) or None
+        line_start = rest.rfind("\n", 0, start) + 1
+        parts = (rest[:line_start].strip(), rest[offset + len(content):].strip())
+        body = "\n\n".join(part for part in parts if part)
+
+    return Slide(index, title, body, visual_prompt, text)
+
+
+class CarouselPlanParser:
+    """
+    Incremental single-pass parser for a carousel plan written as "## SLIDE"
+    sections. feed() returns each slide as soon as the next one starts;
+    finish() returns the last. Text before the first slide is kept as `preamble`.
+    """
+    def __init__(self):
+        self.preamble = ""
+        self.slides = []
+        self._buffer = ""
+        self._scan_from = 0
+        self._open = False
+
+    def feed(self, delta) -> list:
+        self._buffer += delta
+        done = []
+        while True:
+            pos = self._buffer.find(SLIDE_MARKER, self._scan_from)
+            if pos == -1:
+                # The marker may be split across deltas; only rescan its possible prefix
+                self._scan_from = max(0, len(self._buffer) - len(SLIDE_MARKER) + 1)
+                return done
+            if self._open:
+                done.append(self._emit(self._buffer[:pos]))
+            else:
+                self.preamble = self._buffer[:pos]
+            self._buffer = self._buffer[pos + len(SLIDE_MARKER):]
+            self._scan_from = 0
+            self._open = True
+
+    def finish(self) -> list:
+        if not self._open:
+            self.preamble += self._buffer
+            self._buffer = ""
+            return []
+        self._open = False
+        slide = self._emit(self._buffer)
+        self._buffer = ""
+        return [slide]
+
+    def _emit(self, text) -> Slide:
+        slide = parse_slide(len(self.slides) + 1, text)
+        self.slides.append(slide)
+        return slide
+
+
+def parse_plan(plan) -> list:
+    parser = CarouselPlanParser()
+    return parser.feed(plan) + parser.finish()
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+
+INDEX_VERSION = 1
+CACHE_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".cache", "context_index.json"))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+MAX_CHUNK_CHARS = 800
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or our that the this to was we "
+    "what when which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def _pieces(section, max_chars):
+    """Paragraphs of a section; oversized ones split by line, and oversized lines by length."""
+    for paragraph in re.split(r"\n\s*\n", section):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            yield paragraph, "\n\n"
+            continue
+        for line in paragraph.split("\n"):
+            for start in range(0, len(line), max_chars):
+                yield line[start:start + max_chars], "\n"
+
+
+def chunk_markdown(text, max_chars=MAX_CHUNK_CHARS):
+    """Split on headings, then pack paragraphs into chunks of at most `max_chars`. Returns (heading, text) pairs."""
+    chunks = []
+    for section in re.split(r"\n(?=#{1,6} )", text):
+        section = section.strip()
+        if not section:
+            continue
+        heading = section.split("\n", 1)[0].lstrip("#").strip() if section.startswith("#") else ""
+        current = ""
+        for piece, joiner in _pieces(section, max_chars):
+            if current and len(current) + len(joiner) + len(piece) > max_chars:
+                chunks.append((heading, current))
+                current = ""
+            current = f"{current}{joiner}{piece}" if current else piece
+        if current:
+            chunks.append((heading, current))
+    return chunks
+
+
+class ContextIndex:
+    """
+    Chunked BM25 index over the brand context files. Chunks and term counts
+    are cached on disk per file and rebuilt only when a file's mtime or
+    size changes, so a run with unchanged docs only stats them.
+    """
+    def __init__(self, root_dir, paths, cache_path=CACHE_PATH, k1=1.5, b=0.75):
+        self.root_dir = root_dir
+        self.paths = paths
+        self.cache_path = cache_path
+        self.k1 = k1
+        self.b = b
+        self.stats = {"files": 0, "rebuilt": 0, "chunks": 0}
+        self.chunks = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+            if cached.get("version") != INDEX_VERSION:
+                cached = {}
+        except (OSError, ValueError):
+            cached = {}
+        old_files = cached.get("files", {})
+
+        files, changed = {}, False
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rel = os.path.relpath(path, self.root_dir)
+            entry = old_files.get(rel)
+            if not entry or entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size:
+                with open(path, 'r') as f:
+                    text = f.read()
+                entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "chunks": [
+                    {"heading": heading, "text": chunk, "terms": Counter(tokenize(f"{heading}\n{chunk}"))}
+                    for heading, chunk in chunk_markdown(text)
+                ]}
+                self.stats["rebuilt"] += 1
+                changed = True
+            files[rel] = entry
+        if changed or set(files) != set(old_files):
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": INDEX_VERSION, "files": files}, f)
+            os.replace(tmp_path, self.cache_path)
+
+        for rel, entry in files.items():
+            for chunk in entry["chunks"]:
+                self.chunks.append(dict(chunk, source=rel, length=sum(chunk["terms"].values())))
+        self.stats["files"] = len(files)
+        self.stats["chunks"] = len(self.chunks)
+        self._df = Counter(term for chunk in self.chunks for term in chunk["terms"])
+        self._avg_length = sum(c["length"] for c in self.chunks) / len(self.chunks) if self.chunks else 0.0
+
+    def score(self, query):
+        """BM25 score of every chunk for `query`, in index order."""
+        n = len(self.chunks)
+        terms = set(tokenize(query))
+        idf = {t: math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in terms if self._df[t]}
+        scores = []
+        for chunk in self.chunks:
+            norm = self.k1 * (1 - self.b + self.b * chunk["length"] / (self._avg_length or 1))
+            score = 0.0
+            for term, weight in idf.items():
+                tf = chunk["terms"].get(term, 0)
+                if tf:
+                    score += weight * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Best-matching chunks for `query` that fit in `token_budget` (document order if nothing matches)."""
+        scores = self.score(query)
+        ranked = sorted(range(len(self.chunks)), key=lambda i: -scores[i])
+        if ranked and scores[ranked[0]] > 0:
+            ranked = [i for i in ranked if scores[i] > 0]
+        selected, used = [], 0
+        for i in ranked:
+            cost = len(self.chunks[i]["text"]) // CHARS_PER_TOKEN + 1
+            if used + cost > token_budget:
+                continue
+            selected.append(self.chunks[i])
+            used += cost
+        return selected
+
+    def context_for(self, query, token_budget=DEFAULT_TOKEN_BUDGET):
+        return "\n".join(
+            f"--- Source: {chunk['source']}{' § ' + chunk['heading'] if chunk['heading'] else ''} ---\n{chunk['text']}"
+            for chunk in self.search(query, token_budget)
+        )
+
+    def full_text(self):
+        text, source = "", None
+        for chunk in self.chunks:
+            if chunk["source"] != source:
+                source = chunk["source"]
+                text += f"\n--- Source: {os.path.basename(source)} ---\n"
+            text += chunk["text"] + "\n\n"
+        return text
+
+
+def relevant_context(brand_context, topic, token_budget=DEFAULT_TOKEN_BUDGET):
+    """The brand context chunks most relevant to `topic` (a plain prefix if there is no index)."""
+    index = brand_context.get('index')
+    if index is None:
+        return brand_context['raw_data'][:token_budget * CHARS_PER_TOKEN]
+    return index.context_for(topic, token_budget)
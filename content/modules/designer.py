@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
+from modules.rate_limit import rate_limited
+from modules.downloader import get_downloader
 
 load_dotenv()
 
@@ -19,21 +21,15 @@ class DallEProvider(ImageProvider):
         self.client = OpenAI(api_key=self.api_key)
 
     def generate_image(self, prompt: str, output_path: str) -> str:
-        response = self.client.images.generate(
+        response = rate_limited("dalle", "dall-e-3", lambda: self.client.images.generate(
             model="dall-e-3",
             prompt=prompt,
             size="1024x1024", # Or 1024x1792 for 9:16
             quality="standard",
             n=1,
-        )
+        ))
         image_url = response.data[0].url
-        
-        # Download the image
-        img_data = requests.get(image_url).content
-        with open(output_path, 'wb') as handler:
-            handler.write(img_data)
-            
-        return output_path
+        return get_downloader().download(image_url, output_path).path
 
 class MockImageProvider(ImageProvider):
     def generate_image(self, prompt: str, output_path: str) -> str:
@@ -59,11 +55,11 @@ class GoogleImageProvider(ImageProvider):
         
         # NanoBanana Pro supports high quality and 1:1 or other aspects via prompt
         # but the SDK usually has specific parameters
-        response = model.generate_images(
+        response = rate_limited("google_image", self.model_name, lambda: model.generate_images(
             prompt=prompt,
             number_of_images=1,
             # safety_setting="BLOCK_ONLY_HIGH"
-        )
+        ))
         
         if response.images:
             response.images[0].save(output_path)
@@ -79,3 +75,41 @@ class ImageFactory:
         if provider_type == "dalle" and os.getenv("OPENAI_API_KEY"):
             return DallEProvider()
         return MockImageProvider()
+
+
+class SlideImageQueue:
+    """
+    Generates slide images concurrently through one provider, at most
+    `max_workers` at a time. A failed slide is retried up to `attempts`
+    times (429/5xx are already retried inside rate_limited) and then
+    reported by wait() without affecting the other slides.
+    """
+    def __init__(self, provider: ImageProvider, max_workers=None, attempts=2):
+        self.provider = provider
+        self.attempts = max(1, attempts)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or int(os.getenv("IMAGE_WORKERS", "4")),
+                                        thread_name_prefix="slide")
+        self._jobs = []
+
+    def _generate(self, prompt, output_path):
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return self.provider.generate_image(prompt, output_path)
+            except Exception as e:
+                if attempt == self.attempts:
+                    raise
+                print(f"Image for {os.path.basename(output_path)} failed ({e}); retrying ({attempt}/{self.attempts})")
+
+    def submit(self, index, prompt, output_path):
+        self._jobs.append((index, output_path, self._pool.submit(self._generate, prompt, output_path)))
+
+    def wait(self):
+        """Block until every slide is done. Returns (index, path, error) in slide order."""
+        results = []
+        for index, output_path, future in sorted(self._jobs, key=lambda job: job[0]):
+            try:
+                results.append((index, future.result(), None))
+            except Exception as e:
+                results.append((index, output_path, e))
+        self._pool.shutdown()
+        return results
@@ -1,5 +1,6 @@
 import os
 import glob
+from modules.context_index import ContextIndex
 
 class Detective:
     """
@@ -10,26 +11,23 @@ class Detective:
         self.brand_context = {}
 
     def analyze(self):
-        # Scan for markdown files in root and findings/ docs/
+        # Scan for markdown files in root and findings/ docs/, plus the v2 product legends
         context_files = [
             os.path.join(self.root_dir, "project-instructions.md"),
             os.path.join(self.root_dir, "findings/site_snapshot.md"),
             os.path.join(self.root_dir, "docs/OPERATIONAL_GUIDE.md")
-        ]
-        
-        full_text = ""
-        for file_path in context_files:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    full_text += f"\n--- Source: {os.path.basename(file_path)} ---\n"
-                    full_text += f.read()
+        ] + sorted(glob.glob(os.path.join(self.root_dir, "content/content_v2/legends/*.md")))
+
+        # Chunked + cached: files are only re-read when their mtime/size changes
+        index = ContextIndex(self.root_dir, context_files)
         
         # Hardcoded extraction for now (in a real scenario, this could be an LLM summary)
         self.brand_context['name'] = "Benefills"
         self.brand_context['website'] = "benefills.com"
         self.brand_context['colors'] = ["Purple", "White"]
         self.brand_context['topics'] = ["Thyroid Health", "Functional Foods", "Metabolism", "Energy"]
-        self.brand_context['raw_data'] = full_text
+        self.brand_context['raw_data'] = index.full_text()
+        self.brand_context['index'] = index
         
         return self.brand_context
 
@@ -0,0 +1,9 @@
+from dotenv import load_dotenv
+from content_v2.modules.downloader import (  # noqa: F401 (re-exported for the v1 providers)
+    CHUNK_SIZE, DownloadError, DownloadResult, MediaDownloader, get_downloader, download_stats,
+)
+
+load_dotenv()
+
+# One downloader for both pipelines (content_v2/modules/downloader.py): pooled
+# keep-alive sessions, timeouts, retries, atomic writes and transfer stats.
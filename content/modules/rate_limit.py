@@ -0,0 +1,9 @@
+from dotenv import load_dotenv
+from content_v2.modules.rate_limit import (  # noqa: F401 (re-exported for the v1 providers)
+    DEFAULT_LIMITS, RETRYABLE_STATUS, RetryableError, parse_retry_after, rate_limited, get_rate_limiter, limiter_stats,
+)
+
+load_dotenv()
+
+# One limiter for both pipelines (content_v2/modules/rate_limit.py): the same
+# SQLite buckets in content/.cache/, so v1 and v2 runs share one budget per API key.
@@ -2,6 +2,9 @@ from abc import ABC, abstractmethod
 import os
 from anthropic import Anthropic
 from dotenv import load_dotenv
+from modules.cache import get_response_cache
+from modules.rate_limit import rate_limited
+from modules.context_index import relevant_context
 
 load_dotenv()
 
@@ -10,14 +13,19 @@ class ScriptingProvider(ABC):
     def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
         pass
 
+    def stream_script(self, topic: str, brand_context: dict, content_format: str = "reel"):
+        """Yield the script as text deltas while it is written (all at once unless the provider streams)."""
+        yield self.generate_script(topic, brand_context, content_format)
+
 class ClaudeScripting(ScriptingProvider):
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in .env")
         self.client = Anthropic(api_key=self.api_key)
+        self.model_name = "claude-sonnet-4-5-20250929"
 
-    def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
+    def _prompts(self, topic: str, brand_context: dict, content_format: str):
         # Load subagent prompt
         prompt_path = os.path.join(os.path.dirname(__file__), "../../.claude/agents/script_writer.md")
         with open(prompt_path, 'r') as f:
@@ -26,18 +34,42 @@ class ClaudeScripting(ScriptingProvider):
         user_prompt = f"""
         Topic: {topic}
         Format: {content_format}
-        Brand Context: {brand_context['raw_data'][:2000]}
+        Brand Context: {relevant_context(brand_context, topic)}
         
         Generate content for an Instagram {content_format}.
         """
-        
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+        return system_prompt, user_prompt
+
+    def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
+        system_prompt, user_prompt = self._prompts(topic, brand_context, content_format)
+        return get_response_cache().get_or_call(
+            lambda: rate_limited("anthropic", self.model_name, lambda: self.client.messages.create(
+                model=self.model_name,
+                max_tokens=1500,
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_prompt}]
+            ).content[0].text, tokens=(len(system_prompt) + len(user_prompt)) // 4 + 1500),
+            "anthropic", self.model_name, system_prompt, user_prompt, params={"max_tokens": 1500}
+        )
+
+    def _stream(self, system_prompt, user_prompt):
+        events = rate_limited("anthropic", self.model_name, lambda: self.client.messages.create(
+            model=self.model_name,
             max_tokens=1500,
             system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
+            messages=[{"role": "user", "content": user_prompt}],
+            stream=True
+        ), tokens=(len(system_prompt) + len(user_prompt)) // 4 + 1500)
+        for event in events:
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+
+    def stream_script(self, topic: str, brand_context: dict, content_format: str = "reel"):
+        system_prompt, user_prompt = self._prompts(topic, brand_context, content_format)
+        return get_response_cache().stream_or_call(
+            lambda: self._stream(system_prompt, user_prompt),
+            "anthropic", self.model_name, system_prompt, user_prompt, params={"max_tokens": 1500}
         )
-        return message.content[0].text
 
 class GeminiScripting(ScriptingProvider):
     def __init__(self):
@@ -46,9 +78,10 @@ class GeminiScripting(ScriptingProvider):
             raise ValueError("GOOGLE_API_KEY not found in .env (needed for Gemini scripting)")
         import google.generativeai as genai
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model_name = 'gemini-2.0-flash'
+        self.model = genai.GenerativeModel(self.model_name)
 
-    def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
+    def _prompt(self, topic: str, brand_context: dict, content_format: str) -> str:
         prompt_path = os.path.join(os.path.dirname(__file__), "../../.claude/agents/script_writer.md")
         system_prompt = ""
         if os.path.exists(prompt_path):
@@ -60,20 +93,44 @@ class GeminiScripting(ScriptingProvider):
         
         Topic: {topic}
         Format: {content_format}
-        Brand Context: {brand_context['raw_data'][:2000]}
+        Brand Context: {relevant_context(brand_context, topic)}
         
         Generate content for an Instagram {content_format}.
         """
-        
-        response = self.model.generate_content(user_prompt)
-        return response.text
+        return user_prompt
+
+    def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
+        user_prompt = self._prompt(topic, brand_context, content_format)
+        return get_response_cache().get_or_call(
+            lambda: rate_limited("gemini", self.model_name, lambda: self.model.generate_content(user_prompt).text,
+                                 tokens=len(user_prompt) // 4),
+            "gemini", self.model_name, "", user_prompt
+        )
+
+    def stream_script(self, topic: str, brand_context: dict, content_format: str = "reel"):
+        user_prompt = self._prompt(topic, brand_context, content_format)
+        return get_response_cache().stream_or_call(
+            lambda: (chunk.text for chunk in rate_limited(
+                "gemini", self.model_name, lambda: self.model.generate_content(user_prompt, stream=True),
+                tokens=len(user_prompt) // 4)),
+            "gemini", self.model_name, "", user_prompt
+        )
 
 class MockScripting(ScriptingProvider):
     def generate_script(self, topic: str, brand_context: dict, content_format: str = "reel") -> str:
         if content_format == "carousel":
-            return "Slide 1: Title\nSlide 2: Fact\nSlide 3: CTA"
+            return "".join(
+                f"## SLIDE {i}: {title}\n{body}\n\n**Visual Prompt:** Mock visual for {title.lower()}\n\n"
+                for i, (title, body) in enumerate([("Title", topic), ("Fact", "Thyroid health is key."),
+                                                   ("CTA", "Link in bio!")], 1)
+            )
         return f"MOCK SCRIPT for {topic}: [HOOK] Hey Benefills fam! [BODY] Thyroid health is key. [CTA] Link in bio!"
 
+    def stream_script(self, topic: str, brand_context: dict, content_format: str = "reel"):
+        script = self.generate_script(topic, brand_context, content_format)
+        for i in range(0, len(script), 16):
+            yield script[i:i + 16]
+
 class ScriptingFactory:
     @staticmethod
     def get_provider(provider_type: str = "claude") -> ScriptingProvider:
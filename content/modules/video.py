@@ -3,43 +3,109 @@ import os
 import requests
 import time
 from dotenv import load_dotenv
+from modules.rate_limit import rate_limited, RetryableError, RETRYABLE_STATUS, parse_retry_after
+from modules.downloader import get_downloader
+from modules.audio import prefetch, tee_to_file
 
 load_dotenv()
 
 class VideoProvider(ABC):
+    # Whether generate_video() lip-syncs to the synthesized voiceover (so it must wait for it)
+    needs_audio = False
+
     @abstractmethod
     def generate_video(self, script_text: str, audio_url: str, output_path: str) -> str:
         pass
 
+class VideoJobError(Exception):
+    pass
+
 class HeyGenVideo(VideoProvider):
-    def __init__(self):
+    """
+    HeyGen render job client: submit, poll the status with backoff until a
+    deadline, then stream the finished video to disk. With HEYGEN_VOICE_ID
+    the avatar speaks the script itself and needs no audio; otherwise the
+    voiceover is uploaded as an asset and the avatar lip-syncs to it.
+    HEYGEN_API_BASE / HEYGEN_UPLOAD_BASE point it at another server (e.g. a local stub).
+    """
+    def __init__(self, poll_interval=5.0, max_poll_interval=30.0, timeout=None):
         self.api_key = os.getenv("HEYGEN_API_KEY")
         self.avatar_id = os.getenv("HEYGEN_AVATAR_ID")
+        self.voice_id = os.getenv("HEYGEN_VOICE_ID")
+        self.api_base = os.getenv("HEYGEN_API_BASE", "https://api.heygen.com").rstrip("/")
+        self.upload_base = os.getenv("HEYGEN_UPLOAD_BASE", "https://upload.heygen.com").rstrip("/")
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout or float(os.getenv("HEYGEN_TIMEOUT_S", "1200"))
+        self.needs_audio = not self.voice_id
+        self.session = requests.Session()
+        self.session.headers["X-Api-Key"] = self.api_key or ""
 
-    def generate_video(self, script_text: str, audio_url: str, output_path: str) -> str:
-        # Simplified HeyGen implementation
-        # In a real scenario, you'd post to /v2/video/generate and poll for status
-        url = "https://api.heygen.com/v2/video/generate"
-        headers = {
-            "X-Api-Key": self.api_key,
-            "Content-Type": "application/json"
-        }
-        data = {
+    def _request(self, method, url, **kwargs):
+        def call():
+            if hasattr(kwargs.get("data"), "seek"):
+                kwargs["data"].seek(0)  # uploads are re-sent from the start on retry
+            response = self.session.request(method, url, timeout=(10, 60), **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableError(f"HeyGen API error: {response.text[:200]}", response.status_code,
+                                     parse_retry_after(response.headers.get("Retry-After")))
+            return response
+
+        response = rate_limited("heygen", "v2", call)
+        body = response.json() if response.content else {}
+        if response.status_code != 200 or body.get("error"):
+            raise VideoJobError(f"HeyGen {method} {url.split('?')[0]} failed ({response.status_code}): "
+                                f"{body.get('error') or response.text[:200]}")
+        return body.get("data") or {}
+
+    def upload_audio(self, audio_path: str) -> str:
+        with open(audio_path, 'rb') as f:
+            data = self._request("POST", f"{self.upload_base}/v1/asset", data=f,
+                                 headers={"Content-Type": "audio/mpeg"})
+        return data["id"]
+
+    def submit(self, script_text: str, audio_path=None) -> str:
+        """Start a render and return its video_id."""
+        if self.needs_audio:
+            voice = {"type": "audio", "audio_asset_id": self.upload_audio(audio_path)}
+        else:
+            voice = {"type": "text", "input_text": script_text, "voice_id": self.voice_id}
+        data = self._request("POST", f"{self.api_base}/v2/video/generate", json={
             "video_inputs": [
                 {
                     "character": {
                         "type": "avatar",
                         "avatar_id": self.avatar_id
                     },
-                    "input_text": script_text
+                    "voice": voice
                 }
             ],
-            "dimension": "portrait"
-        }
-        # Note: This is a placeholder for the actual complex polling logic
-        # return "https://heygen-output-url.mp4"
-        print(f"Submitting to HeyGen: {script_text[:50]}...")
-        return "mock_heygen_output.mp4"
+            "dimension": {"width": 1080, "height": 1920}
+        })
+        print(f"Submitted to HeyGen: {script_text[:50]}... (video {data['video_id']})")
+        return data["video_id"]
+
+    def wait(self, video_id: str) -> str:
+        """Poll until the render completes and return its download URL."""
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll_interval
+        while True:
+            data = self._request("GET", f"{self.api_base}/v1/video_status.get", params={"video_id": video_id})
+            status = data.get("status")
+            if status == "completed":
+                return data["video_url"]
+            if status == "failed":
+                raise VideoJobError(f"HeyGen render {video_id} failed: {data.get('error')}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise VideoJobError(f"HeyGen render {video_id} still '{status}' after {self.timeout:.0f}s")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, self.max_poll_interval)
+
+    def generate_video(self, script_text: str, audio_url: str, output_path: str) -> str:
+        video_id = self.submit(script_text, audio_url)
+        video_url = self.wait(video_id)
+        return get_downloader().download(video_url, output_path).path
 
 class MockVideo(VideoProvider):
     def generate_video(self, script_text: str, audio_url: str, output_path: str) -> str:
@@ -47,6 +113,24 @@ class MockVideo(VideoProvider):
             f.write("MOCK VIDEO content")
         return output_path
 
+def render_avatar(video_engine, audio_engine, script_text, audio_path, video_path):
+    """
+    Voiceover and avatar render for a reel, overlapped wherever the inputs allow. Returns what assembly
+    reads the voiceover from: `audio_path`, or, when the avatar speaks the script itself, the voiceover's
+    chunk stream, which has been running in the background during the render (and is also saved to `audio_path`).
+    """
+    if video_engine.needs_audio:
+        # The avatar lip-syncs to the voiceover, so the render has to wait for it
+        print("[3/5] Synthesizing audio...")
+        audio_engine.synthesize(script_text, audio_path)
+        print("[4/5] Generating digital twin video...")
+        video_engine.generate_video(script_text, audio_path, video_path)
+        return audio_path
+    print("[3-4/5] Streaming audio and generating digital twin video concurrently...")
+    audio = prefetch(tee_to_file(audio_engine.stream(script_text), audio_path))
+    video_engine.generate_video(script_text, audio_path, video_path)
+    return audio
+
 class VideoFactory:
     @staticmethod
     def get_provider(provider_type: str = "heygen") -> VideoProvider:
@@ -0,0 +1,118 @@
+"""
+Local stand-in for the HeyGen API (asset upload, video generate, status poll
+and the rendered file), for exercising modules/video.py without an account.
+
+    stub = HeyGenStub(outcome="completed", polls=2).start()
+    os.environ["HEYGEN_API_BASE"] = os.environ["HEYGEN_UPLOAD_BASE"] = stub.url
+
+or run it on its own and point HEYGEN_API_BASE / HEYGEN_UPLOAD_BASE at it:
+
+    python content/tests/heygen_stub.py --port 8765 --outcome failed
+"""
+
+import argparse
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+VIDEO_BYTES = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 1024
+
+
+class HeyGenStub:
+    """
+    `outcome` is the render's final status ("completed" or "failed"; anything
+    else, e.g. "processing", never finishes). It is reached after `polls`
+    status requests and at least `delay` seconds after the render was
+    submitted. Every request is recorded in `requests` as (method, path, body).
+    """
+    def __init__(self, outcome="completed", polls=1, port=0, delay=0.0):
+        self.outcome = outcome
+        self.polls = polls
+        self.delay = delay
+        self.submitted_at = None
+        self.requests = []
+        self.status_polls = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _status(self, video_id):
+        with self._lock:
+            self.status_polls += 1
+            polls = self.status_polls
+        rendering = self.submitted_at is None or time.monotonic() - self.submitted_at < self.delay
+        if polls < self.polls or rendering or self.outcome not in ("completed", "failed"):
+            return {"video_id": video_id, "status": "processing" if polls > 1 else "pending"}
+        if self.outcome == "failed":
+            return {"video_id": video_id, "status": "failed", "error": {"code": 40001, "message": "stub failure"}}
+        return {"video_id": video_id, "status": "completed", "video_url": f"{self.url}/files/{video_id}.mp4"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, content_type="application/json"):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _record(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub._lock:
+                    stub.requests.append((self.command, self.path, body))
+                return body
+
+            def do_POST(self):
+                body = self._record()
+                if self.headers.get("X-Api-Key") is None:
+                    return self._reply(401, {"error": "missing X-Api-Key"})
+                path = urlparse(self.path).path
+                if path == "/v1/asset":
+                    return self._reply(200, {"code": 100, "data": {"id": "asset_1", "size": len(body)}})
+                if path == "/v2/video/generate":
+                    payload = json.loads(body or b"{}")
+                    if not payload.get("video_inputs"):
+                        return self._reply(400, {"error": "video_inputs is required", "data": None})
+                    stub.submitted_at = time.monotonic()
+                    return self._reply(200, {"error": None, "data": {"video_id": "vid_1"}})
+                self._reply(404, {"error": f"no route {path}"})
+
+            def do_GET(self):
+                self._record()
+                url = urlparse(self.path)
+                if url.path == "/v1/video_status.get":
+                    video_id = parse_qs(url.query).get("video_id", [""])[0]
+                    return self._reply(200, {"code": 100, "data": stub._status(video_id)})
+                if url.path.startswith("/files/"):
+                    return self._reply(200, VIDEO_BYTES, "video/mp4")
+                self._reply(404, {"error": f"no route {url.path}"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HeyGen API stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--outcome", default="completed", help="completed, failed or processing (never finishes)")
+    parser.add_argument("--polls", type=int, default=2, help="Status polls before the outcome")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds the render takes")
+    args = parser.parse_args()
+    stub = HeyGenStub(args.outcome, args.polls, args.port, args.delay)
+    print(f"HeyGen stub on {stub.url} (HEYGEN_API_BASE={stub.url} HEYGEN_UPLOAD_BASE={stub.url})")
+    stub.server.serve_forever()
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from modules.audio import prefetch, tee_to_file
+
+
+class PrefetchTest(unittest.TestCase):
+    def test_source_is_read_before_the_first_next(self):
+        read = threading.Event()
+
+        def source():
+            read.set()
+            yield b"a"
+            yield b"b"
+
+        chunks = prefetch(source())
+        self.assertTrue(read.wait(2), "prefetch did not start reading until iterated")
+        self.assertEqual(list(chunks), [b"a", b"b"])
+
+    def test_tee_completes_without_a_reader(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "voiceover.mp3")
+            chunks = prefetch(tee_to_file(iter([b"x" * 10, b"y" * 5]), path))
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline and (not os.path.exists(path) or os.path.getsize(path) < 15):
+                time.sleep(0.01)
+            self.assertEqual(os.path.getsize(path), 15)
+            self.assertEqual(b"".join(chunks), b"x" * 10 + b"y" * 5)
+
+    def test_source_error_is_raised_to_the_reader(self):
+        def source():
+            yield b"a"
+            raise RuntimeError("stream dropped")
+
+        chunks = prefetch(source())
+        self.assertEqual(next(chunks), b"a")
+        with self.assertRaisesRegex(RuntimeError, "stream dropped"):
+            next(chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
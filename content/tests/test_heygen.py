@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from heygen_stub import HeyGenStub, VIDEO_BYTES
+from modules.video import HeyGenVideo, VideoJobError, render_avatar
+
+
+class StubTestCase(unittest.TestCase):
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"HEYGEN_API_KEY": "test-key", "HEYGEN_AVATAR_ID": "avatar_1",
+                                           "RATE_LIMIT": "off"})
+        env.start()
+        self.addCleanup(env.stop)
+        os.environ.pop("HEYGEN_VOICE_ID", None)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audio_path = os.path.join(self.tmp.name, "voiceover.mp3")
+        with open(self.audio_path, 'wb') as f:
+            f.write(b"ID3 fake mp3")
+        self.output_path = os.path.join(self.tmp.name, "avatar.mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def client(self, stub, voice_id=None, timeout=5.0):
+        os.environ.update({"HEYGEN_API_BASE": stub.url, "HEYGEN_UPLOAD_BASE": stub.url})
+        if voice_id:
+            os.environ["HEYGEN_VOICE_ID"] = voice_id
+        return HeyGenVideo(poll_interval=0.01, max_poll_interval=0.05, timeout=timeout)
+
+    def start(self, **kwargs):
+        stub = HeyGenStub(**kwargs).start()
+        self.addCleanup(stub.stop)
+        return stub
+
+
+class HeyGenVideoTest(StubTestCase):
+    def test_completed_render_is_downloaded(self):
+        stub = self.start(outcome="completed", polls=3)
+        client = self.client(stub)
+        path = client.generate_video("Hello there", self.audio_path, self.output_path)
+
+        self.assertEqual(path, self.output_path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), VIDEO_BYTES)
+        self.assertEqual(stub.status_polls, 3)
+        paths = [p.split("?")[0] for _, p, _ in stub.requests]
+        self.assertEqual(paths[:2], ["/v1/asset", "/v2/video/generate"])
+        generate = json.loads(stub.requests[1][2])
+        self.assertEqual(generate["video_inputs"][0]["voice"], {"type": "audio", "audio_asset_id": "asset_1"})
+        self.assertEqual(generate["dimension"], {"width": 1080, "height": 1920})
+
+    def test_text_voice_skips_the_upload(self):
+        stub = self.start(outcome="completed")
+        client = self.client(stub, voice_id="voice_1")
+        self.assertFalse(client.needs_audio)
+        client.generate_video("Hello there", None, self.output_path)
+
+        self.assertNotIn("/v1/asset", [p for _, p, _ in stub.requests])
+        voice = json.loads(stub.requests[0][2])["video_inputs"][0]["voice"]
+        self.assertEqual(voice, {"type": "text", "input_text": "Hello there", "voice_id": "voice_1"})
+
+    def test_failed_render_raises(self):
+        stub = self.start(outcome="failed", polls=2)
+        client = self.client(stub)
+        with self.assertRaisesRegex(VideoJobError, "failed: .*stub failure"):
+            client.generate_video("Hello there", self.audio_path, self.output_path)
+        self.assertFalse(os.path.exists(self.output_path))
+
+    def test_render_past_the_deadline_raises(self):
+        stub = self.start(outcome="processing")
+        client = self.client(stub, timeout=0.3)
+        with self.assertRaisesRegex(VideoJobError, "still 'processing' after"):
+            client.generate_video("Hello there", self.audio_path, self.output_path)
+        # Backoff: the polls spread out instead of hammering the API for the whole window
+        self.assertGreater(stub.status_polls, 2)
+        self.assertLess(stub.status_polls, 20)
+
+    def test_api_error_raises(self):
+        stub = self.start()
+        client = self.client(stub)
+        with self.assertRaisesRegex(VideoJobError, r"\(400\): video_inputs is required"):
+            client._request("POST", f"{stub.url}/v2/video/generate", json={})
+
+
+class SlowAudio:
+    """Streams `chunks` pieces over `seconds`, like a TTS response arriving."""
+    def __init__(self, seconds, chunks=10):
+        self.seconds = seconds
+        self.chunks = chunks
+
+    def stream(self, text):
+        for _ in range(self.chunks):
+            time.sleep(self.seconds / self.chunks)
+            yield b"\xff" * 100
+
+    def synthesize(self, text, output_path):
+        with open(output_path, 'wb') as f:
+            for chunk in self.stream(text):
+                f.write(chunk)
+        return output_path
+
+
+class RenderAvatarTest(StubTestCase):
+    RENDER_S = 0.8
+    AUDIO_S = 0.8
+
+    def test_text_voice_overlaps_audio_and_render(self):
+        stub = self.start(outcome="completed", delay=self.RENDER_S)
+        client = self.client(stub, voice_id="voice_1")
+        started = time.monotonic()
+        audio = render_avatar(client, SlowAudio(self.AUDIO_S), "Hello there", self.audio_path, self.output_path)
+        self.assertEqual(b"".join(audio), b"\xff" * 1000)
+        elapsed = time.monotonic() - started
+
+        # Close to max(audio, video), well short of their sum
+        self.assertGreaterEqual(elapsed, max(self.RENDER_S, self.AUDIO_S))
+        self.assertLess(elapsed, self.RENDER_S + self.AUDIO_S * 0.5)
+        with open(self.audio_path, 'rb') as f:
+            self.assertEqual(len(f.read()), 1000)
+
+    def test_lip_sync_waits_for_the_voiceover(self):
+        stub = self.start(outcome="completed", delay=0.2)
+        client = self.client(stub)
+        started = time.monotonic()
+        audio = render_avatar(client, SlowAudio(0.3), "Hello there", self.audio_path, self.output_path)
+        self.assertEqual(audio, self.audio_path)
+        self.assertGreaterEqual(time.monotonic() - started, 0.5)
+        upload = next(body for _, path, body in stub.requests if path == "/v1/asset")
+        self.assertEqual(len(upload), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()